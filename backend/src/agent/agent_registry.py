@@ -1,45 +1,215 @@
+import ast
+import functools
+import hashlib
 import importlib
-import inspect
+import json
 import os
+import sys
+from importlib import metadata
 from pathlib import Path
-from typing import Dict, Type, List, Optional, Any
+from types import ModuleType
+from typing import Dict, Type, List, Optional, Any, FrozenSet, Tuple, Union
 from .base_agent import BaseAgent
 
+# Entry point group installed packages use to contribute agents without a scan
+ENTRY_POINT_GROUP = "langgraph_ma.agents"
+
+# On-disk cache of {agent_id: "module:ClassName"} from the last directory scan, kept
+# in the user cache dir (one file per agent package) rather than next to the sources
+MANIFEST_DIR = Path(
+    os.getenv("AGENT_MANIFEST_DIR")
+    or Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache") / "langgraph_ma"
+)
+_PACKAGE_KEY = hashlib.sha1(str(Path(__file__).parent.resolve()).encode()).hexdigest()[:12]
+MANIFEST_PATH = MANIFEST_DIR / f"agent_manifest-{_PACKAGE_KEY}.json"
+# Bumped whenever discovery changes what it records, so older manifests are rescanned
+_MANIFEST_VERSION = 2
+
+
+@functools.lru_cache(maxsize=256)
+def _cached_import(module_name: str) -> ModuleType:
+    """Import a module once, reusing sys.modules when it is already loaded"""
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    return importlib.import_module(module_name)
+
+
+@functools.lru_cache(maxsize=None)
+def _materialize(class_path: str) -> Type[BaseAgent]:
+    """Import an agent class from a "module.path:ClassName" placeholder"""
+    module_path, _, class_name = class_path.partition(':')
+    module = _cached_import(module_path)
+    
+    if class_name:
+        return getattr(module, class_name)
+    
+    # Placeholder names only the module - find its BaseAgent subclass, preferring one
+    # defined there over an imported base such as ConfigurableAgent
+    candidates = [
+        obj for obj in vars(module).values()
+        if isinstance(obj, type) and obj is not BaseAgent and issubclass(obj, BaseAgent)
+    ]
+    for obj in candidates:
+        if obj.__module__ == module.__name__:
+            return obj
+    if candidates:
+        return candidates[0]
+    
+    if os.getenv("DEBUG"):
+        # Debug: print all classes found in the module
+        classes_found = [name for name, obj in vars(module).items() if isinstance(obj, type)]
+        print(f"   Classes found in module: {classes_found}")
+    raise ValueError(f"No BaseAgent subclass found in module {module_path}")
+
+
+def _find_agent_class(source: str, filename: str) -> Optional[str]:
+    """Name of the class deriving directly from BaseAgent, "" if only an import can tell, or None
+
+    Classes with other bases may still subclass BaseAgent through an intermediate class or an
+    aliased import, so those modules get a module-only placeholder."""
+    tree = ast.parse(source, filename=filename)
+    has_derived_class = False
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and node.bases:
+            if any(getattr(base, 'id', getattr(base, 'attr', None)) == BaseAgent.__name__ for base in node.bases):
+                return node.name
+            has_derived_class = True
+    return "" if has_derived_class else None
+
+
+class _AgentSlot:
+    """Everything the registry tracks for one agent_id, kept in a single record"""
+    
+    __slots__ = ('agent_class', 'instance', 'config', 'capabilities', 'metadata')
+    
+    def __init__(self, agent_class: Union[Type[BaseAgent], str, None] = None,
+                 config: Optional[Dict[str, Any]] = None):
+        # Class, a "module:ClassName" placeholder imported on first use, or None
+        # when only a config has been set for this agent_id so far
+        self.agent_class = agent_class
+        self.instance: Optional[BaseAgent] = None
+        self.config: Dict[str, Any] = config or {}
+        self.capabilities: Optional[FrozenSet[str]] = None
+        self.metadata: Optional[Dict[str, Any]] = None
+    
+    def reset(self) -> None:
+        """Drop everything derived from the class or config"""
+        self.instance = None
+        self.capabilities = None
+        self.metadata = None
+
 
 class AgentRegistry:
     """Registry for auto-discovering and managing agent plugins"""
     
     def __init__(self):
-        self._agent_classes: Dict[str, Type[BaseAgent]] = {}
-        self._agent_instances: Dict[str, BaseAgent] = {}
-        self._agent_configs: Dict[str, Dict[str, Any]] = {}
+        # One record per agent_id so hot paths need a single lookup
+        self._agents: Dict[str, _AgentSlot] = {}
+        self._metadata_cache: Optional[List[Dict[str, Any]]] = None
         self.discover_agents()
     
     def discover_agents(self) -> None:
-        """Automatically discover all agent plugins in the current directory"""
+        """Discover agent plugins from entry points and the cached directory manifest"""
         current_dir = Path(__file__).parent
+        
+        self._discover_entry_point_agents()
+        
+        agent_files = self._find_agent_files(current_dir)
+        fingerprint = self._get_fingerprint(agent_files)
+        manifest = self._read_manifest(fingerprint)
+        if manifest is None:
+            manifest = self._scan_agent_files(current_dir, agent_files)
+            self._write_manifest(fingerprint, manifest)
+        else:
+            print(f"✓ Loaded agent manifest from {MANIFEST_PATH}")
+        
+        for agent_id, class_path in manifest.items():
+            slot = self._agents.setdefault(agent_id, _AgentSlot())
+            if slot.agent_class is None:
+                slot.agent_class = class_path
+    
+    def _discover_entry_point_agents(self) -> None:
+        """Register agents advertised by installed packages"""
+        try:
+            entry_points = metadata.entry_points(group=ENTRY_POINT_GROUP)
+        except TypeError:
+            # Python 3.9 returns a dict of groups
+            entry_points = metadata.entry_points().get(ENTRY_POINT_GROUP, [])
+        
+        for entry_point in entry_points:
+            self._agents.setdefault(entry_point.name, _AgentSlot()).agent_class = entry_point.value
+            print(f"✓ Discovered entry point agent: {entry_point.name} ({entry_point.value})")
+    
+    def _find_agent_files(self, current_dir: Path) -> List[Path]:
+        """Agent modules in the directory and its immediate subdirectories"""
         agent_files = []
         
-        # Look for agent files in current directory and subdirectories
-        for item in current_dir.iterdir():
-            if item.is_file() and item.name.endswith('_agent.py') and item.name != 'base_agent.py':
-                agent_files.append(item)
-            elif item.is_dir() and item.name not in ['__pycache__', '.git']:
-                # Look for agent.py files in subdirectories
-                agent_file = item / 'agent.py'
-                if agent_file.exists():
-                    agent_files.append(agent_file)
+        # Look for agent files in current directory and subdirectories;
+        # DirEntry caches its type so each entry costs at most one stat
+        with os.scandir(current_dir) as it:
+            for entry in it:
+                name = entry.name
+                if entry.is_file(follow_symlinks=False) and name.endswith('_agent.py') and name != 'base_agent.py':
+                    agent_files.append(Path(entry.path))
+                elif entry.is_dir(follow_symlinks=False) and name not in ('__pycache__', '.git'):
+                    # Look for agent.py files in subdirectories
+                    agent_file = os.path.join(entry.path, 'agent.py')
+                    if os.path.exists(agent_file):
+                        agent_files.append(Path(agent_file))
+        return agent_files
+    
+    def _get_fingerprint(self, agent_files: List[Path]) -> List[Tuple[str, int, int]]:
+        """Sorted (path, mtime_ns, size) of every agent module, so in-place edits invalidate the manifest"""
+        fingerprint = []
+        for agent_file in agent_files:
+            stat = agent_file.stat()
+            fingerprint.append((str(agent_file), stat.st_mtime_ns, stat.st_size))
+        return sorted(fingerprint)
+    
+    def _read_manifest(self, fingerprint: List[Tuple[str, int, int]]) -> Optional[Dict[str, str]]:
+        """Return the cached manifest if it is still valid for the given fingerprint"""
+        try:
+            with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
         
+        # JSON has no tuples, so compare against the fingerprint as lists
+        if (
+            not isinstance(cached, dict)
+            or cached.get("version") != _MANIFEST_VERSION
+            or cached.get("files") != [list(entry) for entry in fingerprint]
+        ):
+            return None
+        agents = cached.get("agents")
+        return agents if isinstance(agents, dict) else None
+    
+    def _write_manifest(self, fingerprint: List[Tuple[str, int, int]], manifest: Dict[str, str]) -> None:
+        """Persist the scanned manifest to the cache dir"""
+        try:
+            MANIFEST_DIR.mkdir(parents=True, exist_ok=True)
+            # Write then rename so a concurrent reader never sees a partial file
+            tmp_path = MANIFEST_PATH.with_name(f"{MANIFEST_PATH.name}.{os.getpid()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"version": _MANIFEST_VERSION, "files": fingerprint, "agents": manifest}, f)
+            os.replace(tmp_path, MANIFEST_PATH)
+        except OSError as e:
+            print(f"⚠️ Failed to write agent manifest {MANIFEST_PATH}: {e}")
+    
+    def _scan_agent_files(self, current_dir: Path, agent_files: List[Path]) -> Dict[str, str]:
+        """Parse the agent modules and build a fresh manifest"""
         print(f"🔍 Discovering agents in {current_dir}")
         
+        manifest: Dict[str, str] = {}
         for agent_file in agent_files:
             try:
-                self._load_agent_from_file(agent_file)
+                self._load_agent_from_file(agent_file, manifest)
             except Exception as e:
                 print(f"⚠️ Failed to load agent from {agent_file}: {e}")
+        return manifest
     
-    def _load_agent_from_file(self, agent_file: Path) -> None:
-        """Load agent class from a Python file"""
+    def _load_agent_from_file(self, agent_file: Path, manifest: Dict[str, str]) -> None:
+        """Record the agent class defined in a Python file without importing it"""
         # Determine module path
         current_dir = Path(__file__).parent
         relative_path = agent_file.relative_to(current_dir)
@@ -47,112 +217,130 @@ class AgentRegistry:
         if relative_path.name == 'agent.py':
             # Handle subdirectory/agent.py pattern
             agent_id = relative_path.parent.name
-            module_name = f"agent.{agent_id}.agent"
+            module_name = f"{__package__}.{agent_id}.agent"
         else:
             # Handle xxx_agent.py pattern  
             agent_id = relative_path.stem.replace('_agent', '')
-            module_name = f"agent.{agent_id}_agent"
+            module_name = f"{__package__}.{agent_id}_agent"
         
-        # Try different module path strategies
-        module_paths_to_try = [
-            module_name,  # Relative path (agent.granny.agent)
-            f"backend.src.{module_name}",  # Absolute path from project root
-            f"src.{module_name}",  # Alternate path
-        ]
-        
-        module = None
-        for module_path in module_paths_to_try:
-            try:
-                module = importlib.import_module(module_path)
-                break
-            except ImportError:
-                continue
-        
-        if module is None:
-            print(f"⚠️ Failed to import any of these module paths: {module_paths_to_try}")
-            return
-        
-        try:
-            
-            # Find BaseAgent subclasses in the module
-            for name, obj in inspect.getmembers(module):
-                if (inspect.isclass(obj) and 
-                    issubclass(obj, BaseAgent) and 
-                    obj != BaseAgent):
-                    
-                    self._agent_classes[agent_id] = obj
-                    print(f"✓ Discovered agent: {agent_id} ({obj.__name__})")
-                    break
-            else:
-                print(f"⚠️ No BaseAgent subclass found in module")
-                # Debug: print all classes found in the module
-                classes_found = [name for name, obj in inspect.getmembers(module) if inspect.isclass(obj)]
-                print(f"   Classes found in module: {classes_found}")
-                
-        except Exception as e:
-            print(f"⚠️ Error loading agent from {agent_file}: {e}")
+        # Find BaseAgent subclasses from the source so the module is only
+        # imported once the agent is actually requested
+        class_name = _find_agent_class(agent_file.read_text(encoding='utf-8'), str(agent_file))
+        if class_name is None:
+            print(f"⚠️ No BaseAgent subclass found in {agent_file}")
+        elif class_name:
+            manifest[agent_id] = f"{module_name}:{class_name}"
+            print(f"✓ Discovered agent: {agent_id} ({class_name})")
+        else:
+            # Indirect or aliased base: _materialize finds the subclass on import
+            manifest[agent_id] = module_name
+            print(f"✓ Discovered agent: {agent_id} ({module_name})")
     
     def register_agent(self, agent_id: str, agent_class: Type[BaseAgent], config: Optional[Dict[str, Any]] = None) -> None:
         """Manually register an agent class"""
-        self._agent_classes[agent_id] = agent_class
+        slot = self._agents.setdefault(agent_id, _AgentSlot())
+        slot.agent_class = agent_class
+        slot.capabilities = None
+        slot.metadata = None
+        self._metadata_cache = None
         if config:
-            self._agent_configs[agent_id] = config
+            slot.config = config
         print(f"✓ Manually registered agent: {agent_id}")
     
+    def _get_slot(self, agent_id: str) -> _AgentSlot:
+        """Get the record for a known agent"""
+        slot = self._agents.get(agent_id)
+        if slot is None or slot.agent_class is None:
+            raise ValueError(f"Unknown agent: {agent_id}. Available: {self.list_available_agents()}")
+        return slot
+    
+    def _get_agent_class(self, agent_id: str) -> Type[BaseAgent]:
+        """Get agent class, importing a placeholder on first use"""
+        slot = self._get_slot(agent_id)
+        if isinstance(slot.agent_class, str):
+            slot.agent_class = _materialize(slot.agent_class)
+        return slot.agent_class
+    
+    def _get_agent_capabilities(self, agent_id: str) -> Optional[FrozenSet[str]]:
+        """Get lowercased capabilities from config or the agent class, without instantiating"""
+        slot = self._get_slot(agent_id)
+        if slot.capabilities is None:
+            capabilities = slot.config.get('capabilities')
+            if capabilities is None:
+                capabilities = self._get_agent_class(agent_id).declared_capabilities()
+            if capabilities is None:
+                return None
+            slot.capabilities = frozenset(cap.lower() for cap in capabilities)
+        
+        return slot.capabilities
+    
     def get_agent(self, agent_id: str) -> BaseAgent:
         """Get agent instance (singleton per agent_id)"""
-        if agent_id not in self._agent_instances:
-            if agent_id not in self._agent_classes:
-                raise ValueError(f"Unknown agent: {agent_id}. Available: {list(self._agent_classes.keys())}")
-            
-            agent_class = self._agent_classes[agent_id]
-            config = self._agent_configs.get(agent_id, {})
-            self._agent_instances[agent_id] = agent_class(agent_id, config)
+        slot = self._get_slot(agent_id)
+        if slot.instance is None:
+            agent_class = self._get_agent_class(agent_id)
+            slot.instance = agent_class(agent_id, slot.config)
         
-        return self._agent_instances[agent_id]
+        return slot.instance
     
     def set_agent_config(self, agent_id: str, config: Dict[str, Any]) -> None:
         """Set configuration for an agent"""
-        self._agent_configs[agent_id] = config
+        slot = self._agents.setdefault(agent_id, _AgentSlot())
+        slot.config = config
         # Remove instance to force recreation with new config
-        if agent_id in self._agent_instances:
-            del self._agent_instances[agent_id]
+        slot.reset()
+        self._metadata_cache = None
     
     def list_available_agents(self) -> List[str]:
         """Get list of all available agent IDs"""
-        return list(self._agent_classes.keys())
+        return [agent_id for agent_id, slot in self._agents.items() if slot.agent_class is not None]
     
     def get_agent_metadata(self, agent_id: str) -> Dict[str, Any]:
         """Get metadata for a specific agent"""
-        agent = self.get_agent(agent_id)
-        return agent.get_metadata()
+        slot = self._get_slot(agent_id)
+        if slot.metadata is None:
+            slot.metadata = self.get_agent(agent_id).get_metadata()
+        return dict(slot.metadata)
     
     def list_all_agents_metadata(self) -> List[Dict[str, Any]]:
         """Get metadata for all available agents"""
-        metadata_list = []
-        for agent_id in self.list_available_agents():
-            try:
-                metadata = self.get_agent_metadata(agent_id)
+        if self._metadata_cache is None:
+            metadata_list = []
+            for agent_id in self.list_available_agents():
+                try:
+                    metadata = self.get_agent_metadata(agent_id)
+                except Exception as e:
+                    print(f"⚠️ Error getting metadata for {agent_id}: {e}")
+                    # Add basic metadata even if agent fails to initialize, and
+                    # keep it so the failing agent is not rebuilt on every listing
+                    metadata = {
+                        "id": agent_id,
+                        "name": agent_id.title(),
+                        "description": f"Agent {agent_id} (failed to load)",
+                        "capabilities": [],
+                        "error": str(e)
+                    }
+                    self._agents[agent_id].metadata = metadata
                 metadata_list.append(metadata)
-            except Exception as e:
-                print(f"⚠️ Error getting metadata for {agent_id}: {e}")
-                # Add basic metadata even if agent fails to initialize
-                metadata_list.append({
-                    "id": agent_id,
-                    "name": agent_id.title(),
-                    "description": f"Agent {agent_id} (failed to load)",
-                    "capabilities": [],
-                    "error": str(e)
-                })
-        return metadata_list
+            self._metadata_cache = metadata_list
+        return [dict(metadata) for metadata in self._metadata_cache]
     
     def find_agents_by_capability(self, capability: str) -> List[str]:
         """Find agents that support a specific capability"""
+        capability = capability.lower()
         matching_agents = []
-        for agent_id in self.list_available_agents():
+        for agent_id, slot in self._agents.items():
+            if slot.agent_class is None:
+                continue
             try:
-                agent = self.get_agent(agent_id)
-                if agent.supports_capability(capability):
+                capabilities = slot.capabilities
+                if capabilities is None:
+                    capabilities = self._get_agent_capabilities(agent_id)
+                if capabilities is None:
+                    # Legacy agent without declared capabilities
+                    if self.get_agent(agent_id).supports_capability(capability):
+                        matching_agents.append(agent_id)
+                elif capability in capabilities:
                     matching_agents.append(agent_id)
             except Exception as e:
                 print(f"⚠️ Error checking capability for {agent_id}: {e}")
@@ -160,8 +348,14 @@ class AgentRegistry:
     
     def reload_agents(self) -> None:
         """Reload all agents (useful for development)"""
-        self._agent_classes.clear()
-        self._agent_instances.clear()
+        # Keep configured agents' configs, everything else is rediscovered
+        for slot in self._agents.values():
+            slot.agent_class = None
+            slot.reset()
+        self._metadata_cache = None
+        _materialize.cache_clear()
+        _cached_import.cache_clear()
+        MANIFEST_PATH.unlink(missing_ok=True)
         self.discover_agents()
 
 
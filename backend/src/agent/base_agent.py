@@ -1,16 +1,31 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional, Generator, AsyncGenerator
+from typing import Dict, Any, List, Optional, FrozenSet, Generator, AsyncGenerator
 from .state import State
 
 class BaseAgent(ABC):
     """Base interface for all agents in the system"""
     
+    __slots__ = ('agent_id', 'config', 'temperature', 'model', 'default_tools', '_capabilities_lower')
+    
     def __init__(self, agent_id: str, config: Optional[Dict[str, Any]] = None):
         self.agent_id = agent_id
         self.config = config or {}
         self.temperature = self.config.get('temperature', 0.7)
-        self.model = self.config.get('model', 'gpt-3.5-turbo')
+        self.model = self.resolve_model(self.config)
         self.default_tools = self.config.get('default_tools', [])
+        self._capabilities_lower: Optional[FrozenSet[str]] = None  # built on first supports_capability()
+    
+    @staticmethod
+    def resolve_model(config: Dict[str, Any], default: str = 'gpt-3.5-turbo') -> str:
+        """Pick the served model, preferring the latency variant for latency-tier agents
+        
+        A config with "quality_tier": "latency" and a "latency_model" (for example a
+        BF16 or INT8 checkpoint on a self-hosted OpenAI-compatible endpoint) uses that
+        model; everything else uses "model".
+        """
+        if config.get('quality_tier') == 'latency' and config.get('latency_model'):
+            return config['latency_model']
+        return config.get('model', default)
     
     @abstractmethod
     def get_name(self) -> str:
@@ -27,6 +42,11 @@ class BaseAgent(ABC):
         """Return list of agent capabilities for intelligent routing"""
         pass
     
+    @classmethod
+    def declared_capabilities(cls) -> Optional[List[str]]:
+        """Return capabilities known without instantiating the agent, if any"""
+        return None
+    
     @abstractmethod
     def get_system_prompt(self) -> str:
         """Return agent's system prompt"""
@@ -59,7 +79,9 @@ class BaseAgent(ABC):
     
     def supports_capability(self, capability: str) -> bool:
         """Check if agent supports a specific capability"""
-        return capability.lower() in [cap.lower() for cap in self.get_capabilities()]
+        if self._capabilities_lower is None:
+            self._capabilities_lower = frozenset(cap.lower() for cap in self.get_capabilities())
+        return capability.lower() in self._capabilities_lower
     
     def get_routing_keywords(self) -> List[str]:
         """Return keywords that should route to this agent"""
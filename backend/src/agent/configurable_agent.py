@@ -1,16 +1,74 @@
-from typing import Dict, Any, List, Optional, Generator
-from langchain_openai import ChatOpenAI
-from langchain.schema import SystemMessage, HumanMessage
+from typing import Dict, Any, List, Optional, Generator, Tuple
 from .base_agent import BaseAgent
 from .state import State
 from .skills.skill_manager import SkillManager
+import functools
 import json
+import logging
 import os
+import re
+import threading
+from pathlib import Path
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    def _loads(data: bytes) -> Any:
+        return json.loads(data.decode('utf-8'))
+
+logger = logging.getLogger(__name__)
+
+# Prompt terms that suggest the request needs fresh web information
+_RESEARCH_INDICATORS = frozenset({
+    "weather", "news", "current", "latest", "recent", "information",
+    "search", "find", "research", "data", "analyze", "report",
+    "temperature", "climate", "forecast", "today", "yesterday",
+    "last week", "this week", "bucharest", "romania", "city"
+})
+
+# Single-pass scan for any research indicator (substring semantics, like `in`)
+_RESEARCH_INDICATOR_RE = re.compile("|".join(map(re.escape, sorted(_RESEARCH_INDICATORS))))
+
+# Words dropped when extracting a search query from the prompt
+_STOP_WORDS = frozenset({
+    "the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for", "of",
+    "with", "by", "about", "make", "me", "tell", "let"
+})
+
+_WORD_RE = re.compile(r'\b\w+\b')
+
+# Canned search queries, first rule whose keywords all appear in the prompt wins.
+# Keywords are word stems: each must start some word, so "analyzed" or "weathers" match
+_QUERY_RULES = (
+    # Weather in a specific location
+    (frozenset({"weather", "bucharest"}), "weather Bucharest Romania current forecast"),
+    (frozenset({"weather", "romania"}), "weather Romania current forecast"),
+    (frozenset({"weather"}), "weather current forecast"),
+    # Analysis of something specific
+    (frozenset({"analy", "data"}), "data analysis information"),
+)
+
+# Maps each word of the prompt to the rule stem it starts with, longest stem first
+_QUERY_STEM_RE = re.compile(r'\b(' + "|".join(
+    map(re.escape, sorted({stem for keywords, _ in _QUERY_RULES for stem in keywords}, key=len, reverse=True))
+) + r')')
 
 
 class ConfigurableAgent(BaseAgent):
     """Agent that loads its behavior from JSON configuration"""
     
+    __slots__ = (
+        'agent_config', '_name', '_description', '_capabilities', '_system_prompt',
+        '_routing_keywords', '_category', '_version', 'max_tokens', '_llm',
+        'skill_manager', '_system_prompt_cached', '_metadata_cached'
+    )
+    
+    # ChatOpenAI clients shared by agents with the same (model, temperature, streaming),
+    # so their HTTP connection pools are reused across agents
+    _llm_pool: Dict[Tuple[str, float, bool], Any] = {}
+    _llm_pool_lock = threading.Lock()
+    
     def __init__(self, agent_id: str, config: Dict[str, Any], skills_config: Optional[Dict[str, Any]] = None):
         # Initialize with config from JSON
         super().__init__(agent_id, config.get('parameters', {}))
@@ -20,6 +78,7 @@ class ConfigurableAgent(BaseAgent):
         self._name = config.get('name', agent_id.title())
         self._description = config.get('description', f'Agent {agent_id}')
         self._capabilities = config.get('capabilities', [])
+        self._capabilities_lower = frozenset(cap.lower() for cap in self._capabilities)
         self._system_prompt = config.get('system_prompt', f'You are {self._name}.')
         self._routing_keywords = config.get('routing_keywords', [])
         self._category = config.get('category', 'general')
@@ -28,7 +87,7 @@ class ConfigurableAgent(BaseAgent):
         # Load parameters
         params = config.get('parameters', {})
         self.temperature = params.get('temperature', 0.7)
-        self.model = params.get('model', 'gpt-3.5-turbo')
+        self.model = self.resolve_model(params)
         self.max_tokens = params.get('max_tokens', 2000)
         
         # LLM will be initialized lazily when needed
@@ -37,16 +96,28 @@ class ConfigurableAgent(BaseAgent):
         # Initialize skills manager
         agent_skills = config.get('skills', [])
         self.skill_manager = SkillManager(agent_skills, skills_config or {})
+        
+        # Built on first use; config reloads create new agent instances rather than mutating this one
+        self._system_prompt_cached: Optional[str] = None
+        self._metadata_cached: Optional[Dict[str, Any]] = None
     
     @property
     def llm(self):
         """Lazy initialization of LLM"""
         if self._llm is None:
-            self._llm = ChatOpenAI(
-                model=self.model,
-                temperature=self.temperature,
-                streaming=True
-            )
+            key = (self.model, self.temperature, True)
+            with ConfigurableAgent._llm_pool_lock:
+                llm = ConfigurableAgent._llm_pool.get(key)
+                if llm is None:
+                    # Imported here so langchain_openai only loads once an agent is used
+                    from langchain_openai import ChatOpenAI
+                    llm = ChatOpenAI(
+                        model=self.model,
+                        temperature=self.temperature,
+                        streaming=True
+                    )
+                    ConfigurableAgent._llm_pool[key] = llm
+            self._llm = llm
         return self._llm
     
     def get_name(self) -> str:
@@ -59,14 +130,17 @@ class ConfigurableAgent(BaseAgent):
         return self._capabilities.copy()
     
     def get_system_prompt(self) -> str:
+        if self._system_prompt_cached is not None:
+            return self._system_prompt_cached
+        
         # Build enhanced system prompt with skills information
         base_prompt = self._system_prompt
         
         if self.skill_manager.has_skills():
             skills_info = self.skill_manager.get_skills_description()
-            enhanced_prompt = f"{base_prompt}\n\nYou have access to the following specialized skills:\n{skills_info}\n\nUse these skills when appropriate to enhance your responses."
-            return enhanced_prompt
+            base_prompt = f"{base_prompt}\n\nYou have access to the following specialized skills:\n{skills_info}\n\nUse these skills when appropriate to enhance your responses."
         
+        self._system_prompt_cached = base_prompt
         return base_prompt
     
     def get_routing_keywords(self) -> List[str]:
@@ -86,19 +160,21 @@ class ConfigurableAgent(BaseAgent):
     
     def process_request(self, state: State) -> Dict[str, Any]:
         """Process user request and return response (non-streaming)"""
-        print(f"🎮 CONTROL FLOW: Agent {self.agent_id} has control, starting request processing")
+        from langchain.schema import SystemMessage, HumanMessage
+        
+        logger.debug("🎮 CONTROL FLOW: Agent %s has control, starting request processing", self.agent_id)
         
         # Build context for the agent
         context = self._build_context(state)
-        print(f"🎮 CONTROL FLOW: Agent {self.agent_id} built context from state")
+        logger.debug("🎮 CONTROL FLOW: Agent %s built context from state", self.agent_id)
         
         # Execute any relevant skills based on the request
-        print(f"🎮 CONTROL FLOW: Agent {self.agent_id} checking for relevant skills to execute")
+        logger.debug("🎮 CONTROL FLOW: Agent %s checking for relevant skills to execute", self.agent_id)
         self._execute_relevant_skills(state)
         
         # Build the final prompt
         prompt = self._build_prompt(state, context)
-        print(f"🎮 CONTROL FLOW: Agent {self.agent_id} built final prompt, calling LLM")
+        logger.debug("🎮 CONTROL FLOW: Agent %s built final prompt, calling LLM", self.agent_id)
         
         # Generate response
         messages = [
@@ -108,12 +184,14 @@ class ConfigurableAgent(BaseAgent):
         
         result = self.llm.invoke(messages)
         output_text = str(result.content) if result.content else ""
-        print(f"🎮 CONTROL FLOW: Agent {self.agent_id} received LLM response, preparing to return control")
+        logger.debug("🎮 CONTROL FLOW: Agent %s received LLM response, preparing to return control", self.agent_id)
+        
+        executed_skills = self.skill_manager.get_executed_skills()
         
         # Update state
         state.set_agent_output(self.agent_id, output_text, {
             "agent_type": "configurable",
-            "skills_used": self.skill_manager.get_executed_skills(),
+            "skills_used": executed_skills,
             "model": self.model,
             "temperature": self.temperature,
             "category": self._category,
@@ -121,30 +199,32 @@ class ConfigurableAgent(BaseAgent):
         })
         
         # Log final result
-        tools_used = list(state.tool_outputs.keys()) if state.tool_outputs else []
-        if tools_used:
-            print(f"🎮 CONTROL FLOW: Agent {self.agent_id} used tools: {tools_used}")
-        else:
-            print(f"🎮 CONTROL FLOW: Agent {self.agent_id} did not use any tools")
-        
-        skills_used = self.skill_manager.get_executed_skills()
-        if skills_used:
-            print(f"🎮 CONTROL FLOW: Agent {self.agent_id} executed skills: {skills_used}")
-        else:
-            print(f"🎮 CONTROL FLOW: Agent {self.agent_id} did not execute any skills")
+        if logger.isEnabledFor(logging.DEBUG):
+            tools_used = list(state.tool_outputs.keys()) if state.tool_outputs else []
+            if tools_used:
+                logger.debug("🎮 CONTROL FLOW: Agent %s used tools: %s", self.agent_id, tools_used)
+            else:
+                logger.debug("🎮 CONTROL FLOW: Agent %s did not use any tools", self.agent_id)
+            
+            if executed_skills:
+                logger.debug("🎮 CONTROL FLOW: Agent %s executed skills: %s", self.agent_id, executed_skills)
+            else:
+                logger.debug("🎮 CONTROL FLOW: Agent %s did not execute any skills", self.agent_id)
         
-        print(f"🎮 CONTROL FLOW: Agent {self.agent_id} completed processing, ready to return control")
+        logger.debug("🎮 CONTROL FLOW: Agent %s completed processing, ready to return control", self.agent_id)
         
         return {
             "output": output_text,
             "agent_id": self.agent_id,
-            "skills_used": self.skill_manager.get_executed_skills(),
+            "skills_used": executed_skills,
             "tool_outputs": state.tool_outputs,  # Include tool outputs that were executed
             "category": self._category
         }
     
     def process_request_stream(self, state: State) -> Generator[str, None, None]:
         """Process user request and yield streaming response"""
+        from langchain.schema import SystemMessage, HumanMessage
+        
         # Build context for the agent
         context = self._build_context(state)
         
@@ -160,12 +240,14 @@ class ConfigurableAgent(BaseAgent):
             HumanMessage(content=prompt)
         ]
         
-        full_response = ""
+        response_chunks = []
         for chunk in self.llm.stream(messages):
-            if hasattr(chunk, 'content') and chunk.content:
-                content_str = str(chunk.content)
-                full_response += content_str
+            content = getattr(chunk, 'content', None)
+            if content:
+                content_str = str(content)
+                response_chunks.append(content_str)
                 yield content_str
+        full_response = "".join(response_chunks)
         
         # Update state after streaming
         state.set_agent_output(self.agent_id, full_response, {
@@ -188,88 +270,69 @@ class ConfigurableAgent(BaseAgent):
         
         # Check if this agent has skills and if they're relevant
         if not self.skill_manager.has_skills():
-            print(f"🎮 CONTROL FLOW: Agent {self.agent_id} has no skills available")
+            logger.debug("🎮 CONTROL FLOW: Agent %s has no skills available", self.agent_id)
             return
         
-        available_skills = self.skill_manager.get_skill_names()
-        print(f"🎮 CONTROL FLOW: Agent {self.agent_id} has skills available: {available_skills}")
+        if logger.isEnabledFor(logging.DEBUG):
+            available_skills = self.skill_manager.get_skill_names()
+            logger.debug("🎮 CONTROL FLOW: Agent %s has skills available: %s", self.agent_id, available_skills)
         
         # Determine if web research is needed
         if self.skill_manager.has_skill("web_research"):
-            research_indicators = [
-                "weather", "news", "current", "latest", "recent", "information",
-                "search", "find", "research", "data", "analyze", "report",
-                "temperature", "climate", "forecast", "today", "yesterday",
-                "last week", "this week", "bucharest", "romania", "city"
-            ]
-            
-            needs_research = any(indicator in user_prompt for indicator in research_indicators)
+            needs_research = _RESEARCH_INDICATOR_RE.search(user_prompt) is not None
             
             if needs_research:
-                print(f"🎮 CONTROL FLOW: Agent {self.agent_id} detected need for web research")
+                logger.debug("🎮 CONTROL FLOW: Agent %s detected need for web research", self.agent_id)
                 # Extract potential search query from the request
                 search_query = self._extract_search_query(state.user_prompt)
                 if search_query:
                     try:
-                        print(f"🎮 CONTROL FLOW: Agent {self.agent_id} executing web_research skill")
-                        print(f"🔍 DEBUG: Agent {self.agent_id} executing web_research skill with query: {search_query}")
-                        print(f"🎮 CONTROL FLOW: - Agent {self.agent_id} delegating to web_research skill")
-                        print(f"🎮 CONTROL FLOW: - web_research skill will call web search tool")
+                        logger.debug("🎮 CONTROL FLOW: Agent %s executing web_research skill", self.agent_id)
+                        logger.debug("🔍 DEBUG: Agent %s executing web_research skill with query: %s", self.agent_id, search_query)
+                        logger.debug("🎮 CONTROL FLOW: - Agent %s delegating to web_research skill", self.agent_id)
+                        logger.debug("🎮 CONTROL FLOW: - web_research skill will call web search tool")
                         
                         research_result = self.skill_manager.execute_skill("web_research", search_query)
                         
-                        print(f"🎮 CONTROL FLOW: - web_research skill completed, returning control to {self.agent_id}")
-                        print(f"🔍 DEBUG: Web research completed for {self.agent_id}")
+                        logger.debug("🎮 CONTROL FLOW: - web_research skill completed, returning control to %s", self.agent_id)
+                        logger.debug("🔍 DEBUG: Web research completed for %s", self.agent_id)
                         
                         # Store tool result in state for later use
                         if isinstance(research_result, dict) and research_result.get("success"):
                             state.tool_outputs["web_search"] = research_result
-                            print(f"🎮 CONTROL FLOW: Agent {self.agent_id} stored web search results in state")
-                            print(f"🔍 DEBUG: Stored web research result in state")
+                            logger.debug("🎮 CONTROL FLOW: Agent %s stored web search results in state", self.agent_id)
+                            logger.debug("🔍 DEBUG: Stored web research result in state")
                         else:
-                            print(f"🎮 CONTROL FLOW: Agent {self.agent_id} web research failed or returned no results")
+                            logger.debug("🎮 CONTROL FLOW: Agent %s web research failed or returned no results", self.agent_id)
                         
                     except Exception as e:
-                        print(f"🎮 CONTROL FLOW: Agent {self.agent_id} web research failed with exception: {e}")
-                        print(f"⚠️ Web research skill failed for {self.agent_id}: {e}")
+                        logger.debug("🎮 CONTROL FLOW: Agent %s web research failed with exception: %s", self.agent_id, e)
+                        logger.warning("⚠️ Web research skill failed for %s: %s", self.agent_id, e)
                 else:
-                    print(f"🎮 CONTROL FLOW: Agent {self.agent_id} could not extract search query from request")
+                    logger.debug("🎮 CONTROL FLOW: Agent %s could not extract search query from request", self.agent_id)
             else:
-                print(f"🎮 CONTROL FLOW: Agent {self.agent_id} determined web research not needed")
+                logger.debug("🎮 CONTROL FLOW: Agent %s determined web research not needed", self.agent_id)
         else:
-            print(f"🎮 CONTROL FLOW: Agent {self.agent_id} does not have web_research skill")
+            logger.debug("🎮 CONTROL FLOW: Agent %s does not have web_research skill", self.agent_id)
     
-    def _extract_search_query(self, user_prompt: str) -> str:
+    @staticmethod
+    def _extract_search_query(user_prompt: str) -> str:
         """Extract a search query from the user prompt"""
         # For now, use a simple extraction
         # This could be enhanced with more sophisticated NLP
         
         # Look for specific patterns that indicate what to search for
         prompt_lower = user_prompt.lower()
+        words = _WORD_RE.findall(prompt_lower)
+        stems = set(_QUERY_STEM_RE.findall(prompt_lower))
         
-        # If asking about weather in a specific location
-        if "weather" in prompt_lower:
-            if "bucharest" in prompt_lower:
-                return "weather Bucharest Romania current forecast"
-            elif "romania" in prompt_lower:
-                return "weather Romania current forecast"
-            else:
-                return "weather current forecast"
-        
-        # If asking for analysis of something specific
-        if "analysis" in prompt_lower or "analyze" in prompt_lower:
-            if "weather" in prompt_lower:
-                return "weather analysis forecast data"
-            elif "data" in prompt_lower:
-                return "data analysis information"
+        for keywords, query in _QUERY_RULES:
+            if keywords <= stems:
+                return query
         
         # For general information requests, extract key terms
-        import re
-        
         # Remove common stop words and extract meaningful terms
-        stop_words = {"the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for", "of", "with", "by", "about", "make", "me", "tell", "let"}
-        words = re.findall(r'\b\w+\b', user_prompt.lower())
-        meaningful_words = [word for word in words if word not in stop_words and len(word) > 2]
+        meaningful_words = [word for word in words if word not in _STOP_WORDS and len(word) > 2]
         
         # Take the most important words (first few after filtering)
         if meaningful_words:
@@ -279,34 +342,51 @@ class ConfigurableAgent(BaseAgent):
     
     def _build_prompt(self, state: State, context: str) -> str:
         """Build the complete prompt for the agent"""
+        user_prompt = state.user_prompt
+        skills_results = self.skill_manager.get_execution_results()
+        
+        # Common case: no conversation context and no skills were executed
+        if not context and not skills_results:
+            return f"Current Request: {user_prompt}"
+        
         prompt_parts = []
         
         # Add conversation context
         if context:
-            prompt_parts.append(f"Context:\n{context}")
+            prompt_parts.append(f"Context:\n{context}\n\n")
         
         # Add skills results if any were executed
-        skills_results = self.skill_manager.get_execution_results()
         if skills_results:
-            prompt_parts.append(f"Skills Results:\n{skills_results}")
+            prompt_parts.append(f"Skills Results:\n{skills_results}\n\n")
         
         # Add current request
-        prompt_parts.append(f"Current Request: {state.user_prompt}")
+        prompt_parts.append(f"Current Request: {user_prompt}")
         
-        return "\n\n".join(prompt_parts)
+        return "".join(prompt_parts)
     
     def get_metadata(self) -> Dict[str, Any]:
         """Return enhanced metadata including skills and configuration"""
-        base_metadata = super().get_metadata()
-        base_metadata.update({
-            "skills": self.get_skills(),
-            "category": self._category,
-            "version": self._version,
-            "configuration_source": "json",
-            "max_tokens": self.max_tokens,
-            "skill_count": len(self.get_skills())
-        })
-        return base_metadata
+        if self._metadata_cached is None:
+            skills = self.get_skills()
+            base_metadata = super().get_metadata()
+            base_metadata.update({
+                "skills": skills,
+                "category": self._category,
+                "version": self._version,
+                "configuration_source": "json",
+                "max_tokens": self.max_tokens,
+                "skill_count": len(skills)
+            })
+            self._metadata_cached = base_metadata
+        
+        # Shallow copy so callers can add registry-specific keys
+        return dict(self._metadata_cached)
+
+
+@functools.lru_cache(maxsize=8)
+def _parse_config(config_path: str, mtime_ns: int) -> Dict[str, Any]:
+    """Parse a JSON config file, cached until the file's mtime changes"""
+    return _loads(Path(config_path).read_bytes())
 
 
 def load_agents_from_config(config_path: Optional[str] = None) -> Dict[str, ConfigurableAgent]:
@@ -315,8 +395,7 @@ def load_agents_from_config(config_path: Optional[str] = None) -> Dict[str, Conf
         config_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'agents_config.json')
     
     try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config_data = json.load(f)
+        config_data = _parse_config(config_path, os.stat(config_path).st_mtime_ns)
         
         agents = {}
         agents_config = config_data.get('agents', {})
@@ -1,15 +1,35 @@
 import importlib
 import inspect
+import logging
 import os
+import sys
+import threading
 from pathlib import Path
+from types import ModuleType
 from typing import Dict, Type, List, Optional, Any, Union
 from .base_agent import BaseAgent
 from .configurable_agent import ConfigurableAgent, load_agents_from_config
 
+logger = logging.getLogger(__name__)
+
+# Directory entries that never contain agents
+_IGNORED_DIRS = frozenset({'__pycache__', '.git', 'skills'})
+
+
+def _cached_import(module_name: str) -> ModuleType:
+    """Import a module, reusing sys.modules when it is already loaded"""
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+    return importlib.import_module(module_name)
+
 
 class EnhancedAgentRegistry:
     """Enhanced registry supporting both file-based and JSON-configured agents"""
     
+    # agent_id → module path that imported successfully, so reloads skip the other candidates
+    _module_paths: Dict[str, str] = {}
+    
     def __init__(self, config_path: str = None):
         self.config_path = config_path
         
@@ -21,14 +41,24 @@ class EnhancedAgentRegistry:
         # JSON-configured agents
         self._json_agents: Dict[str, ConfigurableAgent] = {}
         
-        # Combined registry
-        self._all_agents: Dict[str, BaseAgent] = {}
+        # Lowercased capability → agent IDs, built on first capability search
+        self._capability_index: Optional[Dict[str, List[str]]] = None
         
-        self.load_all_agents()
+        # Agents are loaded on first use rather than at construction
+        self._loaded = False
+        self._load_lock = threading.Lock()
+    
+    def _ensure_loaded(self) -> None:
+        """Load agents on first use"""
+        if not self._loaded:
+            with self._load_lock:
+                if not self._loaded:
+                    self.load_all_agents()
     
     def load_all_agents(self) -> None:
         """Load agents from both file system and JSON configuration"""
-        print("🔄 Loading agents from multiple sources...")
+        logger.info("🔄 Loading agents from multiple sources...")
+        self._capability_index = None
         
         # Load file-based agents
         self.discover_file_agents()
@@ -36,47 +66,52 @@ class EnhancedAgentRegistry:
         # Load JSON-configured agents
         self.load_json_agents()
         
-        # Update combined registry
-        self._update_combined_registry()
-        
-        total_agents = len(self._all_agents)
-        print(f"✅ Total agents loaded: {total_agents}")
+        # File agents are instantiated on first get_agent() call
+        total_agents = len(self._agent_ids())
+        logger.info("✅ Total agents loaded: %d", total_agents)
+        self._loaded = True
     
     def discover_file_agents(self) -> None:
         """Discover traditional file-based agents"""
         current_dir = Path(__file__).parent
         agent_files = []
         
-        # Look for agent files in current directory and subdirectories
-        for item in current_dir.iterdir():
-            if item.is_file() and item.name.endswith('_agent.py') and item.name != 'base_agent.py':
-                agent_files.append(item)
-            elif item.is_dir() and item.name not in ['__pycache__', '.git', 'skills']:
-                # Look for agent.py files in subdirectories
-                agent_file = item / 'agent.py'
-                if agent_file.exists():
-                    agent_files.append(agent_file)
+        # Look for agent files in current directory and subdirectories;
+        # DirEntry caches its type so each entry costs at most one stat
+        with os.scandir(current_dir) as it:
+            for entry in it:
+                name = entry.name
+                if name in _IGNORED_DIRS:
+                    continue
+                if name.endswith('_agent.py'):
+                    if name != 'base_agent.py' and entry.is_file(follow_symlinks=False):
+                        agent_files.append(Path(entry.path))
+                elif entry.is_dir(follow_symlinks=False):
+                    # Look for agent.py files in subdirectories
+                    agent_file = os.path.join(entry.path, 'agent.py')
+                    if os.path.isfile(agent_file):
+                        agent_files.append(Path(agent_file))
         
-        print(f"🔍 Discovering file-based agents in {current_dir}")
+        logger.info("🔍 Discovering file-based agents in %s", current_dir)
         
         for agent_file in agent_files:
             try:
                 self._load_file_agent(agent_file)
             except Exception as e:
-                print(f"⚠️ Failed to load file agent from {agent_file}: {e}")
+                logger.warning("⚠️ Failed to load file agent from %s: %s", agent_file, e)
     
     def load_json_agents(self) -> None:
         """Load JSON-configured agents"""
-        print("🔍 Loading JSON-configured agents...")
+        logger.info("🔍 Loading JSON-configured agents...")
         
         try:
             json_agents = load_agents_from_config(self.config_path)
             self._json_agents.update(json_agents)
             
-            print(f"✓ Loaded {len(json_agents)} JSON-configured agents")
+            logger.info("✓ Loaded %d JSON-configured agents", len(json_agents))
             
         except Exception as e:
-            print(f"⚠️ Error loading JSON agents: {e}")
+            logger.warning("⚠️ Error loading JSON agents: %s", e)
     
     def _load_file_agent(self, agent_file: Path) -> None:
         """Load agent class from a Python file"""
@@ -91,53 +126,44 @@ class EnhancedAgentRegistry:
             agent_id = relative_path.stem.replace('_agent', '')
             module_name = f"agent.{agent_id}_agent"
         
-        # Try different module path strategies
+        # Try different module path strategies, starting with the one that worked last time
         module_paths_to_try = [
             module_name,
             f"backend.src.{module_name}",
             f"src.{module_name}",
         ]
+        known_path = EnhancedAgentRegistry._module_paths.get(agent_id)
+        if known_path is not None:
+            module_paths_to_try.remove(known_path)
+            module_paths_to_try.insert(0, known_path)
         
         module = None
         for module_path in module_paths_to_try:
             try:
-                module = importlib.import_module(module_path)
+                module = _cached_import(module_path)
+                EnhancedAgentRegistry._module_paths[agent_id] = module_path
                 break
             except ImportError:
                 continue
         
         if module is None:
-            print(f"⚠️ Failed to import file agent module: {module_paths_to_try}")
+            logger.warning("⚠️ Failed to import file agent module: %s", module_paths_to_try)
             return
         
-        # Find BaseAgent subclasses in the module
-        for name, obj in inspect.getmembers(module):
+        # Find BaseAgent subclasses in the module (first match wins, so no sorting needed)
+        for name, obj in module.__dict__.items():
             if (inspect.isclass(obj) and 
                 issubclass(obj, BaseAgent) and 
                 obj != BaseAgent and 
                 obj != ConfigurableAgent):
                 
                 self._file_agent_classes[agent_id] = obj
-                print(f"✓ Discovered file agent: {agent_id} ({obj.__name__})")
+                logger.info("✓ Discovered file agent: %s (%s)", agent_id, obj.__name__)
                 break
     
-    def _update_combined_registry(self) -> None:
-        """Update the combined registry with all agents"""
-        self._all_agents.clear()
-        
-        # Add file-based agent instances
-        for agent_id in self._file_agent_classes.keys():
-            try:
-                agent = self.get_file_agent(agent_id)
-                self._all_agents[agent_id] = agent
-            except Exception as e:
-                print(f"⚠️ Error adding file agent {agent_id} to combined registry: {e}")
-        
-        # Add JSON-configured agents
-        self._all_agents.update(self._json_agents)
-    
     def get_file_agent(self, agent_id: str) -> BaseAgent:
         """Get file-based agent instance (singleton per agent_id)"""
+        self._ensure_loaded()
         if agent_id not in self._file_agent_instances:
             if agent_id not in self._file_agent_classes:
                 raise ValueError(f"Unknown file agent: {agent_id}")
@@ -150,25 +176,39 @@ class EnhancedAgentRegistry:
     
     def get_agent(self, agent_id: str) -> BaseAgent:
         """Get any agent (file-based or JSON-configured)"""
-        if agent_id not in self._all_agents:
-            raise ValueError(f"Unknown agent: {agent_id}. Available: {list(self._all_agents.keys())}")
+        self._ensure_loaded()
+        # JSON-configured agents take precedence over file agents with the same id
+        agent = self._json_agents.get(agent_id)
+        if agent is not None:
+            return agent
         
-        return self._all_agents[agent_id]
+        if agent_id not in self._file_agent_classes:
+            raise ValueError(f"Unknown agent: {agent_id}. Available: {self.list_available_agents()}")
+        
+        return self.get_file_agent(agent_id)
+    
+    def _agent_ids(self) -> List[str]:
+        # dict.fromkeys keeps discovery order and drops ids defined by both sources
+        return list(dict.fromkeys([*self._file_agent_classes, *self._json_agents]))
     
     def list_available_agents(self) -> List[str]:
         """Get list of all available agent IDs"""
-        return list(self._all_agents.keys())
+        self._ensure_loaded()
+        return self._agent_ids()
     
     def list_file_agents(self) -> List[str]:
         """Get list of file-based agent IDs"""
+        self._ensure_loaded()
         return list(self._file_agent_classes.keys())
     
     def list_json_agents(self) -> List[str]:
         """Get list of JSON-configured agent IDs"""
+        self._ensure_loaded()
         return list(self._json_agents.keys())
     
     def get_agent_type(self, agent_id: str) -> str:
         """Get agent type (file or json)"""
+        self._ensure_loaded()
         if agent_id in self._json_agents:
             return "json"
         elif agent_id in self._file_agent_classes:
@@ -189,9 +229,10 @@ class EnhancedAgentRegistry:
         
         # Add skills info for JSON agents
         if isinstance(agent, ConfigurableAgent):
+            skills = agent.get_skills()
             metadata.update({
-                "skills": agent.get_skills(),
-                "skill_count": len(agent.get_skills())
+                "skills": skills,
+                "skill_count": len(skills)
             })
         
         return metadata
@@ -204,7 +245,7 @@ class EnhancedAgentRegistry:
                 metadata = self.get_agent_metadata(agent_id)
                 metadata_list.append(metadata)
             except Exception as e:
-                print(f"⚠️ Error getting metadata for {agent_id}: {e}")
+                logger.warning("⚠️ Error getting metadata for %s: %s", agent_id, e)
                 metadata_list.append({
                     "id": agent_id,
                     "name": agent_id.title(),
@@ -215,20 +256,38 @@ class EnhancedAgentRegistry:
                 })
         return metadata_list
     
-    def find_agents_by_capability(self, capability: str) -> List[str]:
-        """Find agents that support a specific capability"""
-        matching_agents = []
+    def _get_agent_capabilities(self, agent_id: str) -> List[str]:
+        """Get capabilities, avoiding file agent instantiation when the class declares them"""
+        agent = self._json_agents.get(agent_id)
+        if agent is not None:
+            return agent.get_capabilities()
+        
+        capabilities = self._file_agent_classes[agent_id].declared_capabilities()
+        if capabilities is None:
+            capabilities = self.get_file_agent(agent_id).get_capabilities()
+        return capabilities
+    
+    def _build_capability_index(self) -> Dict[str, List[str]]:
+        """Build the capability → agent IDs index"""
+        index: Dict[str, List[str]] = {}
         for agent_id in self.list_available_agents():
             try:
-                agent = self.get_agent(agent_id)
-                if agent.supports_capability(capability):
-                    matching_agents.append(agent_id)
+                for capability in {cap.lower() for cap in self._get_agent_capabilities(agent_id)}:
+                    index.setdefault(capability, []).append(agent_id)
             except Exception as e:
-                print(f"⚠️ Error checking capability for {agent_id}: {e}")
-        return matching_agents
+                logger.warning("⚠️ Error checking capability for %s: %s", agent_id, e)
+        return index
+    
+    def find_agents_by_capability(self, capability: str) -> List[str]:
+        """Find agents that support a specific capability"""
+        self._ensure_loaded()
+        if self._capability_index is None:
+            self._capability_index = self._build_capability_index()
+        return list(self._capability_index.get(capability.lower(), ()))
     
     def find_agents_by_skill(self, skill_name: str) -> List[str]:
         """Find JSON agents that have a specific skill"""
+        self._ensure_loaded()
         matching_agents = []
         for agent_id, agent in self._json_agents.items():
             if agent.has_skill(skill_name):
@@ -237,29 +296,38 @@ class EnhancedAgentRegistry:
     
     def reload_agents(self) -> None:
         """Reload all agents"""
-        print("🔄 Reloading all agents...")
+        logger.info("🔄 Reloading all agents...")
         
         # Clear all registries
         self._file_agent_classes.clear()
         self._file_agent_instances.clear()
         self._json_agents.clear()
-        self._all_agents.clear()
         
         # Reload everything
         self.load_all_agents()
     
     def set_agent_config(self, agent_id: str, config: Dict[str, Any]) -> None:
         """Set configuration for a file-based agent"""
+        self._ensure_loaded()
         if agent_id in self._file_agent_classes:
             self._file_agent_configs[agent_id] = config
             # Remove instance to force recreation with new config
             if agent_id in self._file_agent_instances:
                 del self._file_agent_instances[agent_id]
-            # Update combined registry
-            self._update_combined_registry()
+            self._capability_index = None
         else:
-            print(f"⚠️ Cannot set config for non-file agent: {agent_id}")
+            logger.warning("⚠️ Cannot set config for non-file agent: %s", agent_id)
+
+
+_enhanced_agent_registry: Optional[EnhancedAgentRegistry] = None
 
 
-# Global enhanced registry instance
-enhanced_agent_registry = EnhancedAgentRegistry() 
\ No newline at end of file
+def __getattr__(name: str) -> Any:
+    # The app runs on the JSON-only registry in enhanced_registry.py, so the
+    # global file+JSON registry is only built when something asks for it
+    global _enhanced_agent_registry
+    if name == "enhanced_agent_registry":
+        if _enhanced_agent_registry is None:
+            _enhanced_agent_registry = EnhancedAgentRegistry()
+        return _enhanced_agent_registry
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}") 
\ No newline at end of file
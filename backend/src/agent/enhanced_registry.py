@@ -1,6 +1,7 @@
 """
 Simplified Agent Registry - JSON-configured agents only
 """
+import threading
 from typing import Dict, List, Optional, Any
 from .base_agent import BaseAgent
 from .configurable_agent import ConfigurableAgent, load_agents_from_config
@@ -15,17 +16,31 @@ class EnhancedAgentRegistry:
         # JSON-configured agents
         self._json_agents: Dict[str, ConfigurableAgent] = {}
         
-        self.load_all_agents()
+        # Lowercased capability → agent IDs, built on first capability search
+        self._capability_index: Optional[Dict[str, List[str]]] = None
+        
+        # Agents are loaded on first use rather than at import time
+        self._loaded = False
+        self._load_lock = threading.Lock()
+    
+    def _ensure_loaded(self) -> None:
+        """Load agents on first use"""
+        if not self._loaded:
+            with self._load_lock:
+                if not self._loaded:
+                    self.load_all_agents()
     
     def load_all_agents(self) -> None:
         """Load agents from JSON configuration"""
         print("🔄 Loading JSON-configured agents...")
+        self._capability_index = None
         
         # Load JSON-configured agents
         self.load_json_agents()
         
         total_agents = len(self._json_agents)
         print(f"✅ Total agents loaded: {total_agents}")
+        self._loaded = True
     
     def load_json_agents(self) -> None:
         """Load JSON-configured agents"""
@@ -49,6 +64,7 @@ class EnhancedAgentRegistry:
     
     def get_agent(self, agent_id: str) -> ConfigurableAgent:
         """Get agent by ID"""
+        self._ensure_loaded()
         if agent_id not in self._json_agents:
             available = list(self._json_agents.keys())
             raise ValueError(f"Unknown agent: {agent_id}. Available: {available}")
@@ -57,10 +73,12 @@ class EnhancedAgentRegistry:
     
     def list_available_agents(self) -> List[str]:
         """Get list of all available agent IDs"""
+        self._ensure_loaded()
         return list(self._json_agents.keys())
     
     def get_agent_type(self, agent_id: str) -> str:
         """Get agent type (always 'json' for this registry)"""
+        self._ensure_loaded()
         if agent_id in self._json_agents:
             return "json"
         else:
@@ -70,31 +88,35 @@ class EnhancedAgentRegistry:
         """Get metadata for a specific agent"""
         agent = self.get_agent(agent_id)
         metadata = agent.get_metadata()
+        skills = agent.get_skills()
         
         # Add registry-specific metadata
         metadata.update({
             "agent_type": "json",
             "registry": "enhanced",
-            "skills": agent.get_skills(),
-            "skill_count": len(agent.get_skills())
+            "skills": skills,
+            "skill_count": len(skills)
         })
         
         return metadata
     
     def find_agents_by_capability(self, capability: str) -> List[str]:
         """Find agents that support a specific capability"""
-        matching_agents = []
-        for agent_id in self.list_available_agents():
-            try:
-                agent = self.get_agent(agent_id)
-                if agent.supports_capability(capability):
-                    matching_agents.append(agent_id)
-            except Exception as e:
-                print(f"⚠️ Error checking capability for {agent_id}: {e}")
-        return matching_agents
+        self._ensure_loaded()
+        if self._capability_index is None:
+            index: Dict[str, List[str]] = {}
+            for agent_id, agent in self._json_agents.items():
+                try:
+                    for cap in {c.lower() for c in agent.get_capabilities()}:
+                        index.setdefault(cap, []).append(agent_id)
+                except Exception as e:
+                    print(f"⚠️ Error checking capability for {agent_id}: {e}")
+            self._capability_index = index
+        return list(self._capability_index.get(capability.lower(), ()))
     
     def find_agents_by_skill(self, skill_name: str) -> List[str]:
         """Find agents that have a specific skill"""
+        self._ensure_loaded()
         matching_agents = []
         for agent_id, agent in self._json_agents.items():
             if agent.has_skill(skill_name):
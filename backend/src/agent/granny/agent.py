@@ -1,26 +1,195 @@
 # granny/agent.py
+import functools
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
 from langchain_openai import ChatOpenAI
-from langchain.schema import SystemMessage, HumanMessage
+from langchain.schema import BaseMessage, SystemMessage, HumanMessage
 from dotenv import load_dotenv
-from typing import Generator, List, Dict, Any, Optional
+from typing import Generator, List, Dict, Any, Optional, Tuple
 from ..base_agent import BaseAgent
 from ..state import State
-from ..tools.tool_config import ToolConfig
-from ..tools.tool_executor import get_agent_tools_context, execute_intelligent_tools
+from ..tools.tool_config import ToolConfig, get_agent_tool_configs
+from ..tools.tool_executor import (
+    get_agent_tools_context,
+    execute_intelligent_tools
+)
+
+try:
+    from llmlingua import PromptCompressor
+except ImportError:
+    PromptCompressor = None
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Optional artificial pause between streamed chunks (seconds), for testing the UI
+_STREAM_DELAY = float(os.getenv("GRANNY_STREAM_DELAY", "0"))
+
+# Small LLM chunks are buffered and yielded once either limit is reached
+_STREAM_FLUSH_CHARS = 64
+_STREAM_FLUSH_INTERVAL = 0.03  # seconds
+
+# History compression (opt-in via the "compress_history" config flag): once the
+# estimated history size passes the budget, older turns are compressed and the
+# most recent turns are kept verbatim
+_HISTORY_TOKEN_BUDGET = 2000
+_HISTORY_ANCHOR_TURNS = 4
+_HISTORY_COMPRESSION_RATE = 0.5
+# Small LLMLingua-2 token classifier; the PromptCompressor default is a 7B causal LM
+_HISTORY_COMPRESSOR_MODEL = os.getenv(
+    "GRANNY_COMPRESSOR_MODEL", "microsoft/llmlingua-2-bert-base-multilingual-cased-meetingbank"
+)
+_history_compressor = None
+_history_compressor_failed = False
+_history_compressor_lock = threading.Lock()
+
+
+def _get_history_compressor():
+    """Load the compressor once across request threads; None if it cannot be loaded"""
+    global _history_compressor, _history_compressor_failed
+    if _history_compressor is None and not _history_compressor_failed:
+        with _history_compressor_lock:
+            if _history_compressor is None and not _history_compressor_failed:
+                try:
+                    _history_compressor = PromptCompressor(
+                        model_name=_HISTORY_COMPRESSOR_MODEL, use_llmlingua2=True, device_map="cpu"
+                    )
+                except Exception as e:
+                    # Don't retry a failed load on every request
+                    _history_compressor_failed = True
+                    logger.warning("History compression disabled, failed to load %s: %s", _HISTORY_COMPRESSOR_MODEL, e)
+    return _history_compressor
+
+
+def _compress_history_text(text: str) -> Optional[str]:
+    """Compress conversation history with LLMLingua-2, or None to keep it verbatim"""
+    compressor = _get_history_compressor()
+    if compressor is None:
+        return None
+    try:
+        return compressor.compress_prompt(text, rate=_HISTORY_COMPRESSION_RATE)["compressed_prompt"]
+    except Exception:
+        logger.exception("History compression failed, sending full history")
+        return None
+
+_GRANNY_SYSTEM_PROMPT = """You are a sweet old Romanian grandmother who responds with warmth, wisdom, and love. 
+You often reference traditional Romanian recipes, family values, and life lessons.
+
+When you have tools available, you are aware of their capabilities and will use them strategically to provide better help.
+The system will automatically analyze your user's needs and provide you with relevant tool results when needed.
+Your job is to integrate any tool results naturally into your warm, grandmotherly responses.
+
+Remember: You are still the loving grandmother, but now you can access additional information when needed to help better."""
+
+_ROUTING_KEYWORDS = (
+    "recipe", "cooking", "cook", "food", "ciorba", "soup",
+    "grandmother", "granny", "bunica", "family", "traditional",
+    "romanian", "advice", "wisdom", "comfort", "help", "guidance"
+)
+
+# Whole-word match for any routing keyword, in a single scan of the text
+_ROUTING_RE = re.compile(
+    r"\b(?:" + "|".join(map(re.escape, sorted(_ROUTING_KEYWORDS, key=len, reverse=True))) + r")\b",
+    re.IGNORECASE
+)
+
+_TOOL_RESULTS_INSTRUCTIONS = (
+    "\n\nInstructions: Use the tool results above to enhance your response. "
+    "Integrate the information naturally into your warm, grandmotherly advice. "
+    "If the tools provided useful information, reference it in your response. "
+    "If the tool results weren't helpful, acknowledge this and provide your best guidance anyway."
+)
+
+# Prompts are plain strings built here, so wrap them without re-running pydantic validation
+_human_message = getattr(HumanMessage, "model_construct", HumanMessage.construct)
+
+# Reused for every request that has no tools context
+_GRANNY_SYSTEM_MSG = SystemMessage(content=_GRANNY_SYSTEM_PROMPT)
+
+
+@functools.lru_cache(maxsize=16)
+def _compose_system_message(system_prompt: str, tools_context: str) -> SystemMessage:
+    """System message with the tools context appended, shared across requests with the same flow"""
+    return SystemMessage(content=f"{system_prompt}\n\n{tools_context}")
+
+
+@functools.lru_cache(maxsize=64)
+def _prompt_cache_kwargs(system_content: str) -> Dict[str, Any]:
+    """OpenAI request options routing calls with the same system prompt to the same prompt cache"""
+    digest = hashlib.sha1(system_content.encode("utf-8")).hexdigest()[:16]
+    return {"extra_body": {"prompt_cache_key": f"granny:{digest}"}}
+
+
+def _chunk_text(chunk: Any) -> Optional[str]:
+    """Text content of a streamed LLM chunk, or None for empty chunks"""
+    content = getattr(chunk, 'content', None)
+    if not content:
+        return None
+    return content if isinstance(content, str) else str(content)
+
+
+class _ChunkBatcher:
+    """Groups small streamed chunks until _STREAM_FLUSH_CHARS or _STREAM_FLUSH_INTERVAL is reached"""
+    
+    __slots__ = ('_buffer', '_chars', '_last_flush')
+    
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._chars = 0
+        self._last_flush = time.monotonic()
+    
+    def add(self, text: str) -> Optional[str]:
+        """Buffer text and return a batch when one is due"""
+        self._buffer.append(text)
+        self._chars += len(text)
+        now = time.monotonic()
+        if self._chars >= _STREAM_FLUSH_CHARS or now - self._last_flush >= _STREAM_FLUSH_INTERVAL:
+            self._last_flush = now
+            return self.flush()
+        return None
+    
+    def flush(self) -> Optional[str]:
+        """Return whatever is buffered, or None if nothing is"""
+        if not self._buffer:
+            return None
+        batch = "".join(self._buffer)
+        self._buffer.clear()
+        self._chars = 0
+        return batch
+
 
 class GrannyAgent(BaseAgent):
     """Romanian grandmother agent providing warm wisdom, recipes, and family advice"""
     
+    __slots__ = ('llm', 'stream_delay', 'compress_history')
+    
+    # Fixed part of the execution metadata recorded with every output
+    _META_TEMPLATE = {"execution_time": 0, "confidence": 1.0}  # execution_time could be tracked
+    
+    # ChatOpenAI clients shared by every GrannyAgent with the same (model, temperature)
+    _llm_clients: Dict[Tuple[str, float], ChatOpenAI] = {}
+    
     def __init__(self, agent_id: str, config: Optional[Dict[str, Any]] = None):
         super().__init__(agent_id, config)
-        self.llm = ChatOpenAI(
-            model=self.model, 
-            temperature=self.temperature, 
-            streaming=True
-        )
+        # Pacing between streamed chunks is off unless configured for debugging
+        self.stream_delay = float(self.config.get("debug_stream_delay", _STREAM_DELAY))
+        self.compress_history = bool(self.config.get("compress_history", False)) and PromptCompressor is not None
+        key = (self.model, self.temperature)
+        llm = GrannyAgent._llm_clients.get(key)
+        if llm is None:
+            llm = GrannyAgent._llm_clients[key] = ChatOpenAI(
+                model=self.model, 
+                temperature=self.temperature, 
+                streaming=True,
+                # Final stream chunk carries token usage, so nothing needs re-tokenizing
+                stream_usage=True
+            )
+        self.llm = llm
     
     def get_name(self) -> str:
         return "Romanian Grandmother"
@@ -28,7 +197,8 @@ class GrannyAgent(BaseAgent):
     def get_description(self) -> str:
         return "A warm, wise Romanian grandmother who shares traditional recipes, family values, and life lessons with love and care"
     
-    def get_capabilities(self) -> List[str]:
+    @classmethod
+    def declared_capabilities(cls) -> List[str]:
         return [
             "recipes", 
             "cooking", 
@@ -41,72 +211,78 @@ class GrannyAgent(BaseAgent):
             "nurturing"
         ]
     
+    def get_capabilities(self) -> List[str]:
+        return self.declared_capabilities()
+    
     def get_system_prompt(self) -> str:
-        return """You are a sweet old Romanian grandmother who responds with warmth, wisdom, and love. 
-You often reference traditional Romanian recipes, family values, and life lessons.
-
-When you have tools available, you are aware of their capabilities and will use them strategically to provide better help.
-The system will automatically analyze your user's needs and provide you with relevant tool results when needed.
-Your job is to integrate any tool results naturally into your warm, grandmotherly responses.
-
-Remember: You are still the loving grandmother, but now you can access additional information when needed to help better."""
+        return _GRANNY_SYSTEM_PROMPT
     
     def get_routing_keywords(self) -> List[str]:
-        return [
-            "recipe", "cooking", "cook", "food", "ciorba", "soup",
-            "grandmother", "granny", "bunica", "family", "traditional",
-            "romanian", "advice", "wisdom", "comfort", "help", "guidance"
-        ]
+        return list(_ROUTING_KEYWORDS)
+    
+    def matches_routing_keywords(self, text: str) -> bool:
+        """Check whether text contains any of this agent's routing keywords"""
+        return _ROUTING_RE.search(text) is not None
     
     def _get_tools_for_request(self, state: State) -> List[ToolConfig]:
         """Get tools configured for this agent from the current flow"""
-        granny_tools = []
-        if state.agent_flow:
-            for agent_config in state.agent_flow:
-                if agent_config["id"] == self.agent_id and "tools" in agent_config:
-                    granny_tools = [
-                        ToolConfig(name=tool["name"], option=tool.get("option"))
-                        if isinstance(tool, dict) else ToolConfig(name=tool)
-                        for tool in agent_config["tools"]
-                    ]
-                    break
-        return granny_tools
+        return get_agent_tool_configs(state.agent_flow_by_id.get(self.agent_id))
     
     def _build_prompt(self, state: State, tools_context: str = "") -> str:
         """Build the complete prompt for the agent"""
-        convo = "\n".join(f"{msg.sender}: {msg.text}" for msg in state.history)
+        tool_outputs = state.tool_outputs
+        parts = ["Conversation history:\n"]
+        append = parts.append
         
-        # Prepare the prompt with tool outputs if available
-        prompt_parts = [f"Conversation history:\n{convo}"]
+        # Conversation history as "sender: text" lines
+        history = state.history
+        if (
+            self.compress_history
+            and len(history) > _HISTORY_ANCHOR_TURNS
+            and sum(len(msg.text) for msg in history) // 4 > _HISTORY_TOKEN_BUDGET
+        ):
+            older = history[:-_HISTORY_ANCHOR_TURNS]
+            compressed = _compress_history_text("\n".join([f"{msg.sender}: {msg.text}" for msg in older]))
+            if compressed is not None:
+                append(compressed)
+                append("\n")
+                history = history[-_HISTORY_ANCHOR_TURNS:]
+        
+        for msg in history:
+            append(msg.sender)
+            append(": ")
+            append(msg.text)
+            append("\n")
+        if history:
+            parts.pop()  # no newline after the last message
         
         # Add tool outputs to context if any were used
-        if state.tool_outputs:
-            prompt_parts.append("\nTool Results Available:")
-            for tool_name, tool_output in state.tool_outputs.items():
+        if tool_outputs:
+            append("\n\nTool Results Available:")
+            for tool_name, tool_output in tool_outputs.items():
+                append("\n\n• ")
+                append(tool_name.upper())
                 if isinstance(tool_output, dict):
-                    result = tool_output.get("result", str(tool_output))
-                    query_used = tool_output.get("query_used", "")
-                    confidence = tool_output.get("confidence", 0)
-                    
-                    prompt_parts.append(f"\n• {tool_name.upper()} (query: '{query_used}', confidence: {confidence:.2f}):")
-                    prompt_parts.append(f"  {result}")
+                    append(" (query: '")
+                    append(str(tool_output.get("query_used", "")))
+                    append("', confidence: ")
+                    append(format(tool_output.get("confidence", 0), ".2f"))
+                    append("):\n  ")
+                    append(str(tool_output.get("result", tool_output)))
                 else:
-                    prompt_parts.append(f"\n• {tool_name.upper()}: {tool_output}")
+                    append(": ")
+                    append(str(tool_output))
         
-        prompt_parts.append(f"\nUser's current request: {state.user_prompt}")
+        append("\n\nUser's current request: ")
+        append(state.user_prompt)
         
-        if state.tool_outputs:
-            prompt_parts.append(
-                "\nInstructions: Use the tool results above to enhance your response. "
-                "Integrate the information naturally into your warm, grandmotherly advice. "
-                "If the tools provided useful information, reference it in your response. "
-                "If the tool results weren't helpful, acknowledge this and provide your best guidance anyway."
-            )
+        if tool_outputs:
+            append(_TOOL_RESULTS_INSTRUCTIONS)
         
-        return "\n".join(prompt_parts)
+        return "".join(parts)
     
-    def process_request(self, state: State) -> Dict[str, Any]:
-        """Process user request and return response (non-streaming)"""
+    def _prepare_messages(self, state: State) -> Tuple[State, List[ToolConfig], List[BaseMessage]]:
+        """Run this agent's tools and build the LLM messages shared by both request paths"""
         # Get and execute tools
         granny_tools = self._get_tools_for_request(state)
         if granny_tools:
@@ -115,83 +291,112 @@ Remember: You are still the loving grandmother, but now you can access additiona
         # Generate dynamic tools context for the agent prompt
         tools_context = get_agent_tools_context(granny_tools) if granny_tools else ""
         
+        return state, granny_tools, self._build_messages(state, tools_context)
+    
+    def _build_messages(self, state: State, tools_context: str) -> List[BaseMessage]:
+        """System and human messages for a state whose tools have already run"""
         # Build system prompt
         system_content = self.get_system_prompt()
         if tools_context:
-            system_content += f"\n\n{tools_context}"
-        
-        system = SystemMessage(content=system_content)
+            system = _compose_system_message(system_content, tools_context)
+        elif system_content is _GRANNY_SYSTEM_PROMPT:
+            system = _GRANNY_SYSTEM_MSG
+        else:
+            system = SystemMessage(content=system_content)
         
         # Build final prompt
         final_prompt = self._build_prompt(state, tools_context)
         
+        return [system, _human_message(content=final_prompt)]
+    
+    def process_request(self, state: State) -> Dict[str, Any]:
+        """Process user request and return response (non-streaming)"""
+        state, granny_tools, messages = self._prepare_messages(state)
+        
         # Generate response
-        result = self.llm.invoke([system, HumanMessage(content=final_prompt)])
+        result = self.llm.invoke(messages, **_prompt_cache_kwargs(messages[0].content))
         
         # Update state with generic method
         output_text = str(result.content) if result.content else ""
+        tool_names = [tool.name for tool in granny_tools]
         state.set_agent_output(self.agent_id, output_text, {
-            "execution_time": 0,  # Could track this
-            "tools_used": [tool.name for tool in granny_tools],
-            "confidence": 1.0
+            **self._META_TEMPLATE,
+            "tools_used": tool_names
         })
         
         return {
             "output": output_text,
             "agent_id": self.agent_id,
-            "tools_used": [tool.name for tool in granny_tools]
+            "tools_used": tool_names
         }
     
-    def process_request_stream(self, state: State) -> Generator[str, None, None]:
-        """Process user request and yield streaming response"""
-        # Get and execute tools
-        granny_tools = self._get_tools_for_request(state)
-        if granny_tools:
-            state = execute_intelligent_tools(state, granny_tools, self.agent_id)
-        
-        # Generate dynamic tools context for the agent prompt
-        tools_context = get_agent_tools_context(granny_tools) if granny_tools else ""
+    def process_request_stream(self, state: State, accumulate: bool = True) -> Generator[str, None, None]:
+        """Process user request and yield streaming response
         
-        # Build system prompt
-        system_content = self.get_system_prompt()
-        if tools_context:
-            system_content += f"\n\n{tools_context}"
+        With accumulate=False the chunks are only yielded, and the full response
+        is not recorded on the state.
+        """
+        state, granny_tools, messages = self._prepare_messages(state)
         
-        system = SystemMessage(content=system_content)
+        # Stream the response
+        stream_delay = self.stream_delay
+        response_chunks: List[str] = []
+        batcher = _ChunkBatcher()
+        usage = None
+        for chunk in self.llm.stream(messages, **_prompt_cache_kwargs(messages[0].content)):
+            usage = getattr(chunk, 'usage_metadata', None) or usage
+            content_str = _chunk_text(chunk)
+            if content_str:
+                if accumulate:
+                    response_chunks.append(content_str)
+                batch = batcher.add(content_str)
+                if batch is not None:
+                    if stream_delay:
+                        time.sleep(stream_delay)
+                    yield batch
         
-        # Build final prompt
-        final_prompt = self._build_prompt(state, tools_context)
+        batch = batcher.flush()
+        if batch is not None:
+            yield batch
         
-        # Stream the response
-        full_response = ""
-        for chunk in self.llm.stream([system, HumanMessage(content=final_prompt)]):
-            if hasattr(chunk, 'content') and chunk.content:
-                content_str = str(chunk.content)
-                full_response += content_str
-                # Add small delay for testing streaming
-                import time
-                time.sleep(0.05)  # 50ms delay between chunks
-                yield content_str
-        
-        # Update state after streaming is complete with generic method
-        state.set_agent_output(self.agent_id, full_response, {
-            "execution_time": 0,  # Could track this
+        if accumulate:
+            self._record_stream_output(state, granny_tools, response_chunks, usage)
+    
+    def _record_stream_output(self, state: State, granny_tools: List[ToolConfig], response_chunks: List[str],
+                              usage: Optional[Dict[str, Any]] = None) -> None:
+        """Update state after streaming is complete with generic method"""
+        metadata = {
+            **self._META_TEMPLATE,
             "tools_used": [tool.name for tool in granny_tools],
-            "confidence": 1.0,
             "streaming": True
-        })
+        }
+        if usage:
+            metadata["input_tokens"] = usage.get("input_tokens", 0)
+            metadata["output_tokens"] = usage.get("output_tokens", 0)
+        state.set_agent_output(self.agent_id, "".join(response_chunks), metadata)
 
 
 # Backward compatibility functions (deprecated)
-def create_granny_response_stream(state: State) -> Generator[str, None, None]:
+_GRANNY_SINGLETON: Optional[GrannyAgent] = None
+
+
+def _get_default_granny() -> GrannyAgent:
+    """Shared GrannyAgent("granny") used by the deprecated module functions"""
+    global _GRANNY_SINGLETON
+    if _GRANNY_SINGLETON is None:
+        _GRANNY_SINGLETON = GrannyAgent("granny")
+    return _GRANNY_SINGLETON
+
+
+def create_granny_response_stream(state: State, accumulate: bool = True) -> Generator[str, None, None]:
     """Deprecated: Use GrannyAgent.process_request_stream() instead"""
-    agent = GrannyAgent("granny")
-    yield from agent.process_request_stream(state)
+    agent = _get_default_granny()
+    yield from agent.process_request_stream(state, accumulate)
 
 
 def create_granny_response(state: State) -> dict:
     """Deprecated: Use GrannyAgent.process_request() instead"""
-    agent = GrannyAgent("granny")
+    agent = _get_default_granny()
     result = agent.process_request(state)
     
     # Return old format for backward compatibility
@@ -1,11 +1,17 @@
+import asyncio
+import functools
+import hashlib
+import logging
 import os
 import uuid
 import json
 import re
-from typing import List, Optional, Dict, Any, Union
-from fastapi import FastAPI, HTTPException
+import sqlite3
+import time
+from typing import Any, AsyncIterator, Dict, Generator, List, Optional, Tuple, Union
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from pathlib import Path
 
@@ -14,17 +20,28 @@ from pathlib import Path
 # from .parody_creator.agent import create_parody, create_parody_response_stream  
 # from .granny.agent import create_granny_response, create_granny_response_stream
 from .state import ChatMessage, State
-from .tools.tool_executor import execute_tool
-from .tools.tool_config import ToolConfig
+from .tools.tool_executor import execute_tool, execute_intelligent_tools
+from .tools.tool_config import (
+    ToolConfig,
+    _generate_web_search_query,
+    get_all_available_tools,
+    get_tool_description,
+    get_tool_registry_version,
+)
+from .tools import web_search
+from .tools.web_search import run_tool
 
 from langgraph.graph import StateGraph, MessagesState, START, END
 from langgraph.types import Command
 from langchain_core.messages import HumanMessage, AIMessage
 import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 
 # Import enhanced agent registry and supervisor functionality
 from .enhanced_registry import enhanced_agent_registry
-from .supervisor.enhanced_supervisor import create_enhanced_supervisor
+from .supervisor.enhanced_supervisor import EnhancedSupervisor, ResourceType, clear_plan_cache, create_enhanced_supervisor
+
+logger = logging.getLogger(__name__)
 
 try:
     from .supervisor.supervisor_agent import create_supervisor_agent, create_advanced_supervisor_agent
@@ -34,8 +51,37 @@ except ImportError as e:
     print(f"⚠️  Supervisor not available: {e}")
     SUPERVISOR_AVAILABLE = False
 
+def _json_default(obj: Any) -> Any:
+    """Serialize values json can't handle natively (e.g. ToolConfig left in chat data)"""
+    if isinstance(obj, BaseModel):
+        return obj.dict()
+    return str(obj)
+
+try:
+    import orjson
+    _loads = orjson.loads
+    _ResponseClass = ORJSONResponse
+
+    def _dumps(data: Any) -> bytes:
+        return orjson.dumps(data, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    _ResponseClass = JSONResponse
+    
+    def _loads(data: bytes) -> Any:
+        return json.loads(data.decode("utf-8"))
+
+    def _dumps(data: Any) -> bytes:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+# Guards the chat database, the save queue and its timer; saves of individual chats take a stripe lock first
 chats_lock = threading.Lock()
-app = FastAPI()
+_LOCK_STRIPES = tuple(threading.Lock() for _ in range(32))
+
+def _lock_for(chat_id: str) -> threading.Lock:
+    """Stripe lock serializing saves of one chat without blocking saves of unrelated chats"""
+    return _LOCK_STRIPES[hash(chat_id) & 31]
+
+app = FastAPI(default_response_class=_ResponseClass)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -44,36 +90,345 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-DATA_FILE = "../chats.json"
-if os.path.exists(DATA_FILE):
-    with open(DATA_FILE, "r", encoding="utf-8") as f:
-        chats: dict = json.load(f)
-else:
-    chats = {}
+@app.on_event("shutdown")
+def close_http_clients():
+    web_search.close()
+
+# Chat database (relative to the working directory unless CHATS_DB_PATH is set); opened on startup
+DATA_DB = os.getenv("CHATS_DB_PATH", "../chats.db")
+# Storage used before the database, looked for next to it and imported once into an empty database
+LEGACY_CHATS_FILE = "chats.json"
+LEGACY_CHATS_WAL = "chats.wal.jsonl"
+
+SAVE_DEBOUNCE = 0.5  # seconds; saves of the same chat within this window become one write
+
+_flush_timer: Optional[threading.Timer] = None
+_dirty_chats: set = set()  # chats saved since the last flush (guarded by chats_lock)
+_saved_counts: Dict[str, int] = {}  # history entries already stored, per chat
+
+# One connection shared by the save threads, always used under chats_lock
+_db: Optional[sqlite3.Connection] = None
+_db_path: Optional[str] = None
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chats (
+    chat_id TEXT PRIMARY KEY,
+    settings_json BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    chat_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    sender TEXT,
+    text TEXT,
+    meta_json BLOB NOT NULL,
+    ts REAL NOT NULL,
+    PRIMARY KEY (chat_id, seq)
+);
+"""
+
+def _store() -> sqlite3.Connection:
+    if _db is None:
+        raise RuntimeError("Chat store is not open; call open_chat_store() first")
+    return _db
+
+def _chat_has_content(chat_data: dict) -> bool:
+    """Chats with no messages and no enabled agents are not persisted"""
+    return bool(chat_data.get("history")) or any(
+        agent.get("enabled", False)
+        for agent in chat_data.get("agent_sequence", [])
+    )
+
+# Chats that list_chats returns, in insertion order (dict used as an ordered set)
+meaningful_chat_ids: Dict[str, None] = {}
+
+def _update_meaningful(chat_id: str):
+    """Add or drop a chat from meaningful_chat_ids after its history or settings changed"""
+    chat_data = chats.get(chat_id)
+    if chat_data is not None and _chat_has_content(chat_data):
+        meaningful_chat_ids[chat_id] = None
+    else:
+        meaningful_chat_ids.pop(chat_id, None)
 
-def save_chats():
-    """Save chats to disk, filtering out empty conversations"""
+def _message_row(chat_id: str, seq: int, entry: dict, ts: float) -> tuple:
+    """messages row for a history entry; sender and text get their own columns when they are strings"""
+    meta = dict(entry)
+    sender, text = (meta.pop(key) if isinstance(meta.get(key), str) else None for key in ("sender", "text"))
+    return (chat_id, seq, sender, text, _dumps(meta), ts)
+
+def _message_entry(sender: Optional[str], text: Optional[str], meta_json: bytes) -> dict:
+    entry = {}
+    if sender is not None:
+        entry["sender"] = sender
+    if text is not None:
+        entry["text"] = text
+    entry.update(_loads(meta_json))
+    return entry
+
+def _write_chat(chat_id: str):
+    """Store one chat's settings and append the history entries not stored yet"""
+    with _lock_for(chat_id):
+        chat_data = chats.get(chat_id)
+        if chat_data is None:
+            return
+        settings = _dumps({key: value for key, value in chat_data.items() if key != "history"})
+        history = chat_data.get("history", [])
+        saved = _saved_counts.get(chat_id, 0)
+        if len(history) < saved:
+            # History was replaced rather than appended to; store it again from the start
+            saved = 0
+        now = time.time()
+        rows = [_message_row(chat_id, seq, entry, now) for seq, entry in enumerate(history[saved:], saved)]
+        with chats_lock:
+            db = _store()
+            with db:
+                if saved == 0:
+                    db.execute("DELETE FROM messages WHERE chat_id = ?", (chat_id,))
+                db.execute("INSERT OR REPLACE INTO chats (chat_id, settings_json) VALUES (?, ?)", (chat_id, settings))
+                db.executemany("INSERT INTO messages (chat_id, seq, sender, text, meta_json, ts) VALUES (?, ?, ?, ?, ?, ?)", rows)
+            _saved_counts[chat_id] = saved + len(rows)
+
+def _prune_chats():
+    """Delete stored chats that were dropped from memory or have no content"""
     with chats_lock:
-        # Filter out empty chats (no messages and no enabled agents)
-        filtered_chats = {}
-        for chat_id, chat_data in chats.items():
-            has_messages = len(chat_data.get("history", [])) > 0
-            has_enabled_agents = any(
-                agent.get("enabled", False) 
-                for agent in chat_data.get("agent_sequence", [])
-            )
-            
-            # Keep chat if it has messages OR enabled agents
-            if has_messages or has_enabled_agents:
-                filtered_chats[chat_id] = chat_data
-        
-        with open(DATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(filtered_chats, f, indent=2, ensure_ascii=False)
+        db = _store()
+        stale = [
+            (chat_id,)
+            for (chat_id,) in db.execute("SELECT chat_id FROM chats").fetchall()
+            if chat_id not in chats or not _chat_has_content(chats[chat_id])
+        ]
+        with db:
+            db.executemany("DELETE FROM messages WHERE chat_id = ?", stale)
+            db.executemany("DELETE FROM chats WHERE chat_id = ?", stale)
+        for (chat_id,) in stale:
+            _saved_counts.pop(chat_id, None)
+            meaningful_chat_ids.pop(chat_id, None)
+            _parsed_histories.pop(chat_id, None)
+
+def flush_chats():
+    """Write every chat saved since the last flush, once each"""
+    global _flush_timer
+    with chats_lock:
+        dirty = list(_dirty_chats)
+        _dirty_chats.clear()
+        _flush_timer = None
+    for chat_id in dirty:
+        try:
+            _write_chat(chat_id)
+        except Exception as e:
+            print(f"⚠️ Failed to save chat {chat_id}: {e}")
+
+def save_chats(chat_id: Optional[str] = None):
+    """Persist chats: queue one chat for the next flush, or flush everything and prune empty chats when no chat_id is given"""
+    global _flush_timer
+    if chat_id is None:
+        flush_chats()
+        _prune_chats()
+        return
+    
+    _update_meaningful(chat_id)
+    with chats_lock:
+        _dirty_chats.add(chat_id)
+        if _flush_timer is None:
+            _flush_timer = threading.Timer(SAVE_DEBOUNCE, flush_chats)
+            _flush_timer.daemon = True
+            _flush_timer.start()
+
+def _load_chats(db: sqlite3.Connection) -> dict:
+    """Every stored chat with its history in message order"""
+    loaded = {}
+    for chat_id, settings_json in db.execute("SELECT chat_id, settings_json FROM chats"):
+        chat_data = _loads(settings_json)
+        chat_data["history"] = []
+        loaded[chat_id] = chat_data
+    for chat_id, sender, text, meta_json in db.execute(
+        "SELECT chat_id, sender, text, meta_json FROM messages ORDER BY chat_id, seq"
+    ):
+        chat_data = loaded.get(chat_id)
+        if chat_data is not None:
+            chat_data["history"].append(_message_entry(sender, text, meta_json))
+    return loaded
+
+def _import_legacy_chats(chats_file: str, wal_file: str):
+    """Move chats.json and its update log into the (empty) database, keeping the old files as *.migrated"""
+    legacy = {}
+    if os.path.exists(chats_file):
+        with open(chats_file, "rb") as f:
+            legacy = _loads(f.read())
+    if os.path.exists(wal_file):
+        with open(wal_file, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = _loads(line)
+                except ValueError:
+                    # Torn final write from a crash; everything before it is intact
+                    print(f"⚠️ Ignoring incomplete record at the end of {wal_file}")
+                    break
+                legacy[record["chat_id"]] = record["data"]
+    chats.update(legacy)
+    for chat_id in legacy:
+        _write_chat(chat_id)
+    for path in (chats_file, wal_file):
+        if os.path.exists(path):
+            os.replace(path, path + ".migrated")
+    if legacy:
+        print(f"✓ Imported {len(legacy)} chats into {_db_path}")
+
+def open_chat_store(db_path: Optional[str] = None):
+    """Open (creating if needed) the chat database and load every chat into memory
+
+    Chats from the pre-database chats.json next to it are imported when the database is empty."""
+    global _db, _db_path
+    close_chat_store()
+    db_path = db_path or DATA_DB
+    db = sqlite3.connect(db_path, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(_SCHEMA)
+    loaded = _load_chats(db)
+    with chats_lock:
+        _db, _db_path = db, db_path
+        chats.clear()
+        chats.update(loaded)
+        _saved_counts.clear()
+        _saved_counts.update((chat_id, len(chat_data["history"])) for chat_id, chat_data in loaded.items())
+    _parsed_histories.clear()
+    meaningful_chat_ids.clear()
+    
+    legacy_dir = os.path.dirname(os.path.abspath(db_path))
+    chats_file = os.path.join(legacy_dir, LEGACY_CHATS_FILE)
+    wal_file = os.path.join(legacy_dir, LEGACY_CHATS_WAL)
+    if not chats and (os.path.exists(chats_file) or os.path.exists(wal_file)):
+        _import_legacy_chats(chats_file, wal_file)
+    for chat_id in chats:
+        _update_meaningful(chat_id)
+
+def close_chat_store():
+    """Write pending updates, prune empty chats and close the database (no-op when it isn't open)"""
+    global _db, _flush_timer
+    if _db is None:
+        return
+    with chats_lock:
+        if _flush_timer is not None:
+            _flush_timer.cancel()
+            _flush_timer = None
+    save_chats()
+    with chats_lock:
+        _db.close()
+        _db = None
+
+chats: dict = {}  # filled by open_chat_store()
+
+@app.on_event("startup")
+def load_chats():
+    open_chat_store()
+
+@app.on_event("shutdown")
+def persist_chats():
+    """Write pending updates and prune empty chats before exiting"""
+    close_chat_store()
+
+# History entries handed to agents: the first message plus the most recent ones (0 = whole history)
+MAX_CONTEXT_MESSAGES = int(os.getenv("MAX_CONTEXT_MESSAGES", "40"))
+
+def context_window(history: list) -> list:
+    """Sliding window over a chat history so agent prompts stay bounded on long chats"""
+    if not MAX_CONTEXT_MESSAGES or len(history) <= MAX_CONTEXT_MESSAGES:
+        return list(history)
+    # Keep the opening message, which usually sets up what the conversation is about
+    return history[:1] + history[len(history) - MAX_CONTEXT_MESSAGES + 1:]
+
+# chat_id -> (history list, ChatMessage for each of its entries parsed so far)
+_parsed_histories: Dict[str, Tuple[list, List[ChatMessage]]] = {}
+
+def parsed_history(chat_id: str, history: list) -> List[ChatMessage]:
+    """ChatMessage objects for the context window of a chat's history
+
+    Only entries appended since the last call are parsed."""
+    with _lock_for(chat_id):
+        cached = _parsed_histories.get(chat_id)
+        if cached is None or cached[0] is not history or len(cached[1]) > len(history):
+            cached = (history, [])
+            _parsed_histories[chat_id] = cached
+        parsed = cached[1]
+        parsed.extend([ChatMessage(**m) for m in history[len(parsed):]])
+        # A copy, so callers can't change what later turns start from
+        return context_window(parsed)
+
+_SANITIZE_RE = re.compile(r'[^a-zA-Z0-9_]')
 
 def sanitize_node_id(text: str) -> str:
-    return re.sub(r'[^a-zA-Z0-9_]', '_', text)
+    return _SANITIZE_RE.sub('_', text)
+
+# Request keywords that pull in a tool automatically (matched as substrings of the lowercased prompt)
+WEB_SEARCH_TRIGGERS = frozenset({
+    "today", "current", "now", "latest", "recent", "news",
+    "weather", "temperature", "forecast", "happening",
+    "what's", "what is", "price", "stock", "update"
+})
+KB_TRIGGERS = frozenset({
+    "recipe", "cooking", "traditional", "romanian", "ciorba",
+    "soup", "food", "ingredient", "how to make", "prepare"
+})
+
+# Substrings that select a knowledgebase entry once the knowledgebase tool is triggered
+KB_OPTION_HINTS = {"ciorba": "ciorba_recipe", "soup": "ciorba_recipe"}
+
+try:
+    import ahocorasick
+    
+    # One automaton over every trigger: a single pass over the prompt finds all (overlapping) matches
+    _TRIGGER_AUTOMATON = ahocorasick.Automaton()
+    for _trigger in WEB_SEARCH_TRIGGERS.union(KB_TRIGGERS, KB_OPTION_HINTS):
+        _TRIGGER_AUTOMATON.add_word(_trigger, (
+            _trigger in WEB_SEARCH_TRIGGERS,
+            _trigger in KB_TRIGGERS,
+            KB_OPTION_HINTS.get(_trigger),
+        ))
+    _TRIGGER_AUTOMATON.make_automaton()
+    
+    def _match_triggers(prompt_lower: str) -> Tuple[bool, bool, Optional[str]]:
+        """(needs web search, needs knowledgebase, knowledgebase option) for a lowercased prompt"""
+        web = kb = False
+        kb_option = None
+        for _, (is_web, is_kb, hint) in _TRIGGER_AUTOMATON.iter(prompt_lower):
+            web = web or is_web
+            kb = kb or is_kb
+            kb_option = kb_option or hint
+        return web, kb, kb_option
+except ImportError:
+    def _trigger_pattern(triggers) -> "re.Pattern[str]":
+        """One alternation so a prompt is scanned once per category instead of once per trigger"""
+        return re.compile("|".join(map(re.escape, sorted(triggers))))
+    
+    _WEB_SEARCH_TRIGGER_RE = _trigger_pattern(WEB_SEARCH_TRIGGERS)
+    _KB_TRIGGER_RE = _trigger_pattern(KB_TRIGGERS)
+    
+    def _match_triggers(prompt_lower: str) -> Tuple[bool, bool, Optional[str]]:
+        """(needs web search, needs knowledgebase, knowledgebase option) for a lowercased prompt"""
+        kb_option = next((option for hint, option in KB_OPTION_HINTS.items() if hint in prompt_lower), None)
+        return bool(_WEB_SEARCH_TRIGGER_RE.search(prompt_lower)), bool(_KB_TRIGGER_RE.search(prompt_lower)), kb_option
+
+def determine_needed_tools(prompt_lower: str, agent_name: str) -> List[ToolConfig]:
+    """Determine which tools an agent should use based on the (already lowercased) request content"""
+    tools = []
+    
+    needs_web_search, needs_kb, kb_option = _match_triggers(prompt_lower)
+    
+    # Web search tool - for current information, news, weather, etc.
+    if needs_web_search:
+        tools.append(ToolConfig(name="web_search"))
+    
+    # Knowledgebase tool - for recipes, traditional knowledge, etc.
+    if needs_kb:
+        tools.append(ToolConfig(name="knowledgebase", option=kb_option))
+    
+    return tools
 
 # Enhanced agent function wrapper with support for both file-based and JSON agents
+# (cached per agent id; cleared when the registry reloads its agents)
+@functools.lru_cache(maxsize=128)
 def get_agent_function(agent_id: str):
     """Get agent function from enhanced registry for use in LangGraph nodes"""
     try:
@@ -100,30 +455,35 @@ def get_agent_function(agent_id: str):
         print(f"⚠️ Failed to get agent {agent_id} from enhanced registry: {e}")
         raise ValueError(f"Unknown agent ID: {agent_id}. Available agents: {enhanced_agent_registry.list_available_agents()}")
 
-TOOL_CONFIGS: Dict[str, ToolConfig] = {}
+class _ToolRunner:
+    """Graph node running the tool configured under a node key"""
+    __slots__ = ("tool_configs", "key")
+    
+    def __init__(self, tool_configs: Dict[str, ToolConfig], key: str):
+        self.tool_configs = tool_configs
+        self.key = key
+    
+    def __call__(self, state):
+        return execute_tool(state, self.tool_configs[self.key])
 
-def build_dynamic_graph(agent_ids: List[str]):
+def build_dynamic_graph(agent_ids: List[str], tool_configs: Dict[str, ToolConfig]):
+    """Compile a linear graph over agent and tool nodes; tool node configs come from this graph's tool_configs"""
     builder = StateGraph(State)
+    available_agents = frozenset(enhanced_agent_registry.list_available_agents())
     prev_node = None
     for aid in agent_ids:
         if aid.startswith("tool:"):
             _, agent_id, tool_name = aid.split(":")
             node_name = f"tool_{sanitize_node_id(agent_id)}_{sanitize_node_id(tool_name)}"
-            TOOL_CONFIGS[node_name] = ToolConfig(name=tool_name, option="tutorials")
-            def make_tool_fn(node_key):
-                def fn(state):
-                    return execute_tool(state, TOOL_CONFIGS[node_key])
-                return fn
-            builder.add_node(node_name, make_tool_fn(node_name))
+            tool_configs[node_name] = ToolConfig(name=tool_name, option="tutorials")
+            builder.add_node(node_name, _ToolRunner(tool_configs, node_name))
             current_node = node_name
         elif aid.startswith("tool_"):
-            if aid not in TOOL_CONFIGS:
+            if aid not in tool_configs:
                 raise ValueError(f"Missing config for tool node: {aid}")
-            def make_tool_fn(node_key):
-                return lambda state: execute_tool(state, TOOL_CONFIGS[node_key])
-            builder.add_node(aid, make_tool_fn(aid))
+            builder.add_node(aid, _ToolRunner(tool_configs, aid))
             current_node = aid
-        elif aid in enhanced_agent_registry.list_available_agents():
+        elif aid in available_agents:
             agent_function = get_agent_function(aid)
             builder.add_node(aid, agent_function)
             current_node = aid
@@ -142,47 +502,22 @@ class AgentConfig(BaseModel):
     id: str
     enabled: bool
     tools: Optional[List[ToolType]] = []
+    # None: wait for (and see the outputs of) every agent before this one; a list: only those agents
+    depends_on: Optional[List[str]] = None
 
 class ChatSettings(BaseModel):
     agent_sequence: List[AgentConfig]
     supervisor_mode: bool = False  # Enable supervisor-based routing
+    supervisor_type: str = "enhanced"
 
 class MessageRequest(BaseModel):
     user_prompt: str
 
-def build_execution_plan(enabled_agents: List[Dict[str, Any]], user_prompt: str = "") -> List[str]:
+def build_execution_plan(enabled_agents: List[Dict[str, Any]], user_prompt: str = "") -> Tuple[List[str], Dict[str, ToolConfig]]:
+    """Node ids in execution order plus the ToolConfig for each tool node, scoped to this request"""
     execution_plan = []
-    
-    # Function to determine intelligent tools (same logic as elsewhere)
-    def determine_needed_tools(user_prompt: str, agent_name: str) -> list:
-        """Determine which tools an agent should use based on the request content"""
-        from .tools.tool_config import ToolConfig
-        tools = []
-        
-        prompt_lower = user_prompt.lower()
-        
-        # Web search tool - for current information, news, weather, etc.
-        web_search_triggers = [
-            "today", "current", "now", "latest", "recent", "news", 
-            "weather", "temperature", "forecast", "happening",
-            "what's", "what is", "price", "stock", "update"
-        ]
-        if any(trigger in prompt_lower for trigger in web_search_triggers):
-            tools.append(ToolConfig(name="web_search"))
-        
-        # Knowledgebase tool - for recipes, traditional knowledge, etc.
-        kb_triggers = [
-            "recipe", "cooking", "traditional", "romanian", "ciorba",
-            "soup", "food", "ingredient", "how to make", "prepare"
-        ]
-        if any(trigger in prompt_lower for trigger in kb_triggers):
-            # Try to find a relevant knowledgebase option
-            kb_option = None
-            if "ciorba" in prompt_lower or "soup" in prompt_lower:
-                kb_option = "ciorba_recipe"
-            tools.append(ToolConfig(name="knowledgebase", option=kb_option))
-        
-        return tools
+    tool_configs: Dict[str, ToolConfig] = {}
+    prompt_lower = user_prompt.lower()
     
     for agent in enabled_agents:
         agent_id = agent["id"]
@@ -191,7 +526,7 @@ def build_execution_plan(enabled_agents: List[Dict[str, Any]], user_prompt: str
         manual_tools = agent.get("tools") or []
         
         # Get intelligently determined tools
-        intelligent_tools = determine_needed_tools(user_prompt, agent_id) if user_prompt else []
+        intelligent_tools = determine_needed_tools(prompt_lower, agent_id) if prompt_lower else []
         
         # Combine tools (intelligent takes priority)
         all_tools = intelligent_tools[:]
@@ -220,13 +555,13 @@ def build_execution_plan(enabled_agents: List[Dict[str, Any]], user_prompt: str
             if not isinstance(tool_name, str) or not tool_name:
                 raise ValueError(f"Invalid tool name: {tool_name}")
             tool_node = f"tool_{sanitize_node_id(agent_id)}_{sanitize_node_id(tool_name)}"
-            TOOL_CONFIGS[tool_node] = ToolConfig(name=tool_name, option=tool_option)
+            tool_configs[tool_node] = ToolConfig(name=tool_name, option=tool_option)
             execution_plan.append(tool_node)
         
         # Add the agent node after its tools
         execution_plan.append(agent_id)
     
-    return execution_plan
+    return execution_plan, tool_configs
 
 # Supervisor-based helper functions
 def build_supervisor_graph(chat_config: Optional[dict] = None):
@@ -245,7 +580,6 @@ def build_supervisor_graph(chat_config: Optional[dict] = None):
     if chat_config.get("agent_sequence"):
         for agent_config in chat_config["agent_sequence"]:
             if agent_config.get("enabled") and agent_config.get("tools"):
-                from .tools.tool_config import ToolConfig
                 agent_tools = [
                     ToolConfig(name=tool["name"], option=tool.get("option"))
                     if isinstance(tool, dict) else ToolConfig(name=tool)
@@ -253,158 +587,104 @@ def build_supervisor_graph(chat_config: Optional[dict] = None):
                 ]
                 agent_tools_config[agent_config["id"]] = agent_tools
     
-    # Agent wrapper functions with tool support
-    def granny_node(state: MessagesState) -> Command:
-        last_message = state["messages"][-1] if state["messages"] else None
-        user_prompt = str(last_message.content) if last_message and hasattr(last_message, 'content') else ""
-        
-        # Create agent state with tool configuration
-        agent_config = [{
-            "id": "granny",
-            "enabled": True,
-            "tools": agent_tools_config.get("granny", [])
-        }]
-        
-        agent_state = State(
-            user_prompt=user_prompt,
-            history=[],
-            tool_outputs={},
-            agent_flow=agent_config
-        )
-        
-        # Execute tools if available
-        granny_tools = agent_tools_config.get("granny", [])
-        if granny_tools:
-            from .tools.tool_executor import execute_intelligent_tools
-            agent_state = execute_intelligent_tools(agent_state, granny_tools, "granny")
-        
-        # Use enhanced registry instead of hardcoded function
-        granny_agent = enhanced_agent_registry.get_agent("granny")
-        result = granny_agent.process_request(agent_state)
-        return Command(
-            goto="supervisor",
-            update={"messages": state["messages"] + [
-                AIMessage(content=result["output"], name="granny")
-            ]}
-        )
-    
-    def story_creator_node(state: MessagesState) -> Command:
-        last_message = state["messages"][-1] if state["messages"] else None
-        user_prompt = str(last_message.content) if last_message and hasattr(last_message, 'content') else ""
-        
-        # Create agent state with tool configuration
-        agent_config = [{
-            "id": "story_creator",
-            "enabled": True,
-            "tools": agent_tools_config.get("story_creator", [])
-        }]
-        
-        agent_state = State(
-            user_prompt=user_prompt,
-            history=[],
-            tool_outputs={},
-            agent_flow=agent_config
-        )
-        
-        # Execute tools if available
-        story_tools = agent_tools_config.get("story_creator", [])
-        if story_tools:
-            from .tools.tool_executor import execute_intelligent_tools
-            agent_state = execute_intelligent_tools(agent_state, story_tools, "story_creator")
-        
-        # Use enhanced registry instead of hardcoded function
-        story_agent = enhanced_agent_registry.get_agent("story_creator")
-        result = story_agent.process_request(agent_state)
-        return Command(
-            goto="supervisor", 
-            update={"messages": state["messages"] + [
-                AIMessage(content=result["output"], name="story_creator")
-            ]}
-        )
-    
-    def parody_creator_node(state: MessagesState) -> Command:
-        last_message = state["messages"][-1] if state["messages"] else None
-        user_prompt = str(last_message.content) if last_message and hasattr(last_message, 'content') else ""
-        
-        # Create agent state with tool configuration
-        agent_config = [{
-            "id": "parody_creator",
-            "enabled": True,
-            "tools": agent_tools_config.get("parody_creator", [])
-        }]
-        
-        agent_state = State(
-            user_prompt=user_prompt,
-            history=[],
-            tool_outputs={},
-            agent_flow=agent_config
-        )
+    # Agent wrapper nodes with tool support
+    def make_agent_node(agent_id: str):
+        agent_tools = agent_tools_config.get(agent_id, [])
+        # Resolved once per graph build rather than on every supervisor dispatch
+        agent = enhanced_agent_registry.get_agent(agent_id)
         
-        # Execute tools if available
-        parody_tools = agent_tools_config.get("parody_creator", [])
-        if parody_tools:
-            from .tools.tool_executor import execute_intelligent_tools
-            agent_state = execute_intelligent_tools(agent_state, parody_tools, "parody_creator")
+        def agent_node(state: MessagesState) -> Command:
+            messages = state["messages"]
+            user_prompt = getattr(messages[-1], "content", "") if messages else ""
+            if not isinstance(user_prompt, str):
+                user_prompt = str(user_prompt)
+            
+            # Create agent state with tool configuration
+            agent_state = State(
+                user_prompt=user_prompt,
+                history=[],
+                tool_outputs={},
+                agent_flow=[{"id": agent_id, "enabled": True, "tools": agent_tools}]
+            )
+            
+            # Execute tools if available
+            if agent_tools:
+                agent_state = execute_intelligent_tools(agent_state, agent_tools, agent_id)
+            
+            result = agent.process_request(agent_state)
+            return Command(
+                goto="supervisor",
+                update={"messages": messages + [
+                    AIMessage(content=result["output"], name=agent_id)
+                ]}
+            )
         
-        # Use enhanced registry instead of hardcoded function
-        parody_agent = enhanced_agent_registry.get_agent("parody_creator")
-        result = parody_agent.process_request(agent_state)
-        return Command(
-            goto="supervisor",
-            update={"messages": state["messages"] + [
-                AIMessage(content=result["output"], name="parody_creator")
-            ]}
-        )
+        return agent_node
     
     # Build the graph
     builder = StateGraph(MessagesState)
     builder.add_node("supervisor", supervisor_agent)
-    builder.add_node("granny", granny_node)
-    builder.add_node("story_creator", story_creator_node) 
-    builder.add_node("parody_creator", parody_creator_node)
-    
     builder.add_edge(START, "supervisor")
-    builder.add_edge("granny", "supervisor")
-    builder.add_edge("story_creator", "supervisor")
-    builder.add_edge("parody_creator", "supervisor")
+    for agent_id in ("granny", "story_creator", "parody_creator"):
+        builder.add_node(agent_id, make_agent_node(agent_id))
+        builder.add_edge(agent_id, "supervisor")
     
     return builder.compile()
 
 
 
+def _control_flow_event(phase: str, text: str, agent: Optional[str] = None) -> Dict[str, Any]:
+    """Live supervisor progress for streaming clients; yielded alongside history entries but never stored"""
+    return {"sender": "control_flow", "phase": phase, "agent": agent, "text": text}
+
+def _run_to_completion(events: Generator[Dict[str, Any], None, Dict[str, Any]]) -> Dict[str, Any]:
+    """Drain a history-entry generator and return its result"""
+    while True:
+        try:
+            next(events)
+        except StopIteration as stop:
+            return stop.value
+
+def next_history_event(events: Generator[Dict[str, Any], None, Dict[str, Any]]) -> Tuple[bool, Any]:
+    """Advance a history-entry generator one step: (False, entry) or (True, result) once it finishes"""
+    try:
+        return False, next(events)
+    except StopIteration as stop:
+        return True, stop.value
+
 def process_multi_agent_supervisor_message(chat_id: str, user_prompt: str):
     """Process message using enhanced supervisor with multi-agent support"""
+    return _run_to_completion(iter_multi_agent_supervisor_message(chat_id, user_prompt))
+
+def iter_multi_agent_supervisor_message(chat_id: str, user_prompt: str) -> Generator[Dict[str, Any], None, Dict[str, Any]]:
+    """Plan and run a supervised request, yielding multi-agent history entries as they are recorded
+
+    Control-flow events are yielded too. Single-agent results are only returned; callers render those themselves."""
     
-    print(f"\n{'='*80}")
-    print(f"🎮 CONTROL FLOW: WORKFLOW START - User request received")
-    print(f"🎮 CONTROL FLOW: Chat ID: {chat_id}")
-    print(f"🎮 CONTROL FLOW: User prompt: {user_prompt[:100]}...")
-    print(f"{'='*80}")
+    yield _control_flow_event("start", f"Workflow start for chat {chat_id}: {user_prompt[:100]}...")
     
     # Get chat history and state
-    chat_history = chats.get(chat_id, {}).get("history", [])
-    hist = chats.get(chat_id, {}).get("history", [])
-    
-    print(f"🎮 CONTROL FLOW: Supervisor taking initial control for planning")
+    chat = chats.get(chat_id) or {}
+    # One list: entries appended to hist are what later agents see as chat_history
+    hist = chat.get("history", [])
+    chat_history = hist
     
     try:
         # Enhanced supervisor analysis
-        print(f"🔍 DEBUG: process_multi_agent_supervisor_message called")
+        logger.debug("process_multi_agent_supervisor_message called")
         
         # Create enhanced supervisor
-        available_agents = enhanced_agent_registry.list_available_agents()
-        enhanced_supervisor = create_enhanced_supervisor(available_agents, {})
+        enhanced_supervisor = _get_supervisor(tuple(enhanced_agent_registry.list_available_agents()), None, AGENTS_CONFIG_FILE.stat().st_mtime_ns)
         
-        print(f"🎮 CONTROL FLOW: Supervisor analyzing request and building execution plan")
+        yield _control_flow_event("planning", "Supervisor analyzing request and building execution plan")
         # Analyze query and create execution plan
         execution_plan = enhanced_supervisor.analyze_query(user_prompt)
         
-        print(f"🔍 DEBUG: Execution plan requires_multi_agent: {execution_plan.requires_multi_agent}")
-        print(f"🔍 DEBUG: Agent sequence: {execution_plan.agent_sequence}")
+        logger.debug("Execution plan requires_multi_agent: %s", execution_plan.requires_multi_agent)
+        logger.debug("Agent sequence: %s", execution_plan.agent_sequence)
         
         if execution_plan.requires_multi_agent:
-            print(f"🎮 CONTROL FLOW: Supervisor determined multi-agent execution required")
-            print(f"🎮 CONTROL FLOW: Planned agent sequence: {execution_plan.agent_sequence}")
+            yield _control_flow_event("plan", f"Multi-agent execution planned: {' → '.join(execution_plan.agent_sequence)}")
             
             # Add initial supervisor message to history
             supervisor_msg = {
@@ -418,17 +698,16 @@ def process_multi_agent_supervisor_message(chat_id: str, user_prompt: str):
                 "supervisor_type": "enhanced"
             }
             hist.append(supervisor_msg)
+            yield supervisor_msg
             
-            print(f"🎮 CONTROL FLOW: Supervisor added planning message to history")
-            print(f"🔍 DEBUG: Calling execute_multi_agent_orchestration...")
+            logger.debug("Calling execute_multi_agent_orchestration...")
             
-            return execute_multi_agent_orchestration(
+            return (yield from iter_multi_agent_orchestration(
                 execution_plan, user_prompt, chat_history, hist, enhanced_supervisor
-            )
+            ))
             
         else:
-            print(f"🎮 CONTROL FLOW: Supervisor determined single-agent execution sufficient")
-            print(f"🎮 CONTROL FLOW: Delegating to single agent: {execution_plan.primary_agent}")
+            yield _control_flow_event("plan", f"Single-agent execution planned: {execution_plan.primary_agent}", execution_plan.primary_agent)
             # Fall back to single agent execution
             supervisor_msg = {
                 "sender": "supervisor", 
@@ -445,16 +724,16 @@ def process_multi_agent_supervisor_message(chat_id: str, user_prompt: str):
             
     except Exception as e:
         error_msg = f"Enhanced supervisor processing failed: {str(e)}"
-        print(f"🎮 CONTROL FLOW: CRITICAL ERROR - Supervisor failed during planning: {str(e)}")
-        print(f"🔍 DEBUG: Exception in process_multi_agent_supervisor_message: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Enhanced supervisor planning failed")
+        yield _control_flow_event("error", f"Supervisor failed during planning: {str(e)}")
         
-        hist.append({
+        entry = {
             "sender": "system",
             "text": error_msg,
             "error": True
-        })
+        }
+        hist.append(entry)
+        yield entry
         
         return {
             "system_error": error_msg,
@@ -462,175 +741,193 @@ def process_multi_agent_supervisor_message(chat_id: str, user_prompt: str):
             "error": True
         }
 
-def execute_multi_agent_orchestration(execution_plan, user_prompt, chat_history, hist, enhanced_supervisor):
-    """Execute multi-agent workflow with step-by-step tracking"""
+def iter_multi_agent_orchestration(execution_plan, user_prompt, chat_history, hist, enhanced_supervisor) -> Generator[Dict[str, Any], None, Dict[str, Any]]:
+    """Execute multi-agent workflow with step-by-step tracking, yielding each history entry as it is recorded
+
+    The generator's return value is the final result dict."""
     tool_outputs = {}
     agent_outputs = {}
+    executor: Optional[ThreadPoolExecutor] = None
     
-    print("🎮 CONTROL FLOW: Supervisor taking control for multi-agent orchestration")
-    print(f"🎮 CONTROL FLOW: Supervisor planning execution sequence: {execution_plan.agent_sequence}")
+    yield _control_flow_event("orchestration_start", f"Supervisor orchestrating: {' → '.join(execution_plan.agent_sequence)}")
     
     try:
         # DON'T execute tools upfront - let agents call them when needed
         # Tools will be executed by individual agents through their process_request method
         
-        # Execute agents sequentially
-        print(f"🔍 DEBUG: Starting multi-agent execution with sequence: {execution_plan.agent_sequence}")
-        print(f"🎮 CONTROL FLOW: Supervisor beginning sequential agent execution")
-        
-        for i, agent_id in enumerate(execution_plan.agent_sequence):
-            print(f"\n{'='*60}")
-            print(f"🎮 CONTROL FLOW: Supervisor preparing to delegate to {agent_id} (step {i+1}/{len(execution_plan.agent_sequence)})")
-            print(f"🔍 DEBUG: Processing agent {i+1}/{len(execution_plan.agent_sequence)}: {agent_id}")
-            
-            # Add supervisor delegation message
-            hist.append({
-                "sender": "supervisor",
-                "text": f"🔄 Delegating to {agent_id} (step {i+1}/{len(execution_plan.agent_sequence)})",
-                "delegation": True,
-                "agent_delegated": agent_id,
-                "step": i+1
-            })
-            
-            print(f"🎮 CONTROL FLOW: Supervisor delegating control to {agent_id}")
-            
-            # Build context for this agent - ensure clean separation
-            if i == 0:
-                # First agent gets the original query only
-                agent_context = f"""Original request: {user_prompt}
+        # Execute agents level by level; agents whose dependencies are met run concurrently
+        logger.debug("Starting multi-agent execution with sequence: %s", execution_plan.agent_sequence)
+        
+        levels = _plan_levels(execution_plan)
+        total_steps = len(execution_plan.agent_sequence)
+        
+        # Formatted once per agent output and reused by every later step's context
+        output_blocks: Dict[str, Tuple[str, str]] = {}
+        
+        def output_block(prev_agent: str) -> str:
+            output = agent_outputs[prev_agent]
+            cached = output_blocks.get(prev_agent)
+            if cached is not None and cached[0] is output:
+                return cached[1]
+            # Truncate long outputs at a word boundary but preserve full meaning
+            if len(output) > 500:
+                cut = output.rfind(" ", 0, 500)
+                output = output[:cut if cut > 0 else 500] + "... [truncated]"
+            block = f"--- {prev_agent.upper()} OUTPUT ---\n{output}\n--- END {prev_agent.upper()} OUTPUT ---"
+            output_blocks[prev_agent] = (agent_outputs[prev_agent], block)
+            return block
+        
+        def build_agent_context(i: int, agent_id: str, prior_agents: List[str]) -> str:
+            """Prompt for the agent at position i; it sees the outputs of the levels before its own"""
+            if not prior_agents:
+                # First level gets the original query only
+                return f"""Original request: {user_prompt}
 
 Instructions: You are {agent_id} in a multi-agent workflow. {enhanced_supervisor._get_agent_instructions(agent_id, execution_plan.context_fusion)}
 
 IMPORTANT: Only provide YOUR OWN response as {agent_id}. Do not generate responses for other agents in the sequence."""
-            else:
-                # Subsequent agents get previous outputs but with clear boundaries
-                previous_outputs = []
-                for prev_agent in execution_plan.agent_sequence[:i]:
-                    if prev_agent in agent_outputs:
-                        # Truncate long outputs but preserve full meaning
-                        output = agent_outputs[prev_agent]
-                        if len(output) > 500:
-                            output = output[:500] + "... [truncated]"
-                        previous_outputs.append(f"--- {prev_agent.upper()} OUTPUT ---\n{output}\n--- END {prev_agent.upper()} OUTPUT ---")
-                
-                agent_context = f"""Original request: {user_prompt}
+            
+            # Later levels get previous outputs but with clear boundaries
+            previous_outputs = [
+                output_block(prev_agent)
+                for prev_agent in prior_agents
+                if prev_agent in agent_outputs
+            ]
+            
+            return f"""Original request: {user_prompt}
 
 Previous Agent Results:
 {chr(10).join(previous_outputs)}
 
-Instructions: You are {agent_id} (agent {i+1} of {len(execution_plan.agent_sequence)}). {enhanced_supervisor._get_agent_instructions(agent_id, execution_plan.context_fusion)}
+Instructions: You are {agent_id} (agent {i+1} of {total_steps}). {enhanced_supervisor._get_agent_instructions(agent_id, execution_plan.context_fusion)}
 
 IMPORTANT: Only provide YOUR OWN response as {agent_id}. Do not repeat or simulate responses from other agents. Build upon the previous work but respond only as yourself."""
+        
+        def record_failure(agent_id: str, error_msg: str) -> Dict[str, Any]:
+            agent_outputs[agent_id] = error_msg
+            entry = {
+                "sender": "system",
+                "text": error_msg,
+                "error": True,
+                "agent_id": agent_id
+            }
+            hist.append(entry)
+            return entry
+        
+        available_agents = enhanced_agent_registry.list_available_agents()
+        logger.debug("Available agents: %s", available_agents)
+        # Agents of the finished levels, in plan order
+        prior_agents: List[str] = []
+        completed = 0
+        
+        for level in levels:
+            runnable: List[Tuple[int, str, State]] = []
+            for i, agent_id in level:
+                yield _control_flow_event("delegate", f"Delegating to {agent_id} (step {i+1}/{total_steps})", agent_id)
+                logger.debug("Processing agent %d/%d: %s", i + 1, total_steps, agent_id)
+                
+                # Add supervisor delegation message
+                entry = {
+                    "sender": "supervisor",
+                    "text": f"🔄 Delegating to {agent_id} (step {i+1}/{total_steps})",
+                    "delegation": True,
+                    "agent_delegated": agent_id,
+                    "step": i+1
+                }
+                hist.append(entry)
+                yield entry
+                
+                if agent_id not in available_agents:
+                    error_msg = f"Agent '{agent_id}' not available in registry"
+                    logger.error("%s", error_msg)
+                    yield _control_flow_event("error", f"Cannot delegate to {agent_id} (not in registry)", agent_id)
+                    yield record_failure(agent_id, error_msg)
+                    completed += 1
+                    continue
+                
+                # Create State for this agent - let agent handle its own tools. Agents of one
+                # level run together, so each gets its own snapshot of the earlier outputs
+                agent_state = State(
+                    user_prompt=build_agent_context(i, agent_id, prior_agents),
+                    history=context_window(chat_history),
+                    tool_outputs={},  # Start fresh for each agent
+                    agent_outputs=dict(agent_outputs)
+                )
+                yield _control_flow_event("agent_start", f"{agent_id} processing request", agent_id)
+                runnable.append((i, agent_id, agent_state))
             
-            # Create State for this agent - let agent handle its own tools
-            agent_state = State(
-                user_prompt=agent_context,
-                history=chat_history,
-                tool_outputs={},  # Start fresh for each agent
-                agent_outputs=agent_outputs  # Pass previous agent outputs
-            )
+            if len(runnable) > 1 and executor is None:
+                executor = ThreadPoolExecutor(max_workers=max(len(level) for level in levels))
             
-            # Execute agent - agent will call tools if it needs them
-            try:
-                print(f"🔍 DEBUG: Checking if {agent_id} is in registry...")
-                available_agents = enhanced_agent_registry.list_available_agents()
-                print(f"🔍 DEBUG: Available agents: {available_agents}")
+            # Agents of one level don't depend on each other, so each result is recorded as soon as it finishes
+            for i, agent_id, result, error in _iter_level_results(executor, runnable):
+                completed += 1
+                if error is not None:
+                    error_msg = f"Exception executing agent {agent_id}: {str(error)}"
+                    logger.error("Agent %s failed", agent_id, exc_info=error)
+                    yield _control_flow_event("error", f"Exception while {agent_id} had control: {str(error)}", agent_id)
+                    yield record_failure(agent_id, error_msg)
+                    continue
                 
-                if agent_id in available_agents:
-                    print(f"🔍 DEBUG: Getting agent {agent_id} from registry...")
-                    agent = enhanced_agent_registry.get_agent(agent_id)
-                    print(f"🔍 DEBUG: Executing agent {agent_id}...")
-                    print(f"🎮 CONTROL FLOW: {agent_id} taking control, processing request...")
-                    
-                    result = agent.process_request(agent_state)
-                    agent_response = result.get("output", "No response generated")
-                    
-                    print(f"🎮 CONTROL FLOW: {agent_id} completed processing, returning control to supervisor")
-                    print(f"🔍 DEBUG: Agent {agent_id} response: {agent_response[:100]}...")
-                    
-                    # Check if agent used tools and add them to history
-                    if "tool_outputs" in result and result["tool_outputs"]:
-                        print(f"🎮 CONTROL FLOW: {agent_id} used tools during execution:")
-                        for tool_name, tool_result in result["tool_outputs"].items():
-                            print(f"🎮 CONTROL FLOW: - {agent_id} called tool: {tool_name}")
-                            hist.append({
-                                "sender": "tool",
-                                "text": tool_result.get("result", str(tool_result)),
-                                "tool_id": tool_name,
-                                "called_by_agent": agent_id,
-                                "via_supervisor": False  # Called by agent, not supervisor
-                            })
-                            print(f"🔍 DEBUG: Added tool output from {agent_id} calling {tool_name}")
-                    else:
-                        print(f"🎮 CONTROL FLOW: {agent_id} did not use any tools")
-                    
-                    # Store agent output
-                    agent_outputs[agent_id] = agent_response
-                    
-                    # Add agent response to history
-                    hist.append({
-                        "sender": agent_id,
-                        "text": agent_response,
-                        "via_supervisor": True,
-                        "supervisor_type": "enhanced",
-                        "step_in_sequence": i+1,
-                        "total_steps": len(execution_plan.agent_sequence)
-                    })
-                    print(f"🔍 DEBUG: Added {agent_id} response to history")
-                    print(f"🎮 CONTROL FLOW: Supervisor received output from {agent_id}")
-                    
-                    # Add supervisor acknowledgment
-                    if i < len(execution_plan.agent_sequence) - 1:
-                        next_agent = execution_plan.agent_sequence[i + 1]
-                        ack_text = f"✅ Received output from {agent_id}, proceeding to next step..."
-                        print(f"🎮 CONTROL FLOW: Supervisor acknowledging {agent_id}, preparing to delegate to {next_agent}")
-                    else:
-                        ack_text = f"✅ Multi-agent workflow completed. Final response from {agent_id}."
-                        print(f"🎮 CONTROL FLOW: Supervisor acknowledging {agent_id}, workflow complete")
-                    
-                    hist.append({
-                        "sender": "supervisor",
-                        "text": ack_text,
-                        "acknowledgment": True,
-                        "agent_completed": agent_id
-                    })
-                    print(f"🔍 DEBUG: Added supervisor acknowledgment for {agent_id}")
-                    
+                agent_response = result.get("output", "No response generated")
+                yield _control_flow_event("agent_done", f"{agent_id} completed, returning control to supervisor", agent_id)
+                logger.debug("Agent %s response: %.100s...", agent_id, agent_response)
+                
+                # Check if agent used tools and add them to history
+                if "tool_outputs" in result and result["tool_outputs"]:
+                    for tool_name, tool_result in result["tool_outputs"].items():
+                        yield _control_flow_event("tool_call", f"{agent_id} called tool: {tool_name}", agent_id)
+                        entry = {
+                            "sender": "tool",
+                            "text": tool_result.get("result", str(tool_result)),
+                            "tool_id": tool_name,
+                            "called_by_agent": agent_id,
+                            "via_supervisor": False  # Called by agent, not supervisor
+                        }
+                        hist.append(entry)
+                        yield entry
+                        logger.debug("Added tool output from %s calling %s", agent_id, tool_name)
+                
+                # Store agent output
+                agent_outputs[agent_id] = agent_response
+                
+                # Add agent response to history
+                entry = {
+                    "sender": agent_id,
+                    "text": agent_response,
+                    "via_supervisor": True,
+                    "supervisor_type": "enhanced",
+                    "step_in_sequence": i+1,
+                    "total_steps": total_steps
+                }
+                hist.append(entry)
+                yield entry
+                logger.debug("Added %s response to history", agent_id)
+                
+                # Add supervisor acknowledgment
+                if completed < total_steps:
+                    ack_text = f"✅ Received output from {agent_id}, proceeding to next step..."
                 else:
-                    error_msg = f"Agent '{agent_id}' not available in registry"
-                    print(f"🔍 DEBUG: ERROR - {error_msg}")
-                    print(f"🎮 CONTROL FLOW: ERROR - Supervisor cannot delegate to {agent_id} (not in registry)")
-                    agent_outputs[agent_id] = error_msg
-                    hist.append({
-                        "sender": "system",
-                        "text": error_msg,
-                        "error": True,
-                        "agent_id": agent_id
-                    })
-            except Exception as e:
-                error_msg = f"Exception executing agent {agent_id}: {str(e)}"
-                print(f"🔍 DEBUG: EXCEPTION - {error_msg}")
-                print(f"🎮 CONTROL FLOW: ERROR - Exception while {agent_id} had control: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                agent_outputs[agent_id] = error_msg
-                hist.append({
-                    "sender": "system",
-                    "text": error_msg,
-                    "error": True,
-                    "agent_id": agent_id
-                })
+                    ack_text = f"✅ Multi-agent workflow completed. Final response from {agent_id}."
+                
+                entry = {
+                    "sender": "supervisor",
+                    "text": ack_text,
+                    "acknowledgment": True,
+                    "agent_completed": agent_id
+                }
+                hist.append(entry)
+                yield entry
+                logger.debug("Added supervisor acknowledgment for %s", agent_id)
+            
+            prior_agents.extend(agent_id for _, agent_id in level)
         
-        print(f"\n{'='*60}")
-        print(f"🎮 CONTROL FLOW: Supervisor concluding multi-agent orchestration")
-        print(f"🎮 CONTROL FLOW: All agents completed: {list(agent_outputs.keys())}")
+        yield _control_flow_event("complete", f"All agents completed: {list(agent_outputs.keys())}")
         
         # Return final result
         final_agent = execution_plan.agent_sequence[-1] if execution_plan.agent_sequence else "unknown"
         final_response = agent_outputs.get(final_agent, "No final response generated")
         
-        print(f"🎮 CONTROL FLOW: Supervisor preparing final result with {final_agent}'s output")
-        
         return {
             "agent_response": final_response,
             "chosen_agent": final_agent,
@@ -645,55 +942,123 @@ IMPORTANT: Only provide YOUR OWN response as {agent_id}. Do not repeat or simula
         
     except Exception as e:
         error_msg = f"Multi-agent orchestration failed: {str(e)}"
-        print(f"🎮 CONTROL FLOW: CRITICAL ERROR - Supervisor lost control due to: {str(e)}")
-        hist.append({
+        yield _control_flow_event("error", f"Supervisor lost control due to: {str(e)}")
+        entry = {
             "sender": "system",
             "text": error_msg,
             "error": True
-        })
+        }
+        hist.append(entry)
+        yield entry
         
         return {
             "system_error": error_msg,
             "supervisor_routing": False,
             "error": True
         }
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+def _plan_levels(execution_plan) -> List[List[Tuple[int, str]]]:
+    """(step index, agent id) pairs of a multi-agent plan, grouped by the agent components' dependencies
+
+    Components without dependency information keep the sequential chain."""
+    dependencies = [
+        component.dependencies
+        for component in execution_plan.components
+        if component.resource_type == ResourceType.AGENT
+    ]
+    steps = [
+        {"id": agent_id, "step": i, "depends_on": dependencies[i] if i < len(dependencies) else None}
+        for i, agent_id in enumerate(execution_plan.agent_sequence)
+    ]
+    return [[(step["step"], step["id"]) for step in level] for level in _agent_levels(steps)]
+
+def _run_registry_agent(agent_id: str, agent_state: State) -> Dict[str, Any]:
+    return enhanced_agent_registry.get_agent(agent_id).process_request(agent_state)
+
+def _iter_level_results(
+    executor: Optional[ThreadPoolExecutor], runnable: List[Tuple[int, str, State]]
+) -> Generator[Tuple[int, str, Optional[Dict[str, Any]], Optional[BaseException]], None, None]:
+    """(index, agent id, result, error) for each agent of a level, in completion order"""
+    if len(runnable) == 1:
+        i, agent_id, agent_state = runnable[0]
+        try:
+            yield i, agent_id, _run_registry_agent(agent_id, agent_state), None
+        except Exception as e:
+            yield i, agent_id, None, e
+        return
+    steps_by_future: Dict[Future, Tuple[int, str]] = {
+        executor.submit(_run_registry_agent, agent_id, agent_state): (i, agent_id)
+        for i, agent_id, agent_state in runnable
+    }
+    for future in as_completed(steps_by_future):
+        i, agent_id = steps_by_future[future]
+        error = future.exception()
+        yield i, agent_id, None if error is not None else future.result(), error
+
+def execute_multi_agent_orchestration(execution_plan, user_prompt, chat_history, hist, enhanced_supervisor):
+    """Execute multi-agent workflow with step-by-step tracking"""
+    return _run_to_completion(
+        iter_multi_agent_orchestration(execution_plan, user_prompt, chat_history, hist, enhanced_supervisor)
+    )
+
+def _web_search_output(user_prompt: str) -> Dict[str, str]:
+    search_query = _generate_web_search_query(user_prompt)
+    return {
+        "query": search_query,
+        "result": run_tool(search_query)
+    }
+
+# Tools the supervisor runs itself before handing a request to a single agent
+_SUPERVISOR_TOOLS = {
+    "web_search": _web_search_output,
+}
+
+def run_supervisor_tools(tools_needed: List[str], user_prompt: str) -> Dict[str, Dict[str, str]]:
+    """Run the plan's supervisor-side tools, concurrently when there is more than one
+
+    Outputs are keyed by tool name in plan order."""
+    names = [name for name in dict.fromkeys(tools_needed) if name in _SUPERVISOR_TOOLS]
+    if len(names) <= 1:
+        return {name: _SUPERVISOR_TOOLS[name](user_prompt) for name in names}
+    
+    # Each tool is a blocking network round-trip, so overlap them
+    with ThreadPoolExecutor(max_workers=len(names)) as executor:
+        futures = [executor.submit(_SUPERVISOR_TOOLS[name], user_prompt) for name in names]
+        return {name: future.result() for name, future in zip(names, futures)}
+
+def _build_enhanced_context(user_prompt: str, execution_plan, tool_outputs: Dict[str, Any], plan_explanation: Optional[str] = None) -> str:
+    """Prompt for the primary agent of a single-agent plan (tool results as compact JSON)"""
+    parts = [f"Original request: {user_prompt}"]
+    if plan_explanation:
+        parts.append(f"Enhanced Analysis:\n{plan_explanation}")
+    parts.append(f"Tool Results:\n{_dumps(tool_outputs).decode('utf-8') if tool_outputs else 'No tools executed'}")
+    parts.append(f"Instructions: Respond as {execution_plan.primary_agent} using the {execution_plan.context_fusion} approach.")
+    return "\n\n".join(parts)
 
 def execute_single_agent_orchestration(execution_plan, user_prompt, chat_history, hist, enhanced_supervisor):
     """Execute single agent workflow"""
     # This is the original single-agent logic
-    tool_outputs = {}
     
     # Execute tools
-    if "web_search" in execution_plan.tools_needed:
-        from .tools.tool_config import _generate_web_search_query
-        from .tools.web_search import run_tool
-        
-        search_query = _generate_web_search_query(user_prompt)
-        search_result = run_tool(search_query)
-        tool_outputs["web_search"] = {
-            "query": search_query,
-            "result": search_result
-        }
-        
+    tool_outputs = run_supervisor_tools(execution_plan.tools_needed, user_prompt)
+    for tool_name, tool_output in tool_outputs.items():
         hist.append({
             "sender": "tool",
-            "text": search_result,
-            "tool_id": "web_search",
+            "text": tool_output["result"],
+            "tool_id": tool_name,
             "for_agent": execution_plan.primary_agent,
             "via_supervisor": True
         })
     
     # Execute the primary agent
-    enhanced_context = f"""Original request: {user_prompt}
-
-Tool Results:
-{json.dumps(tool_outputs, indent=2) if tool_outputs else "No tools executed"}
-
-Instructions: Respond as {execution_plan.primary_agent} using the {execution_plan.context_fusion} approach."""
+    enhanced_context = _build_enhanced_context(user_prompt, execution_plan, tool_outputs)
     
     agent_state = State(
         user_prompt=enhanced_context,
-        history=chat_history,
+        history=context_window(chat_history),
         tool_outputs=tool_outputs,
         agent_flow=[{"id": execution_plan.primary_agent, "enabled": True, "tools": []}]
     )
@@ -728,36 +1093,59 @@ Instructions: Respond as {execution_plan.primary_agent} using the {execution_pla
         "supervisor_type": "enhanced"
     }
 
+KB_FILE = Path(__file__).parent.parent / "data" / "knowledgebase.json"
+AGENTS_CONFIG_FILE = Path(__file__).parent.parent / "data" / "agents_config.json"
+
+class KBFile:
+    """Knowledgebase entry metadata in the shape EnhancedSupervisor reads"""
+    __slots__ = ("description", "keywords", "label", "content_type")
+    
+    def __init__(self, kb_info: Dict[str, Any]):
+        self.description = kb_info.get('description', '')
+        self.keywords = kb_info.get('keywords', [])
+        self.label = kb_info.get('label', '')
+        self.content_type = kb_info.get('content_type', '')
+
+@functools.lru_cache(maxsize=4)
+def _read_knowledgebase(mtime_ns: int) -> Dict[str, Any]:
+    """Parsed knowledgebase.json, cached per file mtime so edits are still picked up"""
+    return _loads(KB_FILE.read_bytes())
+
+@functools.lru_cache(maxsize=4)
+def _kb_metadata(mtime_ns: int) -> Dict[str, KBFile]:
+    return {
+        kb_key: KBFile(kb_info)
+        for kb_key, kb_info in _read_knowledgebase(mtime_ns).items()
+        if isinstance(kb_info, dict)
+    }
+
+def load_knowledgebase() -> Dict[str, Any]:
+    """Knowledgebase contents (shared; callers must not mutate)"""
+    return _read_knowledgebase(KB_FILE.stat().st_mtime_ns)
+
+def load_kb_metadata() -> Dict[str, KBFile]:
+    return _kb_metadata(KB_FILE.stat().st_mtime_ns)
+
+@functools.lru_cache(maxsize=8)
+def _get_supervisor(agents_key: Tuple[str, ...], kb_mtime_ns: Optional[int], config_mtime_ns: int) -> EnhancedSupervisor:
+    """One supervisor per agent set, knowledgebase version (None = no knowledgebase) and agents_config.json version"""
+    kb_metadata = _kb_metadata(kb_mtime_ns) if kb_mtime_ns is not None else {}
+    return create_enhanced_supervisor(list(agents_key), kb_metadata)
+
 def process_supervisor_message(chat_id: str, user_prompt: str):
     """Process message using enhanced supervisor with query decomposition and orchestration"""
     try:
-        from .supervisor.enhanced_supervisor import EnhancedSupervisor
-        
         # Load knowledgebase metadata
-        kb_path = Path(__file__).parent.parent / "data" / "knowledgebase.json"
         try:
-            with open(kb_path, "r", encoding="utf-8") as f:
-                kb_data = json.load(f)
-                # Convert to metadata format that matches real structure
-                kb_metadata = {}
-                for kb_key, kb_info in kb_data.items():
-                    if isinstance(kb_info, dict):
-                        kb_metadata[kb_key] = type('KBFile', (), {
-                            'description': kb_info.get('description', ''),
-                            'keywords': kb_info.get('keywords', []),
-                            'label': kb_info.get('label', ''),
-                            'content_type': kb_info.get('content_type', '')
-                        })()
+            kb_mtime_ns = KB_FILE.stat().st_mtime_ns
+            _kb_metadata(kb_mtime_ns)
         except Exception as e:
             print(f"Knowledge base loading error: {e}")
-            kb_metadata = {}
+            kb_mtime_ns = None
         
-        # Create enhanced supervisor with all available agents
+        # Reuse the supervisor built for these agents and this knowledgebase version
         available_agents = enhanced_agent_registry.list_available_agents()
-        enhanced_supervisor = EnhancedSupervisor(
-            available_agents=available_agents,
-            knowledgebase_metadata=kb_metadata
-        )
+        enhanced_supervisor = _get_supervisor(tuple(available_agents), kb_mtime_ns, AGENTS_CONFIG_FILE.stat().st_mtime_ns)
         
         # Analyze the query
         execution_plan = enhanced_supervisor.analyze_query(user_prompt)
@@ -782,7 +1170,7 @@ Components Detected: {len(execution_plan.components)}"""
         chat_history = []
         if chat_id in chats:
             chat = chats[chat_id]
-            chat_history = [ChatMessage(**m) for m in chat.get("history", [])]
+            chat_history = parsed_history(chat_id, chat.get("history", []))
         
         # Execute the plan - check if multi-agent execution is needed
         if execution_plan.requires_multi_agent:
@@ -826,30 +1214,12 @@ Components Detected: {len(execution_plan.components)}"""
             }
         else:
             # Single agent execution (original logic)
-            tool_outputs = {}
             
             # Execute tools
-            if "web_search" in execution_plan.tools_needed:
-                from .tools.tool_config import _generate_web_search_query
-                from .tools.web_search import run_tool
-                
-                search_query = _generate_web_search_query(user_prompt)
-                search_result = run_tool(search_query)
-                tool_outputs["web_search"] = {
-                    "query": search_query,
-                    "result": search_result
-                }
+            tool_outputs = run_supervisor_tools(execution_plan.tools_needed, user_prompt)
             
             # Execute the primary agent with enhanced context
-            enhanced_context = f"""Original request: {user_prompt}
-
-Enhanced Analysis:
-{plan_explanation}
-
-Tool Results:
-{json.dumps(tool_outputs, indent=2) if tool_outputs else "No tools executed"}
-
-Instructions: Respond as {execution_plan.primary_agent} using the {execution_plan.context_fusion} approach."""
+            enhanced_context = _build_enhanced_context(user_prompt, execution_plan, tool_outputs, plan_explanation)
             
             # Create agent state with enhanced context AND conversation history
             agent_state = State(
@@ -886,9 +1256,7 @@ Instructions: Respond as {execution_plan.primary_agent} using the {execution_pla
             }
         
     except Exception as e:
-        print(f"Enhanced supervisor failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Enhanced supervisor failed")
         
         # Return error if enhanced supervisor fails
         return {
@@ -906,9 +1274,7 @@ Instructions: Respond as {execution_plan.primary_agent} using the {execution_pla
 
 @app.get("/knowledgebase")
 def get_knowledgebase():
-    kb_path = Path(__file__).parent.parent / "data" / "knowledgebase.json"
-    with open(kb_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return load_knowledgebase()
 
 @app.get("/agents")
 def list_available_agents():
@@ -986,6 +1352,11 @@ def reload_agents():
     """Reload all agents (useful for development)"""
     try:
         enhanced_agent_registry.reload_agents()
+        get_agent_function.cache_clear()
+        _get_supervisor.cache_clear()
+        clear_plan_cache()
+        _skills_body.cache_clear()
+        _tools_body.cache_clear()
         agents_metadata = enhanced_agent_registry.list_all_agents_metadata()
         return {
             "message": "Agents reloaded successfully",
@@ -996,98 +1367,104 @@ def reload_agents():
         raise HTTPException(status_code=500, detail=f"Error reloading agents: {str(e)}")
 
 
+def _json_body(payload: Dict[str, Any]) -> Tuple[bytes, str]:
+    """Serialized payload plus a strong ETag for it"""
+    body = _dumps(payload)
+    return body, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+def _cached_json_response(request: Request, body: bytes, etag: str) -> Response:
+    """Serve pre-serialized JSON, or 304 when the client already has this version"""
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+@functools.lru_cache(maxsize=4)
+def _skills_body(mtime_ns: int) -> Tuple[bytes, str]:
+    """/skills response for one version of agents_config.json"""
+    config_data = _loads(AGENTS_CONFIG_FILE.read_bytes())
+    
+    skills = config_data.get('skills', {})
+    skills_list = []
+    
+    for skill_id, skill_config in skills.items():
+        skills_list.append({
+            "id": skill_id,
+            "name": skill_config.get("name", skill_id.title()),
+            "description": skill_config.get("description", f"Skill: {skill_id}"),
+            "function": skill_config.get("function", f"{skill_id}_skill"),
+            "parameters": skill_config.get("parameters", {}),
+            "category": skill_config.get("category", "general")
+        })
+    
+    return _json_body({
+        "skills": skills_list,
+        "total": len(skills_list),
+        "success": True
+    })
+
+@functools.lru_cache(maxsize=4)
+def _tools_body(registry_version: int) -> Tuple[bytes, str]:
+    """/tools response for one version of the tool registry"""
+    all_tools = get_all_available_tools()
+    tools_list = []
+    
+    for tool_name in all_tools:
+        tool_metadata = get_tool_description(tool_name)
+        if tool_metadata:
+            tools_list.append({
+                "id": tool_name,
+                "name": tool_metadata.name,
+                "description": tool_metadata.description,
+                "use_cases": tool_metadata.use_cases,
+                "input_format": tool_metadata.input_format,
+                "confidence_threshold": tool_metadata.confidence_threshold,
+                "fallback_behavior": tool_metadata.fallback_behavior
+            })
+        else:
+            # Fallback for tools without metadata
+            tools_list.append({
+                "id": tool_name,
+                "name": tool_name.replace("_", " ").title(),
+                "description": f"Tool: {tool_name}",
+                "use_cases": [],
+                "input_format": "General input",
+                "confidence_threshold": 0.7,
+                "fallback_behavior": "inform_user"
+            })
+    
+    return _json_body({
+        "tools": tools_list,
+        "total": len(tools_list),
+        "success": True
+    })
+
 @app.get("/skills")
-def get_all_skills():
+def get_all_skills(request: Request):
     """Get all available skills with their metadata"""
     try:
-        import json
-        import os
-        
-        config_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'agents_config.json')
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config_data = json.load(f)
-        
-        skills = config_data.get('skills', {})
-        skills_list = []
-        
-        for skill_id, skill_config in skills.items():
-            skills_list.append({
-                "id": skill_id,
-                "name": skill_config.get("name", skill_id.title()),
-                "description": skill_config.get("description", f"Skill: {skill_id}"),
-                "function": skill_config.get("function", f"{skill_id}_skill"),
-                "parameters": skill_config.get("parameters", {}),
-                "category": skill_config.get("category", "general")
-            })
-        
-        return {
-            "skills": skills_list,
-            "total": len(skills_list),
-            "success": True
-        }
+        body, etag = _skills_body(AGENTS_CONFIG_FILE.stat().st_mtime_ns)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading skills: {str(e)}")
+    return _cached_json_response(request, body, etag)
 
 
 @app.get("/tools")
-def get_all_tools():
+def get_all_tools(request: Request):
     """Get all available tools with their metadata"""
     try:
-        from .tools.tool_config import get_all_available_tools, get_tool_description
-        
-        all_tools = get_all_available_tools()
-        tools_list = []
-        
-        for tool_name in all_tools:
-            tool_metadata = get_tool_description(tool_name)
-            if tool_metadata:
-                tools_list.append({
-                    "id": tool_name,
-                    "name": tool_metadata.name,
-                    "description": tool_metadata.description,
-                    "use_cases": tool_metadata.use_cases,
-                    "input_format": tool_metadata.input_format,
-                    "confidence_threshold": tool_metadata.confidence_threshold,
-                    "fallback_behavior": tool_metadata.fallback_behavior
-                })
-            else:
-                # Fallback for tools without metadata
-                tools_list.append({
-                    "id": tool_name,
-                    "name": tool_name.replace("_", " ").title(),
-                    "description": f"Tool: {tool_name}",
-                    "use_cases": [],
-                    "input_format": "General input",
-                    "confidence_threshold": 0.7,
-                    "fallback_behavior": "inform_user"
-                })
-        
-        return {
-            "tools": tools_list,
-            "total": len(tools_list),
-            "success": True
-        }
+        body, etag = _tools_body(get_tool_registry_version())
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading tools: {str(e)}")
+    return _cached_json_response(request, body, etag)
 
 @app.get("/chats")
 def list_chats():
-    # Only return chats that have content (messages or enabled agents)
-    meaningful_chats = []
-    for chat_data in chats.values():
-        has_messages = len(chat_data.get("history", [])) > 0
-        has_enabled_agents = any(
-            agent.get("enabled", False) 
-            for agent in chat_data.get("agent_sequence", [])
-        )
-        
-        if has_messages or has_enabled_agents:
-            meaningful_chats.append({
-                "id": chat_data["id"], 
-                "agent_sequence": chat_data["agent_sequence"]
-            })
-    
-    return meaningful_chats
+    # Only return chats that have content (messages or enabled agents), tracked as chats change
+    return [
+        {"id": chats[chat_id]["id"], "agent_sequence": chats[chat_id]["agent_sequence"]}
+        for chat_id in list(meaningful_chat_ids)
+        if chat_id in chats
+    ]
 
 @app.post("/chats")
 def create_chat():
@@ -1122,19 +1499,142 @@ def update_settings(chat_id: str, settings: ChatSettings):
         any(a["enabled"] for a in chats[chat_id]["agent_sequence"]) or
         settings.supervisor_mode
     )
+    # Also when not saved: the chat may have just lost its last enabled agent
+    _update_meaningful(chat_id)
     if has_content:
-        save_chats()
+        save_chats(chat_id)
     return {"ok": True}
 
+def _agent_levels(enabled: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Group enabled agents into levels whose agents can stream concurrently
+
+    Dependencies only count on agents earlier in the sequence, so the levels keep sequence order."""
+    level_of: Dict[str, int] = {}
+    levels: List[List[Dict[str, Any]]] = []
+    for agent_config in enabled:
+        depends_on = agent_config.get("depends_on")
+        if depends_on is None:
+            level = len(levels)
+        else:
+            level = 1 + max((level_of[dep] for dep in depends_on if dep in level_of), default=-1)
+        level_of[agent_config["id"]] = level
+        if level == len(levels):
+            levels.append([])
+        levels[level].append(agent_config)
+    return levels
+
+def _agent_stream_events(agent_id: str, state: State) -> Generator[Dict[str, Any], None, None]:
+    """stream_start, stream_chunk and stream_end messages for one agent's streamed response"""
+    # Signal start of agent response
+    yield {
+        "sender": agent_id,
+        "text": "",
+        "stream_start": True
+    }
+    
+    # Stream the agent's response using enhanced registry
+    chunks: List[str] = []
+    try:
+        # Get agent from enhanced registry and stream response
+        agent = enhanced_agent_registry.get_agent(agent_id)
+        for chunk in agent.process_request_stream(state):
+            chunks.append(chunk)
+            yield {
+                "sender": agent_id,
+                "text": chunk,
+                "stream_chunk": True
+            }
+        full_response = "".join(chunks)
+    except Exception as e:
+        # Fallback if streaming fails
+        yield {
+            "sender": agent_id,
+            "text": f"Error streaming from {agent_id}: {str(e)}",
+            "stream_chunk": True,
+            "error": True
+        }
+        full_response = f"Error: {str(e)}"
+    
+    # Signal end of agent response with the full text
+    yield {
+        "sender": agent_id,
+        "text": full_response,
+        "stream_end": True
+    }
+
+async def _stream_level_concurrently(level: List[Dict[str, Any]], current_state: State) -> AsyncIterator[Dict[str, Any]]:
+    """Stream a level of independent agents from worker threads, yielding messages as they arrive
+
+    Each agent records its output on its own copy of the state; once the whole level has finished
+    the outputs are merged into current_state in sequence order. If the consumer stops early, the
+    workers stop at their next chunk and workers that haven't started are cancelled."""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+    level_states: List[Tuple[str, State]] = []
+    
+    def put(msg: Optional[Dict[str, Any]]):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, msg)
+        except RuntimeError:
+            # Event loop already closed; nobody is listening any more
+            stop.set()
+    
+    def pump(agent_id: str, agent_state: State):
+        events = _agent_stream_events(agent_id, agent_state)
+        try:
+            for msg in events:
+                if stop.is_set():
+                    break
+                put(msg)
+        finally:
+            # Closing the generator also closes the agent's LLM stream
+            events.close()
+            put(None)
+    
+    futures = []
+    for agent_config in level:
+        agent_state = current_state.with_updates(
+            agent_outputs=dict(current_state.agent_outputs),
+            agent_metadata=dict(current_state.agent_metadata)
+        )
+        level_states.append((agent_config["id"], agent_state))
+        futures.append(loop.run_in_executor(None, pump, agent_config["id"], agent_state))
+    
+    try:
+        running = len(futures)
+        while running:
+            msg = await queue.get()
+            if msg is None:
+                running -= 1
+                continue
+            yield msg
+    finally:
+        stop.set()
+        for future in futures:
+            future.cancel()
+    
+    for agent_id, agent_state in level_states:
+        if agent_id in agent_state.agent_outputs:
+            current_state.set_agent_output(
+                agent_id,
+                agent_state.agent_outputs[agent_id],
+                agent_state.agent_metadata.get(agent_id)
+            )
+
+async def _as_server_sent_events(lines: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Frame NDJSON stream lines as SSE data events (control-flow entries carry sender "control_flow")"""
+    async for line in lines:
+        yield f"data: {line}\n"
+
 @app.post("/chats/{chat_id}/message/stream")
-async def stream_message(chat_id: str, req: MessageRequest):
+async def stream_message(chat_id: str, req: MessageRequest, request: Request):
     if chat_id not in chats:
         raise HTTPException(404, "Chat not found")
     
     chat = chats[chat_id]
     
     async def stream_generator():
-        import json
         # Legacy imports removed - now using enhanced_agent_registry for streaming too
         # from .granny.agent import create_granny_response_stream
         # from .story_creator.agent import create_story_response_stream  
@@ -1142,36 +1642,25 @@ async def stream_message(chat_id: str, req: MessageRequest):
         
         hist = chat["history"]
         hist.append({"sender": "user", "text": req.user_prompt})
+        _update_meaningful(chat_id)
         
         # Check if supervisor mode is enabled
         if chat.get("supervisor_mode", False) and SUPERVISOR_AVAILABLE:
             try:
-                # Process with supervisor
-                result = process_multi_agent_supervisor_message(
-                    chat_id, 
-                    req.user_prompt
-                )
+                # Process with supervisor, streaming multi-agent history entries as each step records them.
+                # Agents block on LLM calls, so the orchestration is advanced off the event loop.
+                events = iter_multi_agent_supervisor_message(chat_id, req.user_prompt)
+                while True:
+                    done, value = await asyncio.to_thread(next_history_event, events)
+                    if done:
+                        result = value
+                        break
+                    yield json.dumps(value) + "\n"
+                    logger.debug("Streamed message from %s", value.get("sender", "unknown"))
                 
-                # Check if this is a multi-agent response
-                if result.get("multi_agent_execution", False):
-                    # For multi-agent: all messages were already added to hist during orchestration
-                    # Stream all messages that were added during orchestration (everything after user message)
-                    print(f"🔍 DEBUG: Multi-agent streaming - hist has {len(hist)} messages")
-                    
-                    # Find the last user message (the one we just processed)
-                    user_msg_index = -1
-                    for i in range(len(hist) - 1, -1, -1):
-                        if hist[i].get("sender") == "user" and hist[i].get("text") == req.user_prompt:
-                            user_msg_index = i
-                            break
-                    
-                    # Stream all messages added after the user message
-                    if user_msg_index >= 0:
-                        for msg in hist[user_msg_index + 1:]:
-                            yield json.dumps(msg) + "\n"
-                            print(f"🔍 DEBUG: Streamed message from {msg.get('sender', 'unknown')}")
-                    else:
-                        print(f"🔍 DEBUG: Could not find user message to start streaming from")
+                if result.get("multi_agent_execution", False) or result.get("error", False):
+                    # Multi-agent runs and planning errors were streamed entry by entry above
+                    logger.debug("Multi-agent streaming - hist has %d messages", len(hist))
                 
                 else:
                     # Single-agent logic (original)
@@ -1216,13 +1705,11 @@ async def stream_message(chat_id: str, req: MessageRequest):
                     hist.append(agent_msg)
                     yield json.dumps(agent_msg) + "\n"
                 
-                save_chats()
+                save_chats(chat_id)
                 return
                 
             except Exception as e:
-                print(f"Supervisor streaming failed: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("Supervisor streaming failed")
                 # Return error message instead of falling back
                 error_msg = {
                     "sender": "system",
@@ -1231,7 +1718,7 @@ async def stream_message(chat_id: str, req: MessageRequest):
                 }
                 hist.append(error_msg)
                 yield json.dumps(error_msg) + "\n"
-                save_chats()
+                save_chats(chat_id)
                 return
         
         # Sequential mode (original logic)
@@ -1240,52 +1727,24 @@ async def stream_message(chat_id: str, req: MessageRequest):
         if not enabled:
             raise HTTPException(400, "No agents enabled")
         
-        execution_plan = build_execution_plan(enabled, req.user_prompt)
+        # Validates the tool configuration; tools below run directly rather than as graph nodes
+        build_execution_plan(enabled, req.user_prompt)
         previous = chat["history"]
         state = State(
             user_prompt=req.user_prompt, 
-            history=[ChatMessage(**m) for m in previous],
+            history=parsed_history(chat_id, previous),
             agent_flow=enabled
         )
         
         # Execute tools first for all enabled agents
-        from .tools.tool_executor import execute_intelligent_tools
-        from .tools.tool_config import ToolConfig
-        
         # Initialize state with current state
         current_state = state
         
-        # Function to determine intelligent tools (reuse the same logic as supervisor mode)
-        def determine_needed_tools(user_prompt: str, agent_name: str) -> list:
-            """Determine which tools an agent should use based on the request content"""
-            tools = []
-            
-            prompt_lower = user_prompt.lower()
-            
-            # Web search tool - for current information, news, weather, etc.
-            web_search_triggers = [
-                "today", "current", "now", "latest", "recent", "news", 
-                "weather", "temperature", "forecast", "happening",
-                "what's", "what is", "price", "stock", "update"
-            ]
-            if any(trigger in prompt_lower for trigger in web_search_triggers):
-                tools.append(ToolConfig(name="web_search"))
-            
-            # Knowledgebase tool - for recipes, traditional knowledge, etc.
-            kb_triggers = [
-                "recipe", "cooking", "traditional", "romanian", "ciorba",
-                "soup", "food", "ingredient", "how to make", "prepare"
-            ]
-            if any(trigger in prompt_lower for trigger in kb_triggers):
-                # Try to find a relevant knowledgebase option
-                kb_option = None
-                if "ciorba" in prompt_lower or "soup" in prompt_lower:
-                    kb_option = "ciorba_recipe"
-                tools.append(ToolConfig(name="knowledgebase", option=kb_option))
-            
-            return tools
-        
         # Collect all tools from enabled agents (manual + intelligent)
+        prompt_lower = req.user_prompt.lower()
+        # Tool name -> first agent configured with it (manual) or that triggered it (intelligent)
+        manual_owner: Dict[str, str] = {}
+        intelligent_owner: Dict[str, str] = {}
         for agent_config in enabled:
             # Get manually configured tools
             manual_tools = []
@@ -1297,27 +1756,28 @@ async def stream_message(chat_id: str, req: MessageRequest):
                 ]
             
             # Get intelligently determined tools
-            intelligent_tools = determine_needed_tools(req.user_prompt, agent_config["id"])
+            intelligent_tools = determine_needed_tools(prompt_lower, agent_config["id"])
             
             # Combine (intelligent takes priority)
-            all_tools = intelligent_tools + [t for t in manual_tools if t.name not in [it.name for it in intelligent_tools]]
+            intelligent_names = {it.name for it in intelligent_tools}
+            all_tools = intelligent_tools + [t for t in manual_tools if t.name not in intelligent_names]
+            
+            for t in manual_tools:
+                manual_owner.setdefault(t.name, agent_config["id"])
+            for name in intelligent_names:
+                intelligent_owner.setdefault(name, agent_config["id"])
             
             if all_tools:
-                current_state = execute_intelligent_tools(current_state, all_tools, agent_config["id"])
+                # Tool calls are blocking I/O; keep them off the event loop
+                current_state = await asyncio.to_thread(execute_intelligent_tools, current_state, all_tools, agent_config["id"])
         
         # Stream tool outputs first
         if current_state.tool_outputs:
+            # Manually configured tools are attributed to their agent ahead of intelligent triggers
+            tool_to_agent = {**intelligent_owner, **manual_owner}
             for tool_name, result in current_state.tool_outputs.items():
                 # Find which agent this tool belongs to
-                matched_agent = None
-                for agent in enabled:
-                    for t in agent.get("tools") or []:
-                        name = t.name if isinstance(t, ToolConfig) else (t.get("name") if isinstance(t, dict) else t)
-                        if name == tool_name:
-                            matched_agent = agent["id"]
-                            break
-                    if matched_agent:
-                        break
+                matched_agent = tool_to_agent.get(tool_name)
                 
                 # Extract text from result (could be string or dict)
                 if isinstance(result, dict):
@@ -1334,53 +1794,48 @@ async def stream_message(chat_id: str, req: MessageRequest):
                 hist.append(tool_msg)
                 yield json.dumps(tool_msg) + "\n"
         
-        # Now stream each enabled agent's response
-        for agent_config in enabled:
-            agent_id = agent_config["id"]
-            
-            # Signal start of agent response
-            start_msg = {
-                "sender": agent_id,
-                "text": "",
-                "stream_start": True
-            }
-            yield json.dumps(start_msg) + "\n"
+        # Now stream each enabled agent's response, one dependency level at a time
+        for level in _agent_levels(enabled):
+            if len(level) == 1:
+                agent_id = level[0]["id"]
+                events = _agent_stream_events(agent_id, current_state)
+                try:
+                    while True:
+                        # Each step waits on the LLM, so advance the stream in a worker thread
+                        msg = await asyncio.to_thread(next, events, None)
+                        if msg is None:
+                            break
+                        if msg.get("stream_end"):
+                            hist.append({"sender": agent_id, "text": msg["text"]})
+                        yield json.dumps(msg) + "\n"
+                finally:
+                    try:
+                        events.close()
+                    except ValueError:
+                        # Cancelled while a worker is still inside next(); the generator is dropped instead
+                        pass
+                continue
             
-            # Stream the agent's response using enhanced registry
-            full_response = ""
+            # Independent agents: stream them concurrently, forwarding chunks as they arrive
+            responses: Dict[str, str] = {}
+            level_events = _stream_level_concurrently(level, current_state)
             try:
-                # Get agent from enhanced registry and stream response
-                agent = enhanced_agent_registry.get_agent(agent_id)
-                for chunk in agent.process_request_stream(current_state):
-                    full_response += chunk
-                    chunk_msg = {
-                        "sender": agent_id,
-                        "text": chunk,
-                        "stream_chunk": True
-                    }
-                    yield json.dumps(chunk_msg) + "\n"
-            except Exception as e:
-                # Fallback if streaming fails
-                error_msg = {
-                    "sender": agent_id,
-                    "text": f"Error streaming from {agent_id}: {str(e)}",
-                    "stream_chunk": True,
-                    "error": True
-                }
-                yield json.dumps(error_msg) + "\n"
-                full_response = f"Error: {str(e)}"
+                async for msg in level_events:
+                    if msg.get("stream_end"):
+                        responses[msg["sender"]] = msg["text"]
+                    yield json.dumps(msg) + "\n"
+            finally:
+                # Stops the workers if the client went away mid-level
+                await level_events.aclose()
             
-            # Signal end of agent response and save full response
-            end_msg = {
-                "sender": agent_id,
-                "text": full_response,
-                "stream_end": True
-            }
-            hist.append({"sender": agent_id, "text": full_response})
-            yield json.dumps(end_msg) + "\n"
+            for agent_config in level:
+                hist.append({"sender": agent_config["id"], "text": responses.get(agent_config["id"], "")})
         
-        save_chats()
+        save_chats(chat_id)
     
+    # Clients that ask for SSE get proper event framing; the default stays newline-delimited JSON
+    if "text/event-stream" in request.headers.get("accept", ""):
+        return StreamingResponse(_as_server_sent_events(stream_generator()), media_type="text/event-stream")
     return StreamingResponse(stream_generator(), media_type="text/event-stream")
 
 @app.post("/chats/{chat_id}/message")
@@ -1396,22 +1851,22 @@ def send_message(chat_id: str, req: MessageRequest):
             # Use enhanced multi-agent supervisor orchestration
             result = process_multi_agent_supervisor_message(chat_id, req.user_prompt)
             
-            save_chats()
-            return result
+            save_chats(chat_id)
+            # Plain dict of strings; serialize it directly rather than through jsonable_encoder
+            return _ResponseClass(content=result)
             
         except Exception as e:
-            print(f"Supervisor routing failed: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Supervisor routing failed")
             # Return error response instead of falling back
             hist = chat["history"]
             hist.append({"sender": "user", "text": req.user_prompt})
+            _update_meaningful(chat_id)
             hist.append({
                 "sender": "system",
                 "text": f"Supervisor mode failed: {str(e)}. Please try again or disable supervisor mode.",
                 "error": True
             })
-            save_chats()
+            save_chats(chat_id)
             
             return {
                 "system_error": f"Supervisor mode failed: {str(e)}",
@@ -1425,14 +1880,14 @@ def send_message(chat_id: str, req: MessageRequest):
     if not enabled:
         raise HTTPException(400, "No agents enabled")
     
-    execution_plan = build_execution_plan(enabled, req.user_prompt)
+    execution_plan, tool_configs = build_execution_plan(enabled, req.user_prompt)
     previous = chat["history"]
     state = State(
         user_prompt=req.user_prompt, 
-        history=[ChatMessage(**m) for m in previous],
+        history=parsed_history(chat_id, previous),
         agent_flow=enabled
     )
-    flow = build_dynamic_graph(execution_plan)
+    flow = build_dynamic_graph(execution_plan, tool_configs)
     
     # Execute the flow
     out = State(**flow.invoke(state))
@@ -1440,6 +1895,7 @@ def send_message(chat_id: str, req: MessageRequest):
     # Build response history
     hist = chat["history"]
     hist.append({"sender": "user", "text": req.user_prompt})
+    _update_meaningful(chat_id)
     
     # Add tool outputs to history
     if out.tool_outputs:
@@ -1475,7 +1931,7 @@ def send_message(chat_id: str, req: MessageRequest):
     if out.parody_output:
         hist.append({"sender": "parody_creator", "text": out.parody_output})
     
-    save_chats()
+    save_chats(chat_id)
     return out.dict(exclude_none=True)
 
 @app.post("/chats/{chat_id}/supervisor")
@@ -1489,7 +1945,7 @@ def toggle_supervisor_mode(chat_id: str, enabled: bool = True):
     
     chats[chat_id]["supervisor_mode"] = enabled
     chats[chat_id]["supervisor_type"] = "enhanced"  # Always use enhanced
-    save_chats()
+    save_chats(chat_id)
     
     return {
         "supervisor_mode": enabled,
@@ -1530,6 +1986,10 @@ def cleanup_empty_chats():
     # Update in-memory chats
     chats.clear()
     chats.update(meaningful_chats)
+    _parsed_histories.clear()
+    for chat_id in list(meaningful_chat_ids):
+        if chat_id not in chats:
+            del meaningful_chat_ids[chat_id]
     
     # Save to disk
     save_chats()
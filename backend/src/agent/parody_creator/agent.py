@@ -4,7 +4,7 @@ from langchain.schema import SystemMessage, HumanMessage
 from dotenv import load_dotenv
 from typing import Generator, List
 from ..state import State
-from ..tools.tool_config import ToolConfig
+from ..tools.tool_config import get_agent_tool_configs
 from ..tools.tool_executor import get_agent_tools_context, execute_intelligent_tools
 
 load_dotenv()
@@ -13,16 +13,7 @@ llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=1.2, streaming=True)
 
 def create_parody(state: State) -> dict:
     # Get parody creator's tools from the current flow
-    parody_tools = []
-    if state.agent_flow:
-        for agent_config in state.agent_flow:
-            if agent_config["id"] == "parody_creator" and "tools" in agent_config:
-                parody_tools = [
-                    ToolConfig(name=tool["name"], option=tool.get("option"))
-                    if isinstance(tool, dict) else ToolConfig(name=tool)
-                    for tool in agent_config["tools"]
-                ]
-                break
+    parody_tools = get_agent_tool_configs(state.agent_flow_by_id.get("parody_creator"))
     
     # Execute tools intelligently if available
     if parody_tools:
@@ -34,7 +25,7 @@ def create_parody(state: State) -> dict:
     # Generate dynamic tools context for the agent prompt
     tools_context = get_agent_tools_context(parody_tools) if parody_tools else ""
     
-    convo = "\n".join(f"{msg.sender}: {msg.text}" for msg in state.history)
+    convo = state.format_history()
     
     # Dynamic system prompt with tool awareness
     system_content = """You are a parody creator who takes input and creates humorous, satirical, or playful versions of it. 
@@ -95,16 +86,7 @@ Remember: You are first and foremost a comedian and satirist, but now you can ac
 def create_parody_response_stream(state: State) -> Generator[str, None, None]:
     """Stream the parody creator response token by token"""
     # Get parody creator's tools from the current flow
-    parody_tools = []
-    if state.agent_flow:
-        for agent_config in state.agent_flow:
-            if agent_config["id"] == "parody_creator" and "tools" in agent_config:
-                parody_tools = [
-                    ToolConfig(name=tool["name"], option=tool.get("option"))
-                    if isinstance(tool, dict) else ToolConfig(name=tool)
-                    for tool in agent_config["tools"]
-                ]
-                break
+    parody_tools = get_agent_tool_configs(state.agent_flow_by_id.get("parody_creator"))
     
     # Execute tools intelligently if available
     if parody_tools:
@@ -116,7 +98,7 @@ def create_parody_response_stream(state: State) -> Generator[str, None, None]:
     # Generate dynamic tools context for the agent prompt
     tools_context = get_agent_tools_context(parody_tools) if parody_tools else ""
     
-    convo = "\n".join(f"{msg.sender}: {msg.text}" for msg in state.history)
+    convo = state.format_history()
     
     # Dynamic system prompt with tool awareness
     system_content = """You are a witty satirist who creates humorous parodies and clever commentary.
@@ -169,9 +151,6 @@ Remember: You are the court jester of the digital age, but now you can access re
         if hasattr(chunk, 'content') and chunk.content:
             content_str = str(chunk.content)
             full_response += content_str
-            # Add small delay for testing streaming
-            import time
-            time.sleep(0.05)  # 50ms delay between chunks
             yield content_str
     
     # Update state after streaming is complete
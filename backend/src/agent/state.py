@@ -1,5 +1,5 @@
 from typing import Optional, List, Dict, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
 class ChatMessage(BaseModel):
     sender: str
@@ -25,11 +25,34 @@ class State(BaseModel):
     
     # Execution context for tracking state across components
     execution_context: Dict[str, Any] = {}
+    
+    # (agent_flow, {agent_id → config}) so per-agent lookups skip the linear scan
+    _agent_flow_index: Optional[tuple] = PrivateAttr(default=None)
 
     def with_updates(self, **kwargs) -> "State":
         """Returns a new State object with updated fields."""
         return self.copy(update=kwargs)
     
+    @property
+    def agent_flow_by_id(self) -> Dict[str, Dict[str, Any]]:
+        """agent_flow keyed by agent id (first entry wins), rebuilt when agent_flow is replaced"""
+        flow = self.agent_flow
+        if not flow:
+            return {}
+        cached = self._agent_flow_index
+        if cached is None or cached[0] is not flow:
+            index: Dict[str, Dict[str, Any]] = {}
+            for agent_config in flow:
+                index.setdefault(agent_config["id"], agent_config)
+            cached = (flow, index)
+            self._agent_flow_index = cached
+        return cached[1]
+    
+    def format_history(self) -> str:
+        """Conversation history as "sender: text" lines"""
+        # A list comprehension lets join size the result in one pass
+        return "\n".join([f"{msg.sender}: {msg.text}" for msg in self.history])
+    
     def get_agent_output(self, agent_id: str) -> Optional[str]:
         """Get output from specific agent"""
         return self.agent_outputs.get(agent_id)
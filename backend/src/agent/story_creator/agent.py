@@ -1,18 +1,49 @@
+import functools
 from langchain_openai import ChatOpenAI
-from langchain.schema import SystemMessage, HumanMessage
+from langchain.schema import BaseMessage, SystemMessage, HumanMessage
 from dotenv import load_dotenv
-from typing import Generator, List, Dict, Any, Optional
+from typing import Generator, List, Dict, Any, Optional, Tuple
 from ..base_agent import BaseAgent
 from ..state import State
-from ..tools.tool_config import ToolConfig
+from ..tools.tool_config import ToolConfig, get_agent_tool_configs
 from ..tools.tool_executor import get_agent_tools_context, execute_intelligent_tools
 
 load_dotenv()
 
 
+# Prompts are plain strings built here, so wrap them without re-running pydantic validation
+_human_message = getattr(HumanMessage, "model_construct", HumanMessage.construct)
+
+
+@functools.lru_cache(maxsize=16)
+def _compose_system_message(system_prompt: str, tools_context: str) -> SystemMessage:
+    """System message for a prompt plus tools context, shared across requests with the same flow"""
+    if tools_context:
+        return SystemMessage(content=f"{system_prompt}\n\n{tools_context}")
+    return SystemMessage(content=system_prompt)
+
+
 class StoryCreatorAgent(BaseAgent):
     """Creative writer agent for crafting vivid, engaging stories and narratives"""
     
+    _SYSTEM_PROMPT = """You are a creative writer who crafts vivid, engaging stories. 
+You create compelling narratives with rich descriptions, interesting characters, and captivating plots.
+
+When you have tools available, you are aware of their capabilities and will use them strategically to enhance your storytelling.
+The system will automatically analyze your user's needs and provide you with relevant tool results when needed.
+Your job is to integrate any tool results naturally into your creative narrative.
+
+Remember: You are first and foremost a storyteller, but now you can access additional information to make your stories more authentic and engaging."""
+    
+    _TOOL_INSTRUCTIONS = (
+        "\nInstructions: Use the tool results above to enhance your story. "
+        "Integrate the information naturally into your creative narrative. "
+        "If the tools provided useful information, weave it into your story. "
+        "If the tool results weren't helpful, create an engaging story based on the user's request anyway."
+    )
+    
+    _STORY_REQUEST = "\nWrite a short, vivid story based on the provided context and any tool results."
+    
     def __init__(self, agent_id: str, config: Optional[Dict[str, Any]] = None):
         super().__init__(agent_id, config)
         self.llm = ChatOpenAI(
@@ -27,7 +58,8 @@ class StoryCreatorAgent(BaseAgent):
     def get_description(self) -> str:
         return "A creative writer who crafts vivid, engaging stories with rich descriptions, interesting characters, and captivating plots"
     
-    def get_capabilities(self) -> List[str]:
+    @classmethod
+    def declared_capabilities(cls) -> List[str]:
         return [
             "creative_writing", 
             "storytelling", 
@@ -41,15 +73,11 @@ class StoryCreatorAgent(BaseAgent):
             "fantasy"
         ]
     
+    def get_capabilities(self) -> List[str]:
+        return self.declared_capabilities()
+    
     def get_system_prompt(self) -> str:
-        return """You are a creative writer who crafts vivid, engaging stories. 
-You create compelling narratives with rich descriptions, interesting characters, and captivating plots.
-
-When you have tools available, you are aware of their capabilities and will use them strategically to enhance your storytelling.
-The system will automatically analyze your user's needs and provide you with relevant tool results when needed.
-Your job is to integrate any tool results naturally into your creative narrative.
-
-Remember: You are first and foremost a storyteller, but now you can access additional information to make your stories more authentic and engaging."""
+        return self._SYSTEM_PROMPT
     
     def get_routing_keywords(self) -> List[str]:
         return [
@@ -60,21 +88,11 @@ Remember: You are first and foremost a storyteller, but now you can access addit
     
     def _get_tools_for_request(self, state: State) -> List[ToolConfig]:
         """Get tools configured for this agent from the current flow"""
-        story_tools = []
-        if state.agent_flow:
-            for agent_config in state.agent_flow:
-                if agent_config["id"] == self.agent_id and "tools" in agent_config:
-                    story_tools = [
-                        ToolConfig(name=tool["name"], option=tool.get("option"))
-                        if isinstance(tool, dict) else ToolConfig(name=tool)
-                        for tool in agent_config["tools"]
-                    ]
-                    break
-        return story_tools
+        return get_agent_tool_configs(state.agent_flow_by_id.get(self.agent_id))
     
     def _build_prompt(self, state: State, tools_context: str = "") -> str:
         """Build the complete prompt for the agent"""
-        convo = "\n".join(f"{msg.sender}: {msg.text}" for msg in state.history)
+        convo = state.format_history()
         
         # Prepare the prompt with tool outputs if available
         prompt_parts = [f"Conversation history:\n{convo}"]
@@ -96,19 +114,14 @@ Remember: You are first and foremost a storyteller, but now you can access addit
         prompt_parts.append(f"\nUser's current request: {state.user_prompt}")
         
         if state.tool_outputs:
-            prompt_parts.append(
-                "\nInstructions: Use the tool results above to enhance your story. "
-                "Integrate the information naturally into your creative narrative. "
-                "If the tools provided useful information, weave it into your story. "
-                "If the tool results weren't helpful, create an engaging story based on the user's request anyway."
-            )
+            prompt_parts.append(self._TOOL_INSTRUCTIONS)
         
-        prompt_parts.append("\nWrite a short, vivid story based on the provided context and any tool results.")
+        prompt_parts.append(self._STORY_REQUEST)
         
         return "\n".join(prompt_parts)
     
-    def process_request(self, state: State) -> Dict[str, Any]:
-        """Process user request and return response (non-streaming)"""
+    def _prepare_messages(self, state: State) -> Tuple[State, List[ToolConfig], List[BaseMessage]]:
+        """Run this agent's tools and build the LLM messages shared by both request paths"""
         # Get and execute tools
         story_tools = self._get_tools_for_request(state)
         if story_tools:
@@ -118,61 +131,45 @@ Remember: You are first and foremost a storyteller, but now you can access addit
         tools_context = get_agent_tools_context(story_tools) if story_tools else ""
         
         # Build system prompt
-        system_content = self.get_system_prompt()
-        if tools_context:
-            system_content += f"\n\n{tools_context}"
-        
-        system = SystemMessage(content=system_content)
+        system = _compose_system_message(self.get_system_prompt(), tools_context)
         
         # Build final prompt
         final_prompt = self._build_prompt(state, tools_context)
         
+        return state, story_tools, [system, _human_message(content=final_prompt)]
+    
+    def process_request(self, state: State) -> Dict[str, Any]:
+        """Process user request and return response (non-streaming)"""
+        state, story_tools, messages = self._prepare_messages(state)
+        
         # Generate response
-        result = self.llm.invoke([system, HumanMessage(content=final_prompt)])
+        result = self.llm.invoke(messages)
         
         # Update state with generic method
         output_text = str(result.content) if result.content else ""
+        tool_names = [tool.name for tool in story_tools]
         state.set_agent_output(self.agent_id, output_text, {
             "execution_time": 0,  # Could track this
-            "tools_used": [tool.name for tool in story_tools],
+            "tools_used": tool_names,
             "confidence": 1.0
         })
         
         return {
             "output": output_text,
             "agent_id": self.agent_id,
-            "tools_used": [tool.name for tool in story_tools]
+            "tools_used": tool_names
         }
     
     def process_request_stream(self, state: State) -> Generator[str, None, None]:
         """Process user request and yield streaming response"""
-        # Get and execute tools
-        story_tools = self._get_tools_for_request(state)
-        if story_tools:
-            state = execute_intelligent_tools(state, story_tools, self.agent_id)
-        
-        # Generate dynamic tools context for the agent prompt
-        tools_context = get_agent_tools_context(story_tools) if story_tools else ""
-        
-        # Build system prompt
-        system_content = self.get_system_prompt()
-        if tools_context:
-            system_content += f"\n\n{tools_context}"
-        
-        system = SystemMessage(content=system_content)
-        
-        # Build final prompt
-        final_prompt = self._build_prompt(state, tools_context)
+        state, story_tools, messages = self._prepare_messages(state)
         
         # Stream the response
         full_response = ""
-        for chunk in self.llm.stream([system, HumanMessage(content=final_prompt)]):
+        for chunk in self.llm.stream(messages):
             if hasattr(chunk, 'content') and chunk.content:
                 content_str = str(chunk.content)
                 full_response += content_str
-                # Add small delay for testing streaming
-                import time
-                time.sleep(0.05)  # 50ms delay between chunks
                 yield content_str
         
         # Update state after streaming is complete with generic method
@@ -189,16 +186,7 @@ Remember: You are first and foremost a storyteller, but now you can access addit
 def create_story_response_stream(state: State) -> Generator[str, None, None]:
     """Stream the story creator response token by token"""
     # Get story creator's tools from the current flow
-    story_tools = []
-    if state.agent_flow:
-        for agent_config in state.agent_flow:
-            if agent_config["id"] == "story_creator" and "tools" in agent_config:
-                story_tools = [
-                    ToolConfig(name=tool["name"], option=tool.get("option"))
-                    if isinstance(tool, dict) else ToolConfig(name=tool)
-                    for tool in agent_config["tools"]
-                ]
-                break
+    story_tools = get_agent_tool_configs(state.agent_flow_by_id.get("story_creator"))
     
     # Execute tools intelligently if available
     if story_tools:
@@ -210,7 +198,7 @@ def create_story_response_stream(state: State) -> Generator[str, None, None]:
     # Generate dynamic tools context for the agent prompt
     tools_context = get_agent_tools_context(story_tools) if story_tools else ""
     
-    convo = "\n".join(f"{msg.sender}: {msg.text}" for msg in state.history)
+    convo = state.format_history()
     
     # Dynamic system prompt with tool awareness
     system_content = """You are a creative writer who crafts vivid, engaging stories. 
@@ -261,13 +249,10 @@ Remember: You are first and foremost a storyteller, but now you can access addit
 
     # Stream the response
     full_response = ""
-    for chunk in llm.stream([system, HumanMessage(content=final_prompt)]):
+    for chunk in llm.stream([system, _human_message(content=final_prompt)]):
         if hasattr(chunk, 'content') and chunk.content:
             content_str = str(chunk.content)
             full_response += content_str
-            # Add small delay for testing streaming
-            import time
-            time.sleep(0.05)  # 50ms delay between chunks
             yield content_str
     
     # Update state after streaming is complete
@@ -277,16 +262,7 @@ Remember: You are first and foremost a storyteller, but now you can access addit
 
 def create_story(state: State) -> dict:
     # Get story creator's tools from the current flow
-    story_tools = []
-    if state.agent_flow:
-        for agent_config in state.agent_flow:
-            if agent_config["id"] == "story_creator" and "tools" in agent_config:
-                story_tools = [
-                    ToolConfig(name=tool["name"], option=tool.get("option"))
-                    if isinstance(tool, dict) else ToolConfig(name=tool)
-                    for tool in agent_config["tools"]
-                ]
-                break
+    story_tools = get_agent_tool_configs(state.agent_flow_by_id.get("story_creator"))
     
     # Execute tools intelligently if available
     if story_tools:
@@ -298,7 +274,7 @@ def create_story(state: State) -> dict:
     # Generate dynamic tools context for the agent prompt
     tools_context = get_agent_tools_context(story_tools) if story_tools else ""
     
-    convo = "\n".join(f"{msg.sender}: {msg.text}" for msg in state.history)
+    convo = state.format_history()
     
     # Dynamic system prompt with tool awareness
     system_content = """You are a creative writer who crafts vivid, engaging stories. 
@@ -347,7 +323,7 @@ Remember: You are first and foremost a storyteller, but now you can access addit
 
     final_prompt = "\n".join(prompt_parts)
 
-    result = llm.invoke([system, HumanMessage(content=final_prompt)])
+    result = llm.invoke([system, _human_message(content=final_prompt)])
     
     # Update state with this agent's output for the next agent
     return {
@@ -8,13 +8,46 @@ This supervisor can:
 4. Orchestrate multiple resources contextually
 """
 
+import hashlib
 import json
 import os
+import threading
+import time
 from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
 
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    def _loads(data: bytes) -> Any:
+        return json.loads(data.decode('utf-8'))
+
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+AGENTS_CONFIG_PATH = DATA_DIR / "agents_config.json"
+KNOWLEDGEBASE_PATH = DATA_DIR / "knowledgebase.json"
+
+# Exact-match cache of analyze_query results, keyed by scope + normalized prompt hash
+PLAN_CACHE_TTL = 300.0
+PLAN_CACHE_MAX = 1024
+# Plans that pull these tools depend on fresh data and are never cached
+TIME_SENSITIVE_TOOLS = frozenset({"web_search"})
+_plan_cache: Dict[Tuple[Tuple[Any, ...], str], Tuple[float, "ExecutionPlan"]] = {}
+_plan_cache_lock = threading.Lock()
+
+def clear_plan_cache():
+    """Forget every cached plan (e.g. after agents were reloaded)"""
+    with _plan_cache_lock:
+        _plan_cache.clear()
+
+def _mtime_ns(path: Path) -> int:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return 0
+
 class ResourceType(Enum):
     AGENT = "agent"
     TOOL = "tool" 
@@ -47,6 +80,14 @@ class EnhancedSupervisor:
     def __init__(self, available_agents: List[str], knowledgebase_metadata: Dict):
         self.available_agents = available_agents
         self.knowledgebase_metadata = knowledgebase_metadata
+        # Plans depend on the agents, their configuration and the knowledge sources, so cache
+        # entries are scoped by all of them (file versions as seen when this supervisor was built)
+        self._plan_scope = (
+            tuple(available_agents),
+            tuple(sorted(knowledgebase_metadata)),
+            _mtime_ns(AGENTS_CONFIG_PATH),
+            _mtime_ns(KNOWLEDGEBASE_PATH),
+        )
         
         # Load agent expertise dynamically from configuration
         self.agent_expertise = self._load_agent_expertise_from_config()
@@ -57,9 +98,7 @@ class EnhancedSupervisor:
         
         try:
             # Load agents configuration
-            config_path = Path(__file__).parent.parent.parent / "data" / "agents_config.json"
-            with open(config_path, "r", encoding="utf-8") as f:
-                config_data = json.load(f)
+            config_data = _loads(AGENTS_CONFIG_PATH.read_bytes())
             
             agents_config = config_data.get("agents", {})
             
@@ -152,6 +191,13 @@ class EnhancedSupervisor:
         """
         Decompose and analyze a complex query to create an intelligent execution plan
         """
+        # Case is kept in the key: entity extraction (spaCy NER) is case-sensitive
+        cache_key = (self._plan_scope, hashlib.blake2b(user_query.strip().encode()).hexdigest())
+        now = time.monotonic()
+        with _plan_cache_lock:
+            cached = _plan_cache.get(cache_key)
+        if cached and now - cached[0] < PLAN_CACHE_TTL:
+            return cached[1]
         
         # Step 1: Extract entities and intents
         entities = self._extract_entities_comprehensive(user_query)
@@ -166,6 +212,12 @@ class EnhancedSupervisor:
         # Step 4: Create execution strategy
         execution_plan = self._create_execution_plan(mapped_components, user_query)
         
+        if not TIME_SENSITIVE_TOOLS.intersection(execution_plan.tools_needed):
+            with _plan_cache_lock:
+                if len(_plan_cache) >= PLAN_CACHE_MAX:
+                    _plan_cache.pop(next(iter(_plan_cache)))
+                _plan_cache[cache_key] = (now, execution_plan)
+        
         return execution_plan
 
     def _extract_entities_comprehensive(self, query: str) -> Dict[str, List[str]]:
@@ -1,4 +1,5 @@
 import os
+import time
 import uuid
 import json
 from typing import List, Optional, Dict, Any, Union
@@ -306,7 +307,6 @@ async def stream_supervisor_message(chat_id: str, req: MessageRequest):
     async def stream_response():
         # Simulate streaming by yielding the response in chunks
         response = result["response"]
-        import time
         for i in range(0, len(response), 10):
             chunk = response[i:i+10]
             yield f"data: {json.dumps({'content': chunk, 'agent': result['agent']})}\n\n"
@@ -1,13 +1,42 @@
 from typing import Optional, Dict, List, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
+import functools
 import json
 import os
 import re
 from pathlib import Path
 
 class ToolConfig(BaseModel):
+    # Instances from get() are shared across flows, so mutation must fail loudly
+    model_config = ConfigDict(frozen=True)
+    
     name: str
     option: Optional[str] = None
+    
+    @classmethod
+    @functools.lru_cache(maxsize=256)
+    def get(cls, name: str, option: Optional[str] = None) -> "ToolConfig":
+        """Shared, immutable ToolConfig for a (name, option) pair"""
+        return cls(name=name, option=option)
+
+def get_agent_tool_configs(agent_config: Optional[Dict[str, Any]]) -> List[ToolConfig]:
+    """ToolConfigs for an agent's entry in the agent flow (tools given as names or dicts)"""
+    if not agent_config or not agent_config.get("tools"):
+        return []
+    tools = agent_config["tools"]
+    get = ToolConfig.get
+    
+    # Flows from JSON list tools in one form, so pick the branch once from the first entry
+    try:
+        if isinstance(tools[0], dict):
+            return [get(tool["name"], tool.get("option")) for tool in tools]
+        return [get(tool) for tool in tools]
+    except TypeError:
+        # Mixed list of names and dicts
+        return [
+            get(tool["name"], tool.get("option")) if isinstance(tool, dict) else get(tool)
+            for tool in tools
+        ]
 
 class ToolMetadata(BaseModel):
     name: str
@@ -646,9 +675,17 @@ def get_all_available_tools() -> List[str]:
     """Get list of all available tool names"""
     return list(TOOL_DESCRIPTIONS.keys())
 
+_tool_registry_version = 0
+
+def get_tool_registry_version() -> int:
+    """Incremented whenever a tool is registered, so derived data can be cached per version"""
+    return _tool_registry_version
+
 def register_new_tool(tool_name: str, metadata: ToolMetadata):
     """Register a new tool dynamically"""
+    global _tool_registry_version
     TOOL_DESCRIPTIONS[tool_name] = metadata
+    _tool_registry_version += 1
     print(f"✅ Tool '{tool_name}' registered successfully")
 
 def get_tool_registry_info() -> Dict[str, Dict[str, Any]]:
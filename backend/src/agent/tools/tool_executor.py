@@ -1,7 +1,8 @@
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union
 from tavily import TavilyClient
 from dotenv import load_dotenv
 
@@ -118,9 +119,40 @@ def should_agent_use_tools(user_input: str, available_tools: List[ToolConfig],
 def execute_intelligent_tools(state: State, agent_tools: List[ToolConfig], 
                              agent_name: str) -> State:
     """Execute tools intelligently based on user input and agent reasoning"""
-    if not agent_tools:
+    tools_to_use = _select_tools(state, agent_tools, agent_name)
+    if not tools_to_use:
         return state
     
+    # Execute selected tools; they are blocking I/O (Tavily, files), so several run concurrently
+    if len(tools_to_use) == 1:
+        results = [_run_selected_tool(tools_to_use[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=len(tools_to_use)) as executor:
+            results = list(executor.map(_run_selected_tool, tools_to_use))
+    
+    # The usage tracker is not thread-safe, so results (and any retries) are recorded here
+    updated_outputs = state.tool_outputs.copy()
+    tracker = get_usage_tracker()
+    for tool_info, result in zip(tools_to_use, results):
+        updated_outputs[tool_info["tool"].name] = _build_tool_output(tool_info, result, agent_name, tracker)
+    
+    return state.copy(update={"tool_outputs": updated_outputs})
+
+
+def _run_selected_tool(tool_info: Dict[str, Any]) -> Union[str, BaseException]:
+    """Run a tool with its generated query, returning the exception instead of raising"""
+    tool = tool_info["tool"]
+    try:
+        return _execute_single_tool(tool.name, tool_info["query"], tool.option)
+    except Exception as e:
+        return e
+
+
+def _select_tools(state: State, agent_tools: List[ToolConfig], agent_name: str) -> List[Dict[str, Any]]:
+    """Tools (with generated queries) the agent should run for this request"""
+    if not agent_tools:
+        return []
+    
     # Analyze which tools should be used
     tools_decision = should_agent_use_tools(
         state.user_prompt, 
@@ -129,83 +161,78 @@ def execute_intelligent_tools(state: State, agent_tools: List[ToolConfig],
     )
     
     if not tools_decision["should_use_any"]:
-        return state
+        return []
+    return tools_decision["tools_to_use"]
+
+
+def _build_tool_output(tool_info: Dict[str, Any], result: Union[str, BaseException],
+                       agent_name: str, tracker) -> Dict[str, Any]:
+    """Score and record a tool result, retrying once with a fallback query when it looks weak"""
+    tool = tool_info["tool"]
+    query = tool_info["query"]
     
-    # Execute selected tools
-    updated_outputs = state.tool_outputs.copy()
-    tracker = get_usage_tracker()
+    if isinstance(result, BaseException):
+        error_result = f"Tool execution error: {str(result)}"
+        tracker.record_tool_usage(
+            tool_name=tool.name,
+            query=query,
+            result=error_result,
+            confidence_score=0.0,
+            success=False
+        )
+        
+        return {
+            "result": error_result,
+            "query_used": query,
+            "confidence": 0.0,
+            "agent": agent_name,
+            "error": True
+        }
     
-    for tool_info in tools_decision["tools_to_use"]:
-        tool = tool_info["tool"]
-        query = tool_info["query"]
-        expected_confidence = tool_info["confidence"]
+    try:
+        # Calculate actual confidence based on result
+        actual_confidence = tracker.calculate_confidence_score(tool.name, result)
         
-        try:
-            # Execute the tool with the generated query
-            result = _execute_single_tool(tool.name, query, tool.option)
-            
-            # Calculate actual confidence based on result
-            actual_confidence = tracker.calculate_confidence_score(tool.name, result)
-            
-            # Record usage
-            usage_id = tracker.record_tool_usage(
-                tool_name=tool.name,
-                query=query,
-                result=result,
-                confidence_score=actual_confidence,
-                success=actual_confidence > 0.4
-            )
-            
-            # Store result with metadata
-            tool_output = {
-                "result": result,
-                "query_used": query,
-                "confidence": actual_confidence,
-                "usage_id": usage_id,
-                "agent": agent_name,
-                "matching_cases": tool_info["matching_cases"]
-            }
-            
-            updated_outputs[tool.name] = tool_output
-            
-            # Check if we should retry with different query
-            if actual_confidence < 0.4:
-                retry_decision = tracker.should_retry_with_different_query(tool.name, query, result)
-                if retry_decision["should_retry"]:
-                    # Try one more time with a more general query
-                    fallback_query = _generate_fallback_query(query, tool.name)
-                    if fallback_query != query:
-                        fallback_result = _execute_single_tool(tool.name, fallback_query, tool.option)
-                        fallback_confidence = tracker.calculate_confidence_score(tool.name, fallback_result)
-                        
-                        if fallback_confidence > actual_confidence:
-                            # Use the better result
-                            tool_output["result"] = fallback_result
-                            tool_output["query_used"] = fallback_query
-                            tool_output["confidence"] = fallback_confidence
-                            tool_output["retry_attempt"] = True
-                            
-                            updated_outputs[tool.name] = tool_output
-            
-        except Exception as e:
-            error_result = f"Tool execution error: {str(e)}"
-            tracker.record_tool_usage(
-                tool_name=tool.name,
-                query=query,
-                result=error_result,
-                confidence_score=0.0,
-                success=False
-            )
-            
-            updated_outputs[tool.name] = {
-                "result": error_result,
-                "query_used": query,
-                "confidence": 0.0,
-                "agent": agent_name,
-                "error": True
-            }
+        # Record usage
+        usage_id = tracker.record_tool_usage(
+            tool_name=tool.name,
+            query=query,
+            result=result,
+            confidence_score=actual_confidence,
+            success=actual_confidence > 0.4
+        )
+        
+        # Store result with metadata
+        tool_output = {
+            "result": result,
+            "query_used": query,
+            "confidence": actual_confidence,
+            "usage_id": usage_id,
+            "agent": agent_name,
+            "matching_cases": tool_info["matching_cases"]
+        }
+        
+        # Check if we should retry with different query
+        if actual_confidence < 0.4:
+            retry_decision = tracker.should_retry_with_different_query(tool.name, query, result)
+            if retry_decision["should_retry"]:
+                # Try one more time with a more general query
+                fallback_query = _generate_fallback_query(query, tool.name)
+                if fallback_query != query:
+                    fallback_result = _execute_single_tool(tool.name, fallback_query, tool.option)
+                    fallback_confidence = tracker.calculate_confidence_score(tool.name, fallback_result)
+                    
+                    if fallback_confidence > actual_confidence:
+                        # Use the better result
+                        tool_output["result"] = fallback_result
+                        tool_output["query_used"] = fallback_query
+                        tool_output["confidence"] = fallback_confidence
+                        tool_output["retry_attempt"] = True
+        
+        return tool_output
     
-    return state.copy(update={"tool_outputs": updated_outputs})
+    except Exception as e:
+        return _build_tool_output(tool_info, e, agent_name, tracker)
 
 
 def _execute_single_tool(tool_name: str, query: str, option: Optional[str] = None) -> str:
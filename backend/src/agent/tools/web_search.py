@@ -1,15 +1,29 @@
-from tavily import TavilyClient
+import httpx
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
-client = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
+
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"
+
+# One pooled client for every search, so keep-alive connections skip the TLS handshake
+_client = httpx.Client(
+    headers={"Authorization": f"Bearer {os.getenv('TAVILY_API_KEY', '')}"},
+    limits=httpx.Limits(max_keepalive_connections=32),
+    timeout=30.0,
+)
 
 def run_tool(query: str) -> str:
     try:
-        result = client.search(query=query, max_results=3)
+        response = _client.post(TAVILY_SEARCH_URL, json={"query": query, "max_results": 3})
+        response.raise_for_status()
+        result = response.json()
         if result and "results" in result:
             return "\n".join([r["content"] for r in result["results"]])
         return "No useful results found."
     except Exception as e:
         return f"Tool error: {str(e)}"
+
+def close():
+    """Close pooled connections (called on app shutdown)"""
+    _client.close()
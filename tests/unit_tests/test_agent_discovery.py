@@ -0,0 +1,26 @@
+from agent.agent_registry import _find_agent_class, _materialize
+from agent.configurable_agent import ConfigurableAgent
+
+
+def test_direct_subclass_is_named() -> None:
+    source = "from ..base_agent import BaseAgent\n\nclass Helper(dict): pass\n\nclass EchoAgent(BaseAgent): pass\n"
+    assert _find_agent_class(source, "echo_agent.py") == "EchoAgent"
+
+
+def test_indirect_or_aliased_subclass_gets_a_module_placeholder() -> None:
+    assert _find_agent_class("class EchoAgent(ConfigurableAgent): pass\n", "echo_agent.py") == ""
+    assert _find_agent_class("from x import BaseAgent as Base\nclass EchoAgent(Base): pass\n", "echo_agent.py") == ""
+
+
+def test_module_without_classes_is_not_an_agent() -> None:
+    assert _find_agent_class("def create_parody(state): pass\n", "agent.py") is None
+
+
+def test_module_placeholder_prefers_the_class_defined_there(tmp_path, monkeypatch) -> None:
+    (tmp_path / "indirect_echo_agent.py").write_text(
+        "from agent.configurable_agent import ConfigurableAgent\n\nclass EchoAgent(ConfigurableAgent): pass\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    agent_class = _materialize("indirect_echo_agent")
+    assert agent_class.__name__ == "EchoAgent"
+    assert issubclass(agent_class, ConfigurableAgent)
@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from agent import graph
+
+
+def _ids(levels: list) -> list:
+    return [[agent["id"] for agent in level] for level in levels]
+
+
+def test_default_is_a_chain() -> None:
+    enabled = [{"id": "a"}, {"id": "b"}, {"id": "c"}]
+    assert _ids(graph._agent_levels(enabled)) == [["a"], ["b"], ["c"]]
+
+
+def test_empty_depends_on_joins_the_first_level() -> None:
+    enabled = [{"id": "a"}, {"id": "b", "depends_on": []}, {"id": "c", "depends_on": ["a", "b"]}]
+    assert _ids(graph._agent_levels(enabled)) == [["a", "b"], ["c"]]
+
+
+def test_default_agent_waits_for_every_level_before_it() -> None:
+    enabled = [{"id": "a"}, {"id": "b", "depends_on": []}, {"id": "c"}]
+    assert _ids(graph._agent_levels(enabled)) == [["a", "b"], ["c"]]
+
+
+def test_unknown_and_later_dependencies_are_ignored() -> None:
+    enabled = [{"id": "a", "depends_on": ["nope", "b"]}, {"id": "b", "depends_on": ["missing"]}]
+    assert _ids(graph._agent_levels(enabled)) == [["a", "b"]]
+
+
+class _FakeAgent:
+    """Streams fixed chunks, pausing between them, and records its output like real agents"""
+
+    def __init__(self, agent_id: str, chunks: list, delay: float, started: threading.Barrier):
+        self.agent_id = agent_id
+        self.chunks = chunks
+        self.delay = delay
+        self.started = started
+
+    def process_request_stream(self, state):
+        # Both agents must be running at the same time to get past the barrier
+        self.started.wait(timeout=5)
+        for chunk in self.chunks:
+            time.sleep(self.delay)
+            yield chunk
+        state.set_agent_output(self.agent_id, "".join(self.chunks))
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    started = threading.Barrier(2)
+    agents = {
+        "slow": _FakeAgent("slow", ["s1", "s2"], 0.2, started),
+        "fast": _FakeAgent("fast", ["f1", "f2"], 0.01, started),
+    }
+    monkeypatch.setattr(graph.enhanced_agent_registry, "get_agent", agents.__getitem__)
+    monkeypatch.setattr(graph, "DATA_DB", str(tmp_path / "chats.db"))
+    with TestClient(graph.app) as test_client:
+        yield test_client
+
+
+def test_independent_agents_stream_concurrently(client) -> None:
+    chat_id = client.post("/chats").json()["id"]
+    graph.chats[chat_id]["agent_sequence"] = [
+        {"id": "slow", "enabled": True, "tools": []},
+        {"id": "fast", "enabled": True, "tools": [], "depends_on": []},
+    ]
+
+    response = client.post(f"/chats/{chat_id}/message/stream", json={"user_prompt": "hello there"})
+    messages = [graph._loads(line) for line in response.text.splitlines() if line]
+    chunks = [(msg["sender"], msg["text"]) for msg in messages if msg.get("stream_chunk")]
+
+    # The fast agent finishes while the slow one is still streaming
+    assert chunks.index(("fast", "f2")) < chunks.index(("slow", "s2"))
+    ends = {msg["sender"]: msg["text"] for msg in messages if msg.get("stream_end")}
+    assert ends == {"slow": "s1s2", "fast": "f1f2"}
+
+    # History records the level in sequence order, after the user's message
+    history = graph.chats[chat_id]["history"]
+    assert [(entry["sender"], entry["text"]) for entry in history] == [
+        ("user", "hello there"),
+        ("slow", "s1s2"),
+        ("fast", "f1f2"),
+    ]
+
+
+class _CountingAgent:
+    def __init__(self, agent_id: str):
+        self.agent_id = agent_id
+        self.produced = 0
+        self.closed = threading.Event()
+
+    def process_request_stream(self, state):
+        try:
+            for i in range(50):
+                time.sleep(0.01)
+                self.produced += 1
+                yield f"{self.agent_id}{i}"
+            state.set_agent_output(self.agent_id, "done")
+        finally:
+            self.closed.set()
+
+
+@pytest.mark.anyio
+async def test_stopping_early_stops_the_workers(monkeypatch) -> None:
+    agents = {"a": _CountingAgent("a"), "b": _CountingAgent("b")}
+    monkeypatch.setattr(graph.enhanced_agent_registry, "get_agent", agents.__getitem__)
+    state = graph.State(user_prompt="hi", history=[])
+
+    events = graph._stream_level_concurrently([{"id": "a"}, {"id": "b"}], state)
+    async for msg in events:
+        if msg.get("stream_chunk"):
+            break
+    await events.aclose()
+
+    for agent in agents.values():
+        assert agent.closed.wait(timeout=5)
+        assert agent.produced < 50
+    assert state.agent_outputs == {}
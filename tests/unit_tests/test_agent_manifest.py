@@ -0,0 +1,44 @@
+import json
+import os
+
+import pytest
+
+from agent import agent_registry as registry_module
+from agent.agent_registry import AgentRegistry
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch) -> AgentRegistry:
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setattr(registry_module, "MANIFEST_DIR", cache_dir)
+    monkeypatch.setattr(registry_module, "MANIFEST_PATH", cache_dir / "agent_manifest.json")
+    return AgentRegistry()
+
+
+def test_manifest_is_json_in_the_cache_dir(registry) -> None:
+    package_dir = os.path.dirname(registry_module.__file__)
+    assert not os.path.exists(os.path.join(package_dir, ".agent_manifest.pkl"))
+
+    with open(registry_module.MANIFEST_PATH, encoding="utf-8") as f:
+        cached = json.load(f)
+    assert cached["agents"]["granny"].endswith(":GrannyAgent")
+    assert all(len(entry) == 3 for entry in cached["files"])
+
+
+def test_in_place_edit_invalidates_the_manifest(registry, tmp_path) -> None:
+    agent_file = tmp_path / "echo_agent.py"
+    agent_file.write_text("class EchoAgent: pass\n")
+    fingerprint = registry._get_fingerprint([agent_file])
+    registry._write_manifest(fingerprint, {"echo": "echo_agent:EchoAgent"})
+    assert registry._read_manifest(registry._get_fingerprint([agent_file])) == {"echo": "echo_agent:EchoAgent"}
+
+    # Same directory listing, different contents
+    stat = agent_file.stat()
+    agent_file.write_text("class EchoAgent:\n    pass\n")
+    os.utime(agent_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert registry._read_manifest(registry._get_fingerprint([agent_file])) is None
+
+
+def test_corrupt_manifest_is_rescanned(registry) -> None:
+    registry_module.MANIFEST_PATH.write_text("{not json")
+    assert registry._read_manifest([]) is None
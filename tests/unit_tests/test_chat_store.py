@@ -0,0 +1,130 @@
+import json
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from agent import graph
+
+
+@pytest.fixture
+def store(tmp_path):
+    db_path = str(tmp_path / "chats.db")
+    graph.open_chat_store(db_path)
+    yield db_path
+    graph.close_chat_store()
+
+
+def _rows(db_path: str, chat_id: str) -> list:
+    with sqlite3.connect(db_path) as db:
+        return db.execute(
+            "SELECT seq, sender, text FROM messages WHERE chat_id = ? ORDER BY seq",
+            (chat_id,),
+        ).fetchall()
+
+
+def _chat(chat_id: str, history: list) -> dict:
+    return {
+        "id": chat_id,
+        "agent_sequence": [],
+        "history": history,
+        "supervisor_mode": False,
+        "supervisor_type": "enhanced",
+    }
+
+
+def test_import_does_not_open_the_store(tmp_path) -> None:
+    workdir = tmp_path / "work"
+    workdir.mkdir()
+    subprocess.run([sys.executable, "-c", "import agent.graph"], cwd=workdir, check=True, capture_output=True)
+    assert list(tmp_path.glob("chats*")) == []
+    assert list(workdir.glob("chats*")) == []
+
+
+def test_save_requires_an_open_store() -> None:
+    graph.close_chat_store()
+    with pytest.raises(RuntimeError):
+        graph._prune_chats()
+
+
+def test_write_chat_appends_only_new_entries(store) -> None:
+    graph.chats["c1"] = _chat("c1", [{"sender": "user", "text": "hi"}])
+    graph._write_chat("c1")
+    assert _rows(store, "c1") == [(0, "user", "hi")]
+
+    graph.chats["c1"]["history"].append({"sender": "granny", "text": "hello", "via_supervisor": True})
+    graph._write_chat("c1")
+    assert _rows(store, "c1") == [(0, "user", "hi"), (1, "granny", "hello")]
+    assert graph._saved_counts["c1"] == 2
+
+
+def test_write_chat_rewrites_replaced_history(store) -> None:
+    graph.chats["c1"] = _chat("c1", [{"sender": "user", "text": "a"}, {"sender": "granny", "text": "b"}])
+    graph._write_chat("c1")
+
+    graph.chats["c1"]["history"] = [{"sender": "user", "text": "fresh"}]
+    graph._write_chat("c1")
+    assert _rows(store, "c1") == [(0, "user", "fresh")]
+
+
+def test_prune_drops_empty_and_removed_chats(store) -> None:
+    graph.chats["keep"] = _chat("keep", [{"sender": "user", "text": "hi"}])
+    graph.chats["empty"] = _chat("empty", [{"sender": "user", "text": "hi"}])
+    graph.chats["gone"] = _chat("gone", [{"sender": "user", "text": "hi"}])
+    for chat_id in ("keep", "empty", "gone"):
+        graph._write_chat(chat_id)
+
+    graph.chats["empty"]["history"] = []
+    del graph.chats["gone"]
+    graph._prune_chats()
+
+    with sqlite3.connect(store) as db:
+        stored = {row[0] for row in db.execute("SELECT chat_id FROM chats")}
+        messages = {row[0] for row in db.execute("SELECT chat_id FROM messages")}
+    assert stored == {"keep"}
+    assert messages == {"keep"}
+
+
+def test_reload_round_trip(store) -> None:
+    history = [
+        {"sender": "user", "text": "hi"},
+        {"sender": "tool", "text": "sunny", "tool_id": "web_search", "for_agent": "granny"},
+        {"sender": "granny", "text": "hello dear"},
+    ]
+    graph.chats["c1"] = _chat("c1", [dict(entry) for entry in history])
+    graph.chats["c1"]["agent_sequence"] = [{"id": "granny", "enabled": True, "tools": []}]
+    graph.save_chats("c1")
+    graph.close_chat_store()
+
+    graph.open_chat_store(store)
+    assert graph.chats["c1"]["history"] == history
+    assert graph.chats["c1"]["agent_sequence"] == [{"id": "granny", "enabled": True, "tools": []}]
+    assert "c1" in graph.meaningful_chat_ids
+    assert graph._saved_counts["c1"] == 3
+
+
+def test_legacy_json_is_imported_once(tmp_path) -> None:
+    legacy = {"old": _chat("old", [{"sender": "user", "text": "from json"}])}
+    (tmp_path / "chats.json").write_text(json.dumps(legacy))
+    (tmp_path / "chats.wal.jsonl").write_text(
+        json.dumps({"chat_id": "logged", "data": _chat("logged", [{"sender": "user", "text": "from wal"}])})
+        + "\n{\"chat_id\": \"torn"
+    )
+    db_path = str(tmp_path / "chats.db")
+
+    graph.open_chat_store(db_path)
+    try:
+        assert set(graph.chats) == {"old", "logged"}
+        assert not (tmp_path / "chats.json").exists()
+        assert (tmp_path / "chats.json.migrated").exists()
+        assert (tmp_path / "chats.wal.jsonl.migrated").exists()
+        assert _rows(db_path, "logged") == [(0, "user", "from wal")]
+    finally:
+        graph.close_chat_store()
+
+    graph.open_chat_store(db_path)
+    try:
+        assert set(graph.chats) == {"old", "logged"}
+    finally:
+        graph.close_chat_store()
@@ -0,0 +1,49 @@
+import pytest
+
+from agent import graph
+
+
+def _history(n: int) -> list:
+    return [{"sender": "user" if i % 2 == 0 else "granny", "text": f"m{i}"} for i in range(n)]
+
+
+@pytest.fixture
+def cap(monkeypatch):
+    monkeypatch.setattr(graph, "MAX_CONTEXT_MESSAGES", 4)
+    return 4
+
+
+@pytest.mark.parametrize("size", [0, 3, 4])
+def test_history_up_to_the_cap_is_kept_whole(cap, size) -> None:
+    history = _history(size)
+    window = graph.context_window(history)
+    assert window == history
+    assert window is not history
+
+
+def test_history_above_the_cap_keeps_opening_and_latest(cap) -> None:
+    window = graph.context_window(_history(10))
+    assert [entry["text"] for entry in window] == ["m0", "m7", "m8", "m9"]
+
+
+def test_zero_disables_the_cap(monkeypatch) -> None:
+    monkeypatch.setattr(graph, "MAX_CONTEXT_MESSAGES", 0)
+    assert len(graph.context_window(_history(100))) == 100
+
+
+def test_agents_get_the_window_while_the_chat_keeps_everything(tmp_path, cap) -> None:
+    graph.open_chat_store(str(tmp_path / "chats.db"))
+    try:
+        chat_id = graph.create_chat()["id"]
+        graph.chats[chat_id]["history"].extend(_history(10))
+        graph.save_chats(chat_id)
+
+        sent = graph.parsed_history(chat_id, graph.chats[chat_id]["history"])
+        assert [message.text for message in sent] == ["m0", "m7", "m8", "m9"]
+        assert len(graph.get_chat(chat_id)["history"]) == 10
+
+        graph.close_chat_store()
+        graph.open_chat_store(str(tmp_path / "chats.db"))
+        assert len(graph.get_chat(chat_id)["history"]) == 10
+    finally:
+        graph.close_chat_store()
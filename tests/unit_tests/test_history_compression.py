@@ -0,0 +1,43 @@
+import pytest
+
+# The granny agent still imports the pre-1.0 langchain.schema module
+granny = pytest.importorskip("agent.granny.agent")
+
+
+@pytest.fixture(autouse=True)
+def fresh_compressor(monkeypatch):
+    monkeypatch.setattr(granny, "_history_compressor", None)
+    monkeypatch.setattr(granny, "_history_compressor_failed", False)
+
+
+def test_compressor_loads_the_small_model_once(monkeypatch) -> None:
+    loads = []
+
+    class FakeCompressor:
+        def __init__(self, **kwargs):
+            loads.append(kwargs)
+
+        def compress_prompt(self, text, rate):
+            return {"compressed_prompt": text[:3]}
+
+    monkeypatch.setattr(granny, "PromptCompressor", FakeCompressor)
+    assert granny._compress_history_text("hello") == "hel"
+    assert granny._compress_history_text("world") == "wor"
+    assert loads == [{
+        "model_name": granny._HISTORY_COMPRESSOR_MODEL,
+        "use_llmlingua2": True,
+        "device_map": "cpu",
+    }]
+
+
+def test_failed_load_falls_back_to_full_history(monkeypatch) -> None:
+    attempts = []
+
+    def broken_compressor(**kwargs):
+        attempts.append(kwargs)
+        raise OSError("model download failed")
+
+    monkeypatch.setattr(granny, "PromptCompressor", broken_compressor)
+    assert granny._compress_history_text("hello") is None
+    assert granny._compress_history_text("hello") is None
+    assert len(attempts) == 1
@@ -0,0 +1,46 @@
+import pytest
+
+from agent import graph
+
+
+@pytest.fixture
+def store(tmp_path):
+    graph.open_chat_store(str(tmp_path / "chats.db"))
+    yield
+    graph.close_chat_store()
+
+
+def _listed() -> set:
+    return {chat["id"] for chat in graph.list_chats()}
+
+
+def _settings(enabled: bool) -> graph.ChatSettings:
+    return graph.ChatSettings(agent_sequence=[graph.AgentConfig(id="granny", enabled=enabled)])
+
+
+def test_new_chat_is_listed_once_it_has_content(store) -> None:
+    chat_id = graph.create_chat()["id"]
+    assert chat_id not in _listed()
+
+    graph.update_settings(chat_id, _settings(enabled=True))
+    assert chat_id in _listed()
+
+
+def test_disabling_the_last_agent_unlists_an_empty_chat(store) -> None:
+    chat_id = graph.create_chat()["id"]
+    graph.update_settings(chat_id, _settings(enabled=True))
+
+    graph.update_settings(chat_id, _settings(enabled=False))
+    assert chat_id not in _listed()
+
+
+def test_pruned_chat_is_unlisted(store) -> None:
+    chat_id = graph.create_chat()["id"]
+    graph.chats[chat_id]["history"].append({"sender": "user", "text": "hi"})
+    graph.save_chats(chat_id)
+    assert chat_id in _listed()
+
+    graph.chats[chat_id]["history"].clear()
+    graph.save_chats()
+    assert chat_id not in _listed()
+    assert graph._store().execute("SELECT COUNT(*) FROM chats").fetchone()[0] == 0
@@ -0,0 +1,56 @@
+import pytest
+
+from agent import graph
+from agent.state import ChatMessage
+
+
+@pytest.fixture
+def store(tmp_path):
+    graph.open_chat_store(str(tmp_path / "chats.db"))
+    yield
+    graph.close_chat_store()
+
+
+def _texts(messages: list) -> list:
+    return [message.text for message in messages]
+
+
+def test_only_new_entries_are_parsed(store) -> None:
+    history = [{"sender": "user", "text": "a"}]
+    first = graph.parsed_history("c1", history)
+    history.append({"sender": "granny", "text": "b"})
+    second = graph.parsed_history("c1", history)
+
+    assert _texts(second) == ["a", "b"]
+    # The already parsed message is reused rather than validated again
+    assert second[0] is first[0]
+    assert all(isinstance(message, ChatMessage) for message in second)
+
+
+def test_replaced_or_shrunk_history_is_parsed_again() -> None:
+    history = [{"sender": "user", "text": "a"}, {"sender": "granny", "text": "b"}]
+    graph.parsed_history("c1", history)
+
+    assert _texts(graph.parsed_history("c1", [{"sender": "user", "text": "new"}])) == ["new"]
+
+    history = [{"sender": "user", "text": "x"}, {"sender": "granny", "text": "y"}]
+    graph.parsed_history("c1", history)
+    history.pop()
+    assert _texts(graph.parsed_history("c1", history)) == ["x"]
+
+
+def test_returned_list_is_a_copy() -> None:
+    history = [{"sender": "user", "text": "a"}]
+    graph.parsed_history("c1", history).append(ChatMessage(sender="user", text="injected"))
+    assert _texts(graph.parsed_history("c1", history)) == ["a"]
+
+
+def test_pruned_chat_is_evicted(store) -> None:
+    graph.chats["c1"] = {"id": "c1", "agent_sequence": [], "history": [{"sender": "user", "text": "a"}]}
+    graph.save_chats("c1")
+    graph.parsed_history("c1", graph.chats["c1"]["history"])
+    assert "c1" in graph._parsed_histories
+
+    graph.chats["c1"]["history"].clear()
+    graph.save_chats()
+    assert "c1" not in graph._parsed_histories
@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+from agent import graph
+from agent.supervisor import enhanced_supervisor
+from agent.supervisor.enhanced_supervisor import EnhancedSupervisor, clear_plan_cache
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    clear_plan_cache()
+    yield
+    clear_plan_cache()
+
+
+def _supervisor() -> EnhancedSupervisor:
+    return EnhancedSupervisor(["granny", "story_creator"], {})
+
+
+def test_repeated_prompt_reuses_the_plan() -> None:
+    supervisor = _supervisor()
+    plan = supervisor.analyze_query("Tell me a story about a dragon")
+    assert supervisor.analyze_query("  Tell me a story about a dragon ") is plan
+
+
+def test_differently_cased_prompts_are_planned_separately() -> None:
+    supervisor = _supervisor()
+    plan = supervisor.analyze_query("Tell me a story about Paris")
+    assert supervisor.analyze_query("tell me a story about paris") is not plan
+
+
+def test_reload_clears_cached_plans(monkeypatch) -> None:
+    monkeypatch.setattr(graph.enhanced_agent_registry, "reload_agents", lambda: None)
+    supervisor = _supervisor()
+    plan = supervisor.analyze_query("Tell me a story about a dragon")
+
+    graph.reload_agents()
+    assert enhanced_supervisor._plan_cache == {}
+    assert supervisor.analyze_query("Tell me a story about a dragon") is not plan
+
+
+def test_config_change_gives_a_new_scope(tmp_path, monkeypatch) -> None:
+    config = tmp_path / "agents_config.json"
+    config.write_bytes(enhanced_supervisor.AGENTS_CONFIG_PATH.read_bytes())
+    monkeypatch.setattr(enhanced_supervisor, "AGENTS_CONFIG_PATH", config)
+    before = _supervisor()
+
+    stat = config.stat()
+    os.utime(config, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    after = _supervisor()
+
+    assert before._plan_scope != after._plan_scope
+    plan = before.analyze_query("Tell me a story about a dragon")
+    assert after.analyze_query("Tell me a story about a dragon") is not plan
@@ -0,0 +1,90 @@
+import threading
+import time
+
+import pytest
+
+from agent import graph
+from agent.supervisor.enhanced_supervisor import ExecutionPlan, QueryComponent, ResourceType
+
+
+def _plan(dependencies: dict) -> ExecutionPlan:
+    components = [
+        QueryComponent(
+            text=agent_id, intent="analysis", entities={}, resource_type=ResourceType.AGENT,
+            resource_id=agent_id, priority=i + 1, dependencies=deps,
+        )
+        for i, (agent_id, deps) in enumerate(dependencies.items())
+    ]
+    return ExecutionPlan(
+        components=components, strategy="multi_agent_sequential", primary_agent=components[0].resource_id,
+        tools_needed=[], knowledge_needed=[], context_fusion="factual_integration",
+        agent_sequence=list(dependencies), requires_multi_agent=True,
+    )
+
+
+def test_dependencies_split_the_plan_into_levels() -> None:
+    plan = _plan({"data_analyst": [], "research_specialist": [], "granny": ["data_analyst"]})
+    assert graph._plan_levels(plan) == [[(0, "data_analyst"), (1, "research_specialist")], [(2, "granny")]]
+
+
+def test_missing_dependencies_keep_the_chain() -> None:
+    plan = _plan({"data_analyst": None, "granny": None})
+    assert graph._plan_levels(plan) == [[(0, "data_analyst")], [(1, "granny")]]
+
+
+class _FakeAgent:
+    def __init__(self, agent_id: str, started: threading.Barrier = None, delay: float = 0):
+        self.agent_id = agent_id
+        self.started = started
+        self.delay = delay
+        self.prompt = None
+
+    def process_request(self, state):
+        if self.started is not None:
+            # Only passes when both agents of the first level run at the same time
+            self.started.wait(timeout=5)
+        time.sleep(self.delay)
+        self.prompt = state.user_prompt
+        return {"output": f"{self.agent_id} says hi"}
+
+
+class _FakeSupervisor:
+    def _get_agent_instructions(self, agent_id: str, context_fusion: str) -> str:
+        return "Do your part."
+
+
+@pytest.fixture
+def agents(monkeypatch) -> dict:
+    started = threading.Barrier(2)
+    agents = {
+        "data_analyst": _FakeAgent("data_analyst", started, delay=0.2),
+        "research_specialist": _FakeAgent("research_specialist", started),
+        "granny": _FakeAgent("granny"),
+    }
+    monkeypatch.setattr(graph.enhanced_agent_registry, "list_available_agents", lambda: list(agents))
+    monkeypatch.setattr(graph.enhanced_agent_registry, "get_agent", agents.__getitem__)
+    return agents
+
+
+def test_levels_run_concurrently_and_later_levels_see_earlier_outputs(agents) -> None:
+    plan = _plan({"data_analyst": [], "research_specialist": [], "granny": ["data_analyst", "research_specialist"]})
+    hist = []
+    result = graph.execute_multi_agent_orchestration(plan, "analyze it, granny", [], hist, _FakeSupervisor())
+
+    assert "Previous Agent Results" not in agents["data_analyst"].prompt
+    assert "Previous Agent Results" not in agents["research_specialist"].prompt
+    assert "data_analyst says hi" in agents["granny"].prompt
+    assert "research_specialist says hi" in agents["granny"].prompt
+    assert result["agent_response"] == "granny says hi"
+    assert hist[-1]["text"] == "✅ Multi-agent workflow completed. Final response from granny."
+    assert not any(entry.get("error") for entry in hist)
+
+
+def test_level_results_are_recorded_as_they_finish(agents) -> None:
+    plan = _plan({"data_analyst": [], "research_specialist": [], "granny": ["data_analyst", "research_specialist"]})
+    hist = []
+    graph.execute_multi_agent_orchestration(plan, "analyze it, granny", [], hist, _FakeSupervisor())
+
+    responses = [entry["sender"] for entry in hist if entry.get("via_supervisor")]
+    # research_specialist is later in the plan but finishes first
+    assert responses == ["research_specialist", "data_analyst", "granny"]
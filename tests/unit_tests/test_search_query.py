@@ -0,0 +1,19 @@
+import pytest
+
+from agent.configurable_agent import ConfigurableAgent
+
+
+@pytest.mark.parametrize(
+    "prompt, query",
+    [
+        ("What's the weather in Bucharest?", "weather Bucharest Romania current forecast"),
+        ("Weathers across Romanian towns", "weather Romania current forecast"),
+        ("weather tomorrow", "weather current forecast"),
+        ("Please analyze this data", "data analysis information"),
+        ("I analyzed the database last week", "data analysis information"),
+        ("An analysis of the data", "data analysis information"),
+        ("Tell me a joke about cats", "joke cats"),
+    ],
+)
+def test_query_rules_match_inflected_keywords(prompt, query) -> None:
+    assert ConfigurableAgent._extract_search_query(prompt) == query
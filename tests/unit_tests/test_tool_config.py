@@ -0,0 +1,17 @@
+import pytest
+from pydantic import ValidationError
+
+from agent.tools.tool_config import ToolConfig, get_agent_tool_configs
+
+
+def test_shared_configs_cannot_be_mutated() -> None:
+    config = ToolConfig.get("knowledgebase", "recipes")
+    assert ToolConfig.get("knowledgebase", "recipes") is config
+    with pytest.raises(ValidationError):
+        config.option = "tutorials"
+    assert ToolConfig.get("knowledgebase", "recipes").option == "recipes"
+
+
+def test_flow_tools_resolve_to_shared_configs() -> None:
+    configs = get_agent_tool_configs({"tools": ["web_search", {"name": "knowledgebase", "option": "recipes"}]})
+    assert configs == [ToolConfig.get("web_search"), ToolConfig.get("knowledgebase", "recipes")]